@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Benchmark of the rendering modes of the EAC map (see plotMap and plotClusters in eacMap.py)
+# Synthetic alarms spread over the city are plotted with one marker per alarm, in the cluster mode
+# and in the cluster mode with the heatmap layer. The time to create each map and the size of the
+# HTML file are measured for each number of alarms
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import time
+import os
+import sys, getopt
+import random
+
+## The EAC being measured
+import eacMap
+from elementsEAC import EA
+
+##############################################################################
+
+sizes = [1000, 10000, 100000]  # numbers of alarms
+cityRadius = 0.08  # alarms within about 9 km of the center of the map (degrees)
+mapName = "clusterBenchmark"
+
+## [name, clusterMode, heatmapLayer]
+modes = [["markers", False, False],
+         ["cluster", True, False],
+         ["cluster + heatmap", True, True]]
+
+##############################################################################
+
+def createAlarms(n):
+    rnd = random.Random(1)
+    alarms = []
+    for i in range(n):
+        ea = EA(i, None, eacMap.mapGPS.la + rnd.uniform(-cityRadius, cityRadius), eacMap.mapGPS.lo + rnd.uniform(-cityRadius, cityRadius), 0)
+        if rnd.random() < 0.1:
+            ea.putEventComplex(1)
+        else:
+            ea.putEventInstance(rnd.choice([1, 4, 8, 16]))
+        ea.setSeverityLevel(rnd.randint(0, 100))
+        alarms.append(ea)
+    return alarms
+
+##############################################################################
+
+def main(argv):
+    global sizes
+
+    opts, ars = getopt.getopt(argv, "hn:", ["sizes="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("clusterBenchmark.py -n <numbers of alarms, e.g. 1000,10000,100000>")
+            sys.exit(1)
+        elif opt in ("-n", "--sizes"):
+            sizes = [int(n) for n in arg.split(",")]
+
+    eacMap.debug = False
+    eacMap.mapName = mapName
+    eacMap.loadFolium()  # the import of folium is not measured
+
+    for n in sizes:
+        alarms = createAlarms(n)
+        individual = len([ea for ea in alarms if ea.getSeverityLevel() >= eacMap.clusterSL])
+        print(n, "alarms (" + str(individual), "with SL >=", str(eacMap.clusterSL) + "):")
+
+        for name, clusterMode, heatmapLayer in modes:
+            eacMap.clusterMode = clusterMode
+            eacMap.heatmapLayer = heatmapLayer
+
+            start = time.perf_counter()
+            eacMap.plotMap(alarms)
+            elapsed = time.perf_counter() - start
+
+            size = os.path.getsize(eacMap.mapFileName(mapName))
+            print("    " + name + ": render time (s):", round(elapsed, 2), ", HTML size (MB):", round(size / 1000000, 2))
+
+    os.remove(eacMap.mapFileName(mapName))
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -10,15 +10,24 @@
 # *********************************************************************
 
 import time
+import os
 import sys, getopt
 import atexit
 import threading
+import queue
 import paho.mqtt.client as mqtt
-import folium
 import json
+import hashlib
+
+## folium is only loaded when the first map is created (see loadFolium)
+folium = None
+HeatMap = None
 
 ## Supporting classes
-from elementsEAC import EA, GPS, ListEA
+from elementsEAC import EA, GPS, ListEA, encodeEA, decodeEA
+
+## Latency of the alarms, from the EDU to the map
+from traceStats import TraceStats
 
 ##############################################################################
 
@@ -27,11 +36,57 @@ debug = True
 ipBroker = "192.168.1.100"  # The IP address of the MQTT Broker - can be provided as a command-line argument
 requestEA = "EPU_CityAlarmCamera_1"  # MQTT subject to be subscribed to EPU1 - any EPU may be 
 
+## Several EPUs may be followed by the same EAC: requestEA may have a comma-separated list of topics (wildcards are allowed)
+## The alarms of all of them are merged in a single map. Since ids of EA are only unique within an EPU,
+## the received ids are prefixed by the EPU (first level of the topic)
+topicsEA = [requestEA]
+mapName = None  # name of the map (and snapshot) files. By default, it is derived from the topic
+
+## Received EA are decoded by a pool of threads, so the MQTT thread only queues them
+## EA of the same EPU are always handled by the same thread, keeping their order
+decodeWorkers = 4  # 0 handles the EA in the MQTT thread. It can be provided as a command-line argument
+decodeQueues = []
+
+## Alarms still active in the EPU are received as retained MQTT messages (topic requestEA/active/+)
+## It can be provided as a command-line argument
+retainedEA = True
+
+## The current alarms are also saved in a local snapshot file, loaded when the EAC starts
+saveSnapshot = True
+
+## Maps are created by a dedicated thread. Render requests received within renderWindow seconds
+## are coalesced, and the map is only created when the alarms have changed
+renderWindow = 1.0  # It can be provided as a command-line argument
+renderRequest = threading.Event()
+lockRender = threading.Lock()
+lockPlot = threading.Lock()  # only one map is created at a time
+renderStats = {"requests": 0, "renders": 0, "unchanged": 0, "renderTime": 0.0, "latency": 0.0, "firstRequest": None}
+
+## Popup and color of the markers, according to the types of events and sl
+markerCache = {}
+
+## Percentiles of the latency of each stage of the alarms (EDU -> EPU -> EAC)
+traceStats = TraceStats()
+
+## Aggregated rendering, for large sets of alarms. Both options can be provided as command-line arguments
+## clusterMode: alarms are aggregated in clusters by the browser, according to its zoom; alarms with sl >= clusterSL keep their markers
+## heatmapLayer: additional layer with the alarms weighted by their sl
+clusterMode = False
+clusterCells = 4  # cells per side of each 256-pixel tile (the radius of a cluster is 256 / clusterCells pixels)
+clusterZoom = 17  # from this zoom on, all alarms have their own markers
+clusterSL = 60
+heatmapLayer = False
+
+## Optional live dashboard: a local HTTP server pushing the changes of the alarms to the browsers
+## The port can be provided as a command-line argument (0 disables the dashboard)
+livePort = 0
+liveServer = None
+
 ## Frequency to refresh the map
 refreshTime = 60  # After 120s, Emergency Alarms that were not refreshed will be removed from the list of active EA
 
 ## List of all alarms
-alarms = ListEA()
+alarms = ListEA(lambda kind, key, ea: alarmChanged(kind, key, ea))
 
 ## Variables related to the creation of the Map
 ## This is the center of the city to be considered
@@ -88,76 +143,332 @@ class mapRefresher (threading.Thread):
             ## Remove old EAs
             alarms.updateAlarms(refreshTime, debug)
 
-            plotMap()
+            requestRender()
+
+##############################################################################
+
+## This thread creates the map, coalescing the render requests received within renderWindow seconds
+## The map is only created again when the set of active alarms has changed
+class renderScheduler (threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.lastHash = None
+
+    def run(self):
+        global renderStats
+
+        while True:
+            renderRequest.wait()
+            time.sleep(renderWindow)  # further requests within the window are served by the same render
+
+            with lockRender:
+                renderRequest.clear()
+                requestedAt = renderStats["firstRequest"]
+                renderStats["firstRequest"] = None
+
+            ## An error in a render (e.g. an unknown event type or a file that can not be written)
+            ## does not stop the thread: the next request creates the map again
+            try:
+                self.render(requestedAt)
+            except Exception as e:
+                print ("Error when creating the map...")
+                print (e)
+
+    def render(self, requestedAt):
+        global renderStats, debug
+
+        ## The map is created from a copy of the alarms; the MQTT thread keeps updating the list
+        snapshot = alarms.getAlarms()
+
+        ## The snapshot file is saved even when the map is unchanged: refreshed alarms have new times,
+        ## and alarms saved with old times would be removed right away when the EAC restarts
+        if saveSnapshot:
+            writeSnapshot(snapshot)
+
+        currentHash = alarmsHash(snapshot)
+        if currentHash == self.lastHash:
+            renderStats["unchanged"] = renderStats["unchanged"] + 1
+            return
+
+        start = time.monotonic()
+        plotMap(snapshot)
+        end = time.monotonic()
+        self.lastHash = currentHash  # after a failed render, the same alarms are rendered again
+
+        ## The traces of the alarms end when they are in the map
+        renderedMs = int(time.time() * 1000)
+        for ea in snapshot:
+            trace = ea.getTrace()
+            if trace is not None:
+                traceStats.record({"id": trace.get("id"), "hops": trace["hops"] + [["eac.render", renderedMs]]})
+
+        renderStats["renders"] = renderStats["renders"] + 1
+        renderStats["renderTime"] = renderStats["renderTime"] + (end - start)
+        if requestedAt is not None:
+            renderStats["latency"] = renderStats["latency"] + (end - requestedAt)
+
+        if debug:
+            printRenderStats()
+            traceStats.printValues()
+
+##############################################################################
+
+## Ask for the map to be created again (the render itself is done by renderScheduler)
+def requestRender():
+    with lockRender:
+        renderStats["requests"] = renderStats["requests"] + 1
+        if renderStats["firstRequest"] is None:
+            renderStats["firstRequest"] = time.monotonic()
+        renderRequest.set()
+
+##############################################################################
+
+## Hash of the content of the map: position, severity and types of events of all alarms
+def alarmsHash(snapshot):
+    content = sorted((ea.getLatitude(), ea.getLongitude(), ea.getSeverityLevel(), tuple(ea.getEventsInstanceTypes()), tuple(ea.getEventsComplexTypes())) for ea in snapshot)
+    return hashlib.sha1(repr(content).encode()).hexdigest()
+
+##############################################################################
+
+def printRenderStats():
+    renders = renderStats["renders"]
+    print ("Render requests:", renderStats["requests"], ", maps created:", renders, ", unchanged maps skipped:", renderStats["unchanged"])
+    if renders > 0:
+        print ("Average render time (s):", round(renderStats["renderTime"] / renders, 4), ", average update latency (s):", round(renderStats["latency"] / renders, 4))
+
+##############################################################################
+
+## Representation of an alarm for the live dashboard
+def alarmView(key, ea):
+    popup, color = markerFragment(ea.getEventsInstanceTypes(), ea.getEventsComplexTypes(), ea.getSeverityLevel())
+    return {"key": str(key[0]) + "," + str(key[1]), "id": ea.getId(), "la": ea.getLatitude(), "lo": ea.getLongitude(),
+            "sl": ea.getSeverityLevel(), "popup": popup, "color": color}
+
+## Changes of the list of alarms are sent to the live dashboard
+def alarmChanged(kind, key, ea):
+    if liveServer is not None:
+        liveServer.publish(kind, alarmView(key, ea))
+
+## All current alarms, for the viewers that have just connected
+def alarmsSnapshot():
+    return [alarmView((ea.getLatitude(), ea.getLongitude()), ea) for ea in alarms.getAlarms()]
+
+##############################################################################
+
+## Popup text and color of the marker of an alarm
+## They only depend on the types of events and the sl, so they are kept in a cache
+def markerFragment(typesI, typesC, sl):
+    global markerCache, possibleEI, possibleEC
+
+    key = (tuple(typesI), tuple(typesC), sl)
+    fragment = markerCache.get(key)
+    if fragment is not None:
+        return fragment
+
+    descriptions = ""
+
+    # Instance events
+    if len(typesI) > 0:
+        descriptions = "Instance:\n"
+        for y in typesI:
+            descriptions = descriptions + str(possibleEI[y-1][3]) + "\n"
+        
+    # Complex events
+    if len(typesC) > 0:
+        descriptions = descriptions + "Complex:\n"
+        for y in typesC:
+            descriptions = descriptions + str(possibleEC[y-1][1]) + "\n"
+
+    #Different colors for the pins, according to the types of detected events
+    if len(typesI) > 0 and len(typesC) == 0: # there is only instance events
+        color = 'orange'
+    elif len(typesI) == 0 and len(typesC) > 0: # only complex events
+        color = 'darkpurple'
+    else : #both instance and complex events
+        color = 'red'
+
+    fragment = ("SL: " + str(sl) + "\n" + descriptions, color)
+    markerCache[key] = fragment
+    return fragment
+
+##############################################################################
+
+## folium (and its dependencies) takes a long time to load, so it is not imported at startup
+## The EAC connects to the Broker and receives the alarms while it is loaded by the first map (see main)
+def loadFolium():
+    global folium, HeatMap
+
+    if folium is None:
+        import folium.plugins
+        HeatMap = folium.plugins.HeatMap
 
 ##############################################################################
 
 ## This function creates the HTML map according to the list of active EAs
-def plotMap():
+## snapshot is a copy of the list of alarms, so new EA are handled while the map is being created
+def plotMap(snapshot=None):
     global alarms, mapGPS, zoomSize, requestEA, possibleEI, possibleEC, debug
 
-    ## Requesting block for the use of this method
-    lock = threading.Lock()
-    lock.acquire()
-    
-    ## Map to be created
-    map = folium.Map(location=[mapGPS.la, mapGPS.lo], zoom_start=zoomSize, control_scale=True)
-
-    ## Plot all alarms in the created map
-    for ea in alarms.getAlarms():
-        descriptions = ""
- 
-        # Instance events
-        typesI = ea.getEventsInstanceTypes()
-        if len(typesI) > 0:
-            descriptions = "Instance:\n"
-            for y in typesI:
-                descriptions = descriptions + str(possibleEI[y-1][3]) + "\n"
-            
-        # Complex events
-        typesC = ea.getEventsComplexTypes()
-        if len(typesC) > 0:
-            descriptions = descriptions + "Complex:\n"
-            for y in typesC:
-                descriptions = descriptions + str(possibleEC[y-1][1]) + "\n"
-    
-        #Different colors for the pins, according to the types of detected events
-        if len(typesI) > 0 and len(typesC) == 0: # there is only instance events
-            folium.Marker(
-                location=[ea.getLatitude(),ea.getLongitude()],
-                popup= "SL: " + str(ea.getSeverityLevel()) + "\n" + descriptions,
-                icon=folium.Icon(color='orange', icon="info", prefix='fa'),
-            ).add_to(map)
-        elif len(typesI) == 0 and len(typesC) > 0: # only complex events
-            folium.Marker(
-                location=[ea.getLatitude(),ea.getLongitude()],
-                popup= "SL: " + str(ea.getSeverityLevel())  + "\n" +  descriptions,
-                icon=folium.Icon(color='darkpurple', icon='info', prefix='fa'),
-            ).add_to(map)
-        else : #both instance and complex events
+    if snapshot is None:
+        snapshot = alarms.getAlarms()
+
+    ## Requesting block for the use of this method (released even if the creation fails)
+    with lockPlot:
+        loadFolium()
+
+        ## Map to be created
+        map = folium.Map(location=[mapGPS.la, mapGPS.lo], zoom_start=zoomSize, control_scale=True)
+
+        current = snapshot
+
+        ## Large sets of alarms are aggregated in clusters (only alarms with high sl keep their markers)
+        if clusterMode:
+            current = plotClusters(map, current)
+
+        if heatmapLayer:
+            HeatMap([[ea.getLatitude(), ea.getLongitude(), ea.getSeverityLevel() / 100.0] for ea in snapshot], name="Severity").add_to(map)
+            folium.LayerControl().add_to(map)
+
+        ## Plot all alarms in the created map
+        for ea in current:
+            popup, color = markerFragment(ea.getEventsInstanceTypes(), ea.getEventsComplexTypes(), ea.getSeverityLevel())
+
             folium.Marker(
                 location=[ea.getLatitude(),ea.getLongitude()],
-                popup= "SL: " + str(ea.getSeverityLevel())  + "\n" + descriptions,
-                icon=folium.Icon(color='red', icon='info', prefix='fa'),
+                popup=popup,
+                icon=folium.Icon(color=color, icon='info', prefix='fa'),
             ).add_to(map)
             
-    ## Creating the html file
-    map.save(requestEA + ".html")
+        ## Creating the html file
+        ## It is written to a temporary file and then renamed, so readers never see a partial map
+        temporary = mapFileName(mapName) + ".tmp"
+        map.save(temporary)
+        os.replace(temporary, mapFileName(mapName))
 
-    if debug:
-        print ("Creating new MAP with all received emergency alarms")
+        if debug:
+            print ("Creating new MAP with all received emergency alarms")
+            print ("Alarms:", len(snapshot), ", markers:", len(current), ", HTML size (bytes):", os.path.getsize(mapFileName(mapName)))
 
-    ## Releasing this method to be used by other thread
-    lock.release()
+##############################################################################
+
+## Alarms of the clusters: drawn by the browser from a list of [latitude, longitude, popup, color, sl]
+clusterCallback = """
+function callback(row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {radius: 7, color: row[3], fillOpacity: 0.7, sl: row[4]});
+    marker.bindPopup(row[2]);
+    return marker;
+}"""
+
+## Each cluster is a circle with the number of alarms and their highest sl
+clusterIcon = """
+function(cluster) {
+    var markers = cluster.getAllChildMarkers();
+    var sl = 0;
+    for (var i = 0; i < markers.length; i++) {
+        sl = Math.max(sl, markers[i].options.sl);
+    }
+    var size = cluster.getChildCount() < 100 ? "small" : (cluster.getChildCount() < 1000 ? "medium" : "large");
+    return L.divIcon({html: "<div><span>" + cluster.getChildCount() + "<br>SL " + sl + "</span></div>",
+                      className: "marker-cluster marker-cluster-" + size, iconSize: new L.Point(44, 44)});
+}"""
+
+## Aggregate the alarms in clusters, computed by the browser (Leaflet.markercluster) at each zoom
+## Zooming in splits the clusters, and from clusterZoom on all alarms are shown individually
+## Returns the alarms that still need their own marker: alarms with high sl
+def plotClusters(map, current):
+    global clusterCells, clusterZoom, clusterSL
+
+    individual = []
+    data = []
+    for ea in current:
+        sl = ea.getSeverityLevel()
+        if sl >= clusterSL:
+            individual.append(ea)
+            continue
+
+        popup, color = markerFragment(ea.getEventsInstanceTypes(), ea.getEventsComplexTypes(), sl)
+        data.append([ea.getLatitude(), ea.getLongitude(), popup, color, sl])
+
+    if len(data) > 0:
+        folium.plugins.FastMarkerCluster(data, callback=clusterCallback, name="Alarms", icon_create_function=clusterIcon,
+                                         maxClusterRadius=256 // clusterCells, disableClusteringAtZoom=clusterZoom).add_to(map)
+
+    return individual
+
+##############################################################################
+
+## Name of the HTML file of the map
+## Topics with levels or wildcards (e.g. "EPU_CityAlarmCamera_1/+/e/z/3/#") are converted to a valid file name
+def mapFileName(topic):
+    name = topic.replace("/", "_").replace("+", "any").replace("#", "all")
+    return name + ".html"
+
+## Name of the snapshot file with the current alarms
+def snapshotFileName(topic):
+    return mapFileName(topic)[:-len(".html")] + ".snapshot.json"
+
+##############################################################################
+
+## Save all active alarms, so the next execution of the EAC starts with them
+def writeSnapshot(snapshot):
+    global requestEA
+
+    try:
+        temporary = snapshotFileName(mapName) + ".tmp"
+        with open(temporary, "w") as f:
+            f.write("[" + ",".join(encodeEA(ea) for ea in snapshot) + "]")
+        os.replace(temporary, snapshotFileName(mapName))
+    except OSError as e:
+        print ("Error when saving the snapshot of alarms...")
+        print (e)
+
+##############################################################################
+
+## Load the alarms of the last execution of the EAC. Old alarms are removed right away
+def readSnapshot():
+    global alarms, requestEA, refreshTime, debug
+
+    try:
+        with open(snapshotFileName(mapName)) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    for parsed_data in snapshot:
+        ea = decodeEA(parsed_data)
+        ea.setTrace(None)  # latencies of the last execution are not measured again
+        alarms.putAlarm(ea, debug)
+
+    alarms.updateAlarms(refreshTime, debug)
+
+    if debug:
+        print ("Loaded", len(alarms.getAlarms()), "alarms from the snapshot file")
 
 ##############################################################################
 
 def on_connect(client, userdata, flags, rc):
-    global debug, ipBroker
+    global debug, ipBroker, topicsEA, retainedEA
 
     if debug:
         print("Connected to the MQTT Broker:", ipBroker)
 
+    ## Subscribing here renews the subscriptions after a reconnection
+    ## (and the retained alarms are received again)
+    for topic in topicsEA:
+        client.subscribe(topic)
+
+        if debug:
+            print("Subscribing to the MQTT Broker with topic:", topic)
+
+        ## Active alarms of the EPU, kept by the Broker as retained messages
+        if retainedEA and "#" not in topic and "+" not in topic:
+            client.subscribe(topic + "/active/+")
+
+            if debug:
+                print("Subscribing to the MQTT Broker with topic:", topic + "/active/+")
+
 ##############################################################################
 
 def on_disconnect(client, userdata, rc):
@@ -169,10 +480,54 @@ def on_disconnect(client, userdata, rc):
 ##############################################################################
 
 def on_message(client, userdata, message):
+    global decodeQueues
+
+    ## Live EA are also published to requestEA/active/<incident>, and they were already received in requestEA
+    ## Only the retained messages, sent by the Broker when subscribing, are new alarms
+    if "/active/" in message.topic and not message.retain:
+        return
+
+    if len(decodeQueues) > 0:
+        ## Sharding by EPU (first level of the topic)
+        shard = hash(epuNamespace(message.topic)) % len(decodeQueues)
+        decodeQueues[shard].put((message.topic, message.payload, message.retain))
+    else:
+        handleMessage(message.topic, message.payload, message.retain)
+
+##############################################################################
+
+## Thread of the pool that decodes the received EA
+class decodeWorker (threading.Thread):
+
+    def __init__(self, q):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.queue = q
+
+    def run(self):
+        while True:
+            topic, payload, retained = self.queue.get()
+            handleMessage(topic, payload, retained)
+
+##############################################################################
+
+## EPU that published the topic, used as namespace for the ids of its EA
+def epuNamespace(topic):
+    return topic.split("/")[0]
+
+##############################################################################
+
+## retained: the EA was published before the subscription (retained message of an active alarm)
+def handleMessage(topic, payload, retained=False):
     global debug, alarms
 
     ## Received message (alarm) from the MQTT broker
-    received = message.payload.decode()
+    received = payload.decode()
+
+    ## Empty retained message: the incident has expired in the EPU
+    ## It is removed from the map when it is not refreshed anymore
+    if received == "":
+        return
 
     if debug:
         print("Received Emergency Alarm:")
@@ -180,22 +535,19 @@ def on_message(client, userdata, message):
 
     try:
         ## Reconstructing the EA
-        parsed_data = json.loads(received)
-        ea = EA(parsed_data["id"], parsed_data["timestamp"], parsed_data["gps"]["la"],parsed_data["gps"]["lo"])
-        ea.setSeverityLevel(parsed_data["sl"])
-        typesI = parsed_data["typesInstance"]
-        typesC = parsed_data["typesComplex"]
+        ea = decodeEA(received)
+        ea.setId(epuNamespace(topic) + ":" + str(ea.getId()))
+        if retained:
+            ea.setTrace(None)  # the time since its publication is not a latency of the pipeline
+        ea.addHop("eac.receive")
 
-        # insert the detected events in the EA 
-        for y in typesI:
-            ea.putEventInstance(y)
-        for w in typesC:
-            ea.putEventComplex(w)
+        if debug and ea.getEpochMs() is not None:
+            print("Time since the ER was created (ms):", int(time.time() * 1000) - ea.getEpochMs())
 
         ## Inserting (updating) alarm
         alarms.putAlarm(ea, debug)
 
-        plotMap()
+        requestRender()
 
     except Exception as e:
         print ("Error when processing EA...")
@@ -214,14 +566,14 @@ def exit_handler():
 
 ## Main code of the EAC_Map
 def main(argv):
-    global requestEA, ipBroker, debug
+    global requestEA, ipBroker, debug, retainedEA, renderWindow, livePort, liveServer, clusterMode, heatmapLayer, topicsEA, mapName, decodeWorkers, decodeQueues
 
     ## Parse arguments from the command-line
     ## Options: debug idU ipEPU portEPU
-    opts, ars = getopt.getopt(argv, "hd:i:m:", ["debug=", "ipBroker=", "requestEA="])
+    opts, ars = getopt.getopt(argv, "hd:i:m:r:w:s:c:t:o:k:", ["debug=", "ipBroker=", "requestEA=", "retained=", "renderWindow=", "livePort=", "cluster=", "heatmap=", "mapName=", "workers="])
     for opt, arg in opts:
         if opt == "-h":
-            print("edu.py -d <debug> -i <ipBroker> -m <requestEA>")
+            print("eacMap.py -d <debug> -i <ipBroker> -m <requestEA> -r <retained> -w <renderWindow> -s <livePort> -c <cluster> -t <heatmap> -o <mapName> -k <workers>")
             sys.exit(1)
         elif opt in ("-d", "--debug"):
             if arg == "True":
@@ -232,11 +584,51 @@ def main(argv):
             ipBroker = arg
         elif opt in ("-m", "--requestEA"):
             requestEA = arg
+        elif opt in ("-r", "--retained"):
+            if arg == "True":
+                retainedEA = True
+            else:
+                retainedEA = False
+        elif opt in ("-w", "--renderWindow"):
+            renderWindow = float(arg)
+        elif opt in ("-s", "--livePort"):
+            livePort = int(arg)
+        elif opt in ("-c", "--cluster"):
+            clusterMode = (arg == "True")
+        elif opt in ("-t", "--heatmap"):
+            heatmapLayer = (arg == "True")
+        elif opt in ("-o", "--mapName"):
+            mapName = arg
+        elif opt in ("-k", "--workers"):
+            decodeWorkers = int(arg)
     ########
 
+    ## Topics of all followed EPUs, merged in a single map
+    topicsEA = [topic.strip() for topic in requestEA.split(",") if topic.strip() != ""]
+    if mapName is None:
+        if len(topicsEA) == 1:
+            mapName = topicsEA[0]
+        else:
+            mapName = "CityAlarmCamera_consolidated"
+
     if debug:
         print("Initializing the EAC for emergencies visualization...")
 
+    ## The live dashboard is started before the alarms are loaded, so all of them are sent to viewers
+    ## It is optional (server-sent events), so its module (and the HTTP server) is only loaded when enabled
+    if livePort > 0:
+        from liveServer import LiveServer
+        liveServer = LiveServer(livePort, alarmsSnapshot, mapGPS.la, mapGPS.lo, zoomSize)
+        liveServer.start()
+
+        if debug:
+            print("Live dashboard available at http://localhost:" + str(livePort) + "/")
+
+    ## The map starts with the alarms known by the last execution
+    ## It is created by the render thread, started after the connection, so folium is loaded while the EAC is connected
+    readSnapshot()
+    requestRender()
+
     ## MQTT subscriptions and initial configuration
     clientmqtt = mqtt.Client("")
     clientmqtt.on_connect = on_connect
@@ -244,14 +636,18 @@ def main(argv):
     clientmqtt.on_message = on_message
 
     clientmqtt.connect(ipBroker)
-    clientmqtt.subscribe(requestEA)
 
-    if debug:
-        print("Subscribing to the MQTT Broker with topic:", requestEA)
+    ## Pool of threads to decode the received EA
+    for i in range(decodeWorkers):
+        decodeQueues.append(queue.Queue())
+        decodeWorker(decodeQueues[i]).start()
 
     ## It is used to update the current detected EA in the map
     mapRefresher().start()
 
+    ## Maps are created by this thread
+    renderScheduler().start()
+
     atexit.register(exit_handler)
 
     ## Keep receiving MQTT messages indefinitely
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Replay and benchmark harness for the EAC
+# Recorded or synthetic EA are delivered to on_message of eacMap.py, without an MQTT Broker,
+# at a configurable rate (possibly faster than real time). The handling time of each message,
+# the creation of the maps (frequency, duration and HTML size) and the memory are measured,
+# and a JSON report is written for regression tracking
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import time
+import os
+import sys, getopt
+import json
+import random
+import resource
+import tracemalloc
+
+## The EAC being measured
+import eacMap
+
+##############################################################################
+
+## Recorded stream: a file with one JSON object per line, either an EA (as published by the EPU) or
+## {"t": seconds since the start of the recording, "topic": MQTT topic, "payload": EA}
+## Without a file, synthetic EA are generated
+replayFile = None
+defaultTopic = "EPU_CityAlarmCamera_1"
+
+## Synthetic stream
+numberEA = 10000  # number of EA
+numberEPU = 1  # EA are distributed among EPU_CityAlarmCamera_1..n
+numberLocations = 500  # distinct positions of EDUs (refreshes of the same position update the alarm)
+
+## Rate of delivery (EA per second). 0 delivers as fast as possible
+## For recorded streams with "t", speed multiplies the original pace when no rate is given
+rate = 0.0
+speed = 1.0
+
+## Configuration of the EAC during the replay
+renderWindow = 1.0
+decodeWorkers = 0
+traceMemory = False  # tracemalloc is precise, but it slows down the EAC
+
+reportFile = "eacReplay_report.json"
+
+## Measurements
+handlingTimes = []
+renderTimes = []
+htmlSizes = []
+memorySamples = []  # [messages delivered, max resident memory (KB), traced memory (bytes)]
+
+##############################################################################
+
+## Message with the same attributes used by on_message
+class ReplayMessage():
+    def __init__(self, topic, payload, retain=False):
+        self.topic = topic
+        self.payload = payload
+        self.retain = retain
+
+##############################################################################
+
+## Recorded traces have the times of the recording, and their latencies would include the time since then
+def withoutTrace(payload):
+    try:
+        ea = json.loads(payload) if isinstance(payload, str) else payload
+    except ValueError:
+        return payload  # invalid EA are also replayed (the EAC reports them)
+    if isinstance(ea, dict):
+        ea.pop("trace", None)
+    return json.dumps(ea)
+
+## Recorded messages as (time offset or None, topic, payload)
+def readStream(path):
+    stream = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line == "":
+                continue
+            data = json.loads(line)
+            if "payload" in data:
+                payload = withoutTrace(data["payload"])
+                stream.append((data.get("t"), data.get("topic", defaultTopic), payload.encode("utf-8")))
+            else:
+                stream.append((None, defaultTopic, withoutTrace(line).encode("utf-8")))
+    return stream
+
+## Synthetic messages, around the center of the map
+def syntheticStream():
+    random.seed(1)
+    locations = [(eacMap.mapGPS.la + random.uniform(-0.05, 0.05), eacMap.mapGPS.lo + random.uniform(-0.05, 0.05)) for i in range(numberLocations)]
+    ids = [0] * numberEPU
+
+    stream = []
+    for i in range(numberEA):
+        epu = i % numberEPU
+        ids[epu] = ids[epu] + 1
+        la, lo = random.choice(locations)
+
+        typesInstance = random.sample(range(1, 17), random.randint(0, 3))
+        typesComplex = [1] if random.random() < 0.2 or len(typesInstance) == 0 else []
+
+        ms = int(time.time() * 1000)
+        ea = {"id": ids[epu], "timestamp": time.ctime(), "epochMs": ms, "gps": {"la": la, "lo": lo}, "sl": random.randint(10, 100),
+              "typesInstance": typesInstance, "typesComplex": typesComplex,
+              "trace": {"id": str(i), "hops": [["edu.sense", ms], ["epu.publish", ms]]}}
+        stream.append((None, "EPU_CityAlarmCamera_" + str(epu + 1), json.dumps(ea).encode("utf-8")))
+    return stream
+
+##############################################################################
+
+## plotMap of the EAC, measuring each creation of the map
+originalPlotMap = eacMap.plotMap
+
+def measuredPlotMap(snapshot=None):
+    start = time.perf_counter()
+    originalPlotMap(snapshot)
+    renderTimes.append(time.perf_counter() - start)
+
+    try:
+        htmlSizes.append(os.path.getsize(eacMap.mapFileName(eacMap.mapName)))
+    except OSError:
+        pass
+
+##############################################################################
+
+def sampleMemory(delivered):
+    traced = tracemalloc.get_traced_memory()[0] if traceMemory else None
+    memorySamples.append([delivered, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, traced])
+
+##############################################################################
+
+def percentile(values, p):
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(p / 100.0 * len(ordered)))]
+
+def summary(values):
+    if len(values) == 0:
+        return {"count": 0}
+    return {"count": len(values), "mean": sum(values) / len(values), "p50": percentile(values, 50),
+            "p95": percentile(values, 95), "p99": percentile(values, 99), "max": max(values)}
+
+##############################################################################
+
+def replay(stream):
+    ## Deliver all messages, keeping the requested pace
+    start = time.monotonic()
+    firstOffset = None
+    for n, (offset, topic, payload) in enumerate(stream):
+        if rate > 0:
+            due = start + n / rate
+        elif offset is not None:
+            if firstOffset is None:
+                firstOffset = offset
+            due = start + (offset - firstOffset) / speed
+        else:
+            due = None
+
+        if due is not None:
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+        t = time.perf_counter()
+        eacMap.on_message(None, None, ReplayMessage(topic, payload))
+        handlingTimes.append(time.perf_counter() - t)
+
+        if n % 1000 == 0:
+            sampleMemory(n)
+
+    delivered = time.monotonic() - start
+
+    ## Waiting for the decoding threads and for the last map
+    for q in eacMap.decodeQueues:
+        while not q.empty():
+            time.sleep(0.01)
+    time.sleep(renderWindow * 2 + 0.5)
+    while eacMap.renderRequest.is_set():
+        time.sleep(0.1)
+
+    sampleMemory(len(stream))
+    return delivered, time.monotonic() - start
+
+##############################################################################
+
+def main(argv):
+    global replayFile, numberEA, numberEPU, numberLocations, rate, speed, renderWindow, decodeWorkers, traceMemory, reportFile
+
+    ## Parse arguments from the command-line
+    opts, ars = getopt.getopt(argv, "hf:n:e:l:r:x:w:k:m:o:", ["file=", "number=", "epus=", "locations=", "rate=", "speed=", "renderWindow=", "workers=", "memory=", "report="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("eacReplay.py -f <file> -n <numberEA> -e <numberEPU> -l <locations> -r <rate> -x <speed> -w <renderWindow> -k <workers> -m <traceMemory> -o <report>")
+            sys.exit(1)
+        elif opt in ("-f", "--file"):
+            replayFile = arg
+        elif opt in ("-n", "--number"):
+            numberEA = int(arg)
+        elif opt in ("-e", "--epus"):
+            numberEPU = int(arg)
+        elif opt in ("-l", "--locations"):
+            numberLocations = int(arg)
+        elif opt in ("-r", "--rate"):
+            rate = float(arg)
+        elif opt in ("-x", "--speed"):
+            speed = float(arg)
+        elif opt in ("-w", "--renderWindow"):
+            renderWindow = float(arg)
+        elif opt in ("-k", "--workers"):
+            decodeWorkers = int(arg)
+        elif opt in ("-m", "--memory"):
+            traceMemory = (arg == "True")
+        elif opt in ("-o", "--report"):
+            reportFile = arg
+    ########
+
+    if replayFile is not None:
+        stream = readStream(replayFile)
+    else:
+        stream = syntheticStream()
+
+    ## The EAC is configured as in its main(), but without the MQTT Broker
+    eacMap.debug = False
+    eacMap.saveSnapshot = False
+    eacMap.renderWindow = renderWindow
+    eacMap.mapName = "eacReplay"
+    eacMap.plotMap = measuredPlotMap
+    for i in range(decodeWorkers):
+        eacMap.decodeQueues.append(eacMap.queue.Queue())
+        eacMap.decodeWorker(eacMap.decodeQueues[i]).start()
+    eacMap.renderScheduler().start()
+
+    if traceMemory:
+        tracemalloc.start()
+
+    print("Replaying", len(stream), "EA...")
+    delivered, total = replay(stream)
+
+    report = {
+        "messages": len(stream),
+        "deliveryTime": delivered,
+        "totalTime": total,
+        "messagesPerSecond": len(stream) / delivered if delivered > 0 else None,
+        "handling": summary(handlingTimes),
+        "renders": summary(renderTimes),
+        "rendersPerSecond": len(renderTimes) / total if total > 0 else None,
+        "renderRequests": eacMap.renderStats["requests"],
+        "unchangedRenders": eacMap.renderStats["unchanged"],
+        "htmlSize": summary(htmlSizes),
+        "activeAlarms": len(eacMap.alarms.getAlarms()),
+        "traces": eacMap.traceStats.getPercentiles(),
+        "memory": memorySamples,
+        "configuration": {"file": replayFile, "rate": rate, "speed": speed, "renderWindow": renderWindow,
+                          "workers": decodeWorkers, "epus": numberEPU, "locations": numberLocations},
+    }
+
+    with open(reportFile, "w") as f:
+        json.dump(report, f, indent=4)
+
+    print("Messages per second:", report["messagesPerSecond"])
+    print("Handling time (s): p50 =", report["handling"]["p50"], ", p99 =", report["handling"]["p99"])
+    print("Maps created:", len(renderTimes), ", average render time (s):", report["renders"].get("mean"))
+    print("Report written to", reportFile)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
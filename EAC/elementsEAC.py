@@ -6,114 +6,106 @@
 # *********************************************************************
 
 import time, datetime
+import heapq
+import threading
+import os, sys
+
+## The EA and its JSON conversion are shared by all units (../common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from cityAlarmModel import EA, GPS, encodeEA, decodeEA, validTrace
 
 ##############################################################################
 
 ## Implements the idea of a list of Emergency Alarms
+## Alarms are indexed by the position of the EDU, and a heap ordered by the time of the
+## alarms allows the removal of old alarms without checking the whole list
 class ListEA:
 
-    def __init__(self):
-        self.alarms = []
-
-    ## Insert a new EA into the list only if it comes from an unreported EDU
-    def putAlarm(self, ea, debug):
-
-        lat = ea.getLatitude()
-        lon = ea.getLongitude()
+    ## listener: optional function called for every change, as listener(kind, key, ea),
+    ## with kind being "add", "update" or "remove"
+    def __init__(self, listener=None):
+        self.listener = listener
+        self.alarms = {}  # (latitude, longitude) -> EA
+        self.times = {}  # (latitude, longitude) -> time of the EA (seconds since the epoch)
+        self.expiration = []  # heap of [time of the EA, (latitude, longitude)]
 
-        control = True
-        ## Only insert new EA for new coordinates
-        for alarm in self.alarms:
-            if alarm.getLatitude() == lat and alarm.getLongitude() == lon:  ## Refresh alarm
-                self.alarms.remove(alarm)
-                self.alarms.append(ea)
-                control = False
-                if debug:
-                    print("Removing old EA and inserting updated alarm...")
+        ## The list is changed by the MQTT thread and read by the thread that creates the map
+        ## The listener is always called without this lock
+        self.lock = threading.Lock()
 
-        if control:
-            if debug:
-                print ("Inserting new EA into the list...")
-            self.alarms.append(ea)
-
-    ## Remove old (not refreshed) EA
-    def updateAlarms(self, maxTime, debug):
+    ## Insert a new EA, or refresh the EA already reported by the same EDU (same coordinates)
+    def putAlarm(self, ea, debug):
 
-        t = datetime.datetime.strptime(time.ctime(), "%a %b %d %H:%M:%S %Y")
-        now = t.timestamp()  # current absolute time (seconds)
+        key = (ea.getLatitude(), ea.getLongitude())
 
-        for alarm in self.alarms:
-            alarmTime = datetime.datetime.strptime(alarm.getTimestamp(), "%a %b %d %H:%M:%S %Y").timestamp()
+        ## The time of the EA in seconds. Only EA from older EPUs have to be parsed (once, when received)
+        if ea.getEpochMs() is not None:
+            alarmTime = ea.getEpochMs() / 1000.0
+        else:
+            alarmTime = parseTimestamp(ea.getTimestamp())
 
-            if (now - alarmTime) > maxTime:  ## Old EA. Remove it
-                self.alarms.remove(alarm)
-                if debug:
-                    print ("Removing old EA with id:", alarm.getId())
+        with self.lock:
+            if key in self.alarms:
+                kind = "update"
+            else:
+                kind = "add"
 
-    def getAlarms(self):
-        return self.alarms
+            self.alarms[key] = ea
+            self.times[key] = alarmTime
+            heapq.heappush(self.expiration, (alarmTime, key))
 
-    def printValues(self):
-        for ea in self.alarms:
-           print("Id:", ea.getId(), ": Latitude =", ea.getLatitude(), ": Longitude =", ea.getLongitude(), ": Severity =", ea.getSeverityLevel())
+        if debug:
+            if kind == "update":
+                print("Removing old EA and inserting updated alarm...")
+            else:
+                print ("Inserting new EA into the list...")
 
-##############################################################################
+        if self.listener is not None:
+            self.listener(kind, key, ea)
 
-## Definition of an Emergency Alarm
-class EA():
-    def __init__(self, i, ts, latitude, longitude):
-        self.id = i
-        self.gps = GPS(latitude,longitude)
-        self.timestamp = ts
-        self.typesInstance = []
-        self.typesComplex = []
-        self.sl = 0
+    ## Remove old (not refreshed) EA
+    def updateAlarms(self, maxTime, debug):
 
-    def getLatitude (self):
-        return self.gps.la
+        now = time.time()  # current absolute time (seconds)
+        removed = []
 
-    def getLongitude (self):
-        return self.gps.lo
+        with self.lock:
+            while len(self.expiration) > 0 and (now - self.expiration[0][0]) > maxTime:
+                alarmTime, key = heapq.heappop(self.expiration)
 
-    def putEventInstance(self, y):
-        self.typesInstance.append(y)
-    
-    def putEventComplex(self, y):
-        self.typesComplex.append(y)
+                ## Entries of refreshed alarms are outdated and only discarded
+                if self.times.get(key) != alarmTime:
+                    continue
 
-    def getEventsInstanceTypes (self):
-        return self.typesInstance
-    
-    def getEventsComplexTypes (self):
-        return self.typesComplex
+                removed.append((key, self.alarms.pop(key)))
+                del self.times[key]
 
-    def setSeverityLevel(self, sev):
-        self.sl = sev
+            ## Outdated entries are also removed when they are too many
+            if len(self.expiration) > 2 * len(self.alarms) + 64:
+                self.expiration = [(t, key) for key, t in self.times.items()]
+                heapq.heapify(self.expiration)
 
-    def getSeverityLevel (self):
-        return self.sl
+        for key, alarm in removed:
+            if debug:
+                print ("Removing old EA with id:", alarm.getId())
 
-    def getId(self):
-        return self.id
+            if self.listener is not None:
+                self.listener("remove", key, alarm)
 
-    def getTimestamp(self):
-        return self.timestamp
+    ## Copy of the current alarms, which is not changed by new EA
+    def getAlarms(self):
+        with self.lock:
+            return list(self.alarms.values())
 
     def printValues(self):
-        print ("EA id:",self.id,", Timestamp:",self.timestamp,", Latitude:",self.gps.la,", Longitude:",self.gps.lo, " SL:", self.sl)
-        print ("This EA has the following EI types:")
-        for e in self.typesInstance:
-            print ("Type:", e)
-        print ("This EA has the following EC types:")
-        for e in self.typesComplex:
-            print ("Type:", e)
-
-    def toJSON(self):
-        return json.dumps(self,default=lambda o: o.__dict__,sort_keys=True, indent=4)
+        for ea in self.getAlarms():
+           print("Id:", ea.getId(), ": Latitude =", ea.getLatitude(), ": Longitude =", ea.getLongitude(), ": Severity =", ea.getSeverityLevel())
 
 ##############################################################################
 
-class GPS():
-    def __init__(self, latitude, longitude):
-        self.la = latitude
-        self.lo = longitude
+## Convert the timestamp of an EA (time.ctime() format) to seconds since the epoch
+def parseTimestamp(timestamp):
+    try:
+        return datetime.datetime.strptime(timestamp, "%a %b %d %H:%M:%S %Y").timestamp()
+    except (TypeError, ValueError):
+        return time.time()  # unknown format: the reception time is considered
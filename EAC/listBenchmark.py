@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Benchmark of the list of active alarms of the EAC (see ListEA in elementsEAC.py)
+# The current list (dictionary by position and expiration heap) is compared with the
+# previous list (a Python list scanned at each EA), with a given number of active alarms.
+# The time of the insertion of new alarms, of the refresh of existing ones and of the
+# removal of old alarms (with no alarm expired and with all alarms expired) is measured
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import datetime
+import sys, getopt
+import time
+
+from elementsEAC import EA, ListEA
+
+##############################################################################
+
+sizes = [100000]  # numbers of active alarms
+operations = 1000  # inserted and refreshed EA measured with each number of alarms
+maxTime = 300  # seconds to expire an alarm (refreshTime of the EAC)
+
+##############################################################################
+
+## Previous list of alarms of the EAC, kept here to be measured
+class PreviousListEA:
+
+    def __init__(self):
+        self.alarms = []
+
+    def putAlarm(self, ea, debug):
+
+        lat = ea.getLatitude()
+        lon = ea.getLongitude()
+
+        control = True
+        for alarm in self.alarms:
+            if alarm.getLatitude() == lat and alarm.getLongitude() == lon:  ## Refresh alarm
+                self.alarms.remove(alarm)
+                self.alarms.append(ea)
+                control = False
+
+        if control:
+            self.alarms.append(ea)
+
+    def updateAlarms(self, maxTime, debug):
+
+        t = datetime.datetime.strptime(time.ctime(), "%a %b %d %H:%M:%S %Y")
+        now = t.timestamp()
+
+        for alarm in self.alarms:
+            alarmTime = datetime.datetime.strptime(alarm.getTimestamp(), "%a %b %d %H:%M:%S %Y").timestamp()
+
+            if (now - alarmTime) > maxTime:
+                self.alarms.remove(alarm)
+
+    def getAlarms(self):
+        return self.alarms
+
+##############################################################################
+
+## EA of the EDU number i, created seconds ago
+def createEA(i, age=0):
+    t = time.time() - age
+    ea = EA(i, time.ctime(t), 41.0 + (i // 1000) * 0.0001, -8.7 + (i % 1000) * 0.0001, int(t * 1000))
+    ea.putEventInstance(4)
+    ea.setSeverityLevel(50)
+    return ea
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+## Times (s) of: fill, insert (per EA), refresh (per EA), sweep without expired alarms, sweep with all alarms expired
+def measure(alarms, n, previous):
+    ## The previous list takes O(n) for each EA, so it is filled directly
+    if previous:
+        fill = None
+        alarms.alarms = [createEA(i) for i in range(n)]
+    else:
+        fill = timed(lambda: [alarms.putAlarm(createEA(i), False) for i in range(n)])
+
+    newEA = [createEA(n + i) for i in range(operations)]
+    insert = timed(lambda: [alarms.putAlarm(ea, False) for ea in newEA]) / operations
+
+    refreshed = [createEA(i * (n // operations)) for i in range(operations)]
+    refresh = timed(lambda: [alarms.putAlarm(ea, False) for ea in refreshed]) / operations
+
+    sweep = timed(lambda: alarms.updateAlarms(maxTime, False))
+    expired = timed(lambda: alarms.updateAlarms(-maxTime, False))  # every alarm is older than -maxTime
+
+    return fill, insert, refresh, sweep, expired, len(alarms.getAlarms())
+
+def report(name, result):
+    fill, insert, refresh, sweep, expired, remaining = result
+    print("   ", name + ": fill (s) =", "-" if fill is None else round(fill, 3), ", insert (ms per EA) =", round(insert * 1000, 4),
+          ", refresh (ms per EA) =", round(refresh * 1000, 4), ", sweep (s) =", round(sweep, 3),
+          ", sweep with all expired (s) =", round(expired, 3), ", remaining alarms =", remaining)
+
+##############################################################################
+
+def main(argv):
+    global sizes, operations
+
+    opts, ars = getopt.getopt(argv, "hn:k:", ["sizes=", "operations="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("listBenchmark.py -n <numbers of active alarms, e.g. 1000,10000,100000> -k <operations>")
+            sys.exit(1)
+        elif opt in ("-n", "--sizes"):
+            sizes = [int(n) for n in arg.split(",")]
+        elif opt in ("-k", "--operations"):
+            operations = int(arg)
+
+    for n in sizes:
+        print(n, "active alarms,", operations, "inserted and", operations, "refreshed EA:")
+        report("previous list", measure(PreviousListEA(), n, True))
+        report("current list ", measure(ListEA(), n, False))
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Load test of the live dashboard of the EAC (see liveServer.py)
+# Concurrent viewers (in a separate process) connect to /events and receive the full state,
+# and then changes of alarms are published at a given rate. For each number of viewers, the time
+# to receive the state, the delay of the changes, the changes lost and the CPU used by the
+# server to publish are measured
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import sys, getopt
+import json
+import multiprocessing
+import socket
+import threading
+import time
+
+from liveServer import LiveServer
+
+##############################################################################
+
+viewers = [1, 10, 100]  # numbers of concurrent viewers
+numberAlarms = 1000  # alarms in the state sent to each new viewer
+numberEvents = 2000  # published changes
+rate = 500.0  # changes per second
+port = 8899
+viewerTimeout = 30  # seconds without data (idle viewers receive keep-alive comments every 15 s)
+
+##############################################################################
+
+def alarmView(i):
+    return {"key": "%d" % i, "la": 41.1 + (i % 100) * 0.001, "lo": -8.6 - (i // 100) * 0.001,
+            "color": "orange", "popup": "Instance events: fire\nSL: 50", "sent": time.time()}
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+##############################################################################
+
+## A viewer, as the EventSource of the map page. Returns [time to the state (s), delays of the changes (s)]
+## Viewers that cannot connect return no time to the state
+def viewer(results, connected):
+    start = time.time()
+    stateTime = None
+    delays = []
+    try:
+        s = socket.create_connection(("127.0.0.1", port), viewerTimeout)
+        s.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        stream = s.makefile("rb")
+
+        ## Headers of the response
+        while stream.readline() not in (b"\r\n", b"\n", b""):
+            pass
+
+        kind = None
+        while len(delays) < numberEvents:
+            line = stream.readline()
+            if line == b"":
+                break  # disconnected by the server
+            if line.startswith(b"event: "):
+                kind = line[7:].strip()
+            elif line.startswith(b"data: "):
+                if kind == b"reset":
+                    stateTime = time.time() - start
+                    connected.release()
+                else:
+                    delays.append(time.time() - json.loads(line[6:])["sent"])
+        s.close()
+
+    except OSError:
+        pass
+
+    if stateTime is None:
+        connected.release()
+    results.append([stateTime, delays])
+
+## Process with all viewers. The summary is sent through the pipe
+def runViewers(numberViewers, pipe):
+    results = []
+    connected = threading.Semaphore(0)
+    threads = [threading.Thread(target=viewer, args=(results, connected), daemon=True) for i in range(numberViewers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        connected.acquire()
+    pipe.send("connected")
+
+    for t in threads:
+        t.join(60)
+
+    stateTimes = [r[0] for r in results if r[0] is not None]
+    delays = [d for r in results for d in r[1]]
+    pipe.send({"viewers": len(results), "stateTimes": stateTimes, "delays": delays})
+
+##############################################################################
+
+def measure(live, numberViewers):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=runViewers, args=(numberViewers, child))
+    process.start()
+    parent.recv()
+
+    ## Publication of the changes at the given rate
+    cpu = time.process_time()
+    start = time.perf_counter()
+    for i in range(numberEvents):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        live.publish("update", alarmView(i % numberAlarms))
+    publishTime = time.perf_counter() - start
+
+    result = parent.recv()
+    cpu = time.process_time() - cpu  # includes the threads of the server that write to the viewers
+    process.join()
+
+    delays = result["delays"]
+    expected = numberViewers * numberEvents
+    print(numberViewers, "viewers:")
+    print("    viewers connected:", len(result["stateTimes"]), "of", numberViewers)
+    if len(result["stateTimes"]) > 0:
+        print("    time to receive the state of", numberAlarms, "alarms (ms): p50 =", round(percentile(result["stateTimes"], 50) * 1000, 1),
+              ", max =", round(max(result["stateTimes"]) * 1000, 1))
+    if len(delays) > 0:
+        print("    delay of the changes (ms): p50 =", round(percentile(delays, 50) * 1000, 2), ", p99 =", round(percentile(delays, 99) * 1000, 2),
+              ", max =", round(max(delays) * 1000, 2))
+    print("    changes received:", len(delays), "of", expected, ", slow viewers dropped:", live.dropped)
+    print("    CPU of the server (ms per change):", round(cpu * 1000 / numberEvents, 3), ", published at", round(numberEvents / publishTime), "changes/s")
+
+##############################################################################
+
+def main(argv):
+    global viewers, numberAlarms, numberEvents, rate, port
+
+    opts, ars = getopt.getopt(argv, "hv:a:n:r:p:", ["viewers=", "alarms=", "number=", "rate=", "port="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("liveBenchmark.py -v <viewers (e.g. 1,10,100)> -a <numberAlarms> -n <numberEvents> -r <rate> -p <port>")
+            sys.exit(1)
+        elif opt in ("-v", "--viewers"):
+            viewers = [int(v) for v in arg.split(",")]
+        elif opt in ("-a", "--alarms"):
+            numberAlarms = int(arg)
+        elif opt in ("-n", "--number"):
+            numberEvents = int(arg)
+        elif opt in ("-r", "--rate"):
+            rate = float(arg)
+        elif opt in ("-p", "--port"):
+            port = int(arg)
+
+    state = [alarmView(i) for i in range(numberAlarms)]
+    live = LiveServer(port, lambda: state, 41.15, -8.61, 13)
+    live.start()
+
+    print(numberEvents, "changes published at", rate, "changes/s")
+    for n in viewers:
+        measure(live, n)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
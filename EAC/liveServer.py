@@ -0,0 +1,180 @@
+# *********************************************************************
+# Optional live dashboard for the EAC
+# A local HTTP server provides a static map page, which then receives the
+# changes of the alarms (add, update and remove) as server-sent events (SSE)
+# Each change is encoded only once, whatever the number of connected viewers
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import json
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+##############################################################################
+
+## Maximum number of pending events for a viewer. Slower viewers are disconnected
+maxPendingEvents = 1000
+
+## Interval (s) of the keep-alive comments sent to idle viewers
+keepAliveTime = 15
+
+## Pending connections of the HTTP server (the default of 5 resets viewers that connect together, e.g. after a restart)
+connectionBacklog = 128
+
+## The map page. Alarms are received from /events
+pageHTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>CityAlarm - Emergency Alarms</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<style>html, body, #map { height: 100%%; margin: 0; }</style>
+</head>
+<body>
+<div id="map"></div>
+<script>
+var map = L.map("map").setView([%(la)f, %(lo)f], %(zoom)d);
+L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {attribution: "OpenStreetMap"}).addTo(map);
+L.control.scale().addTo(map);
+var markers = {};
+function put(a) {
+    if (markers[a.key]) { map.removeLayer(markers[a.key]); }
+    markers[a.key] = L.circleMarker([a.la, a.lo], {color: a.color, radius: 8, fillOpacity: 0.8})
+        .bindPopup(a.popup.replace(/\\n/g, "<br>")).addTo(map);
+}
+function remove(a) {
+    if (markers[a.key]) { map.removeLayer(markers[a.key]); delete markers[a.key]; }
+}
+var source = new EventSource("/events");
+source.addEventListener("reset", function (e) {
+    for (var k in markers) { map.removeLayer(markers[k]); }
+    markers = {};
+    JSON.parse(e.data).forEach(put);
+});
+source.addEventListener("add", function (e) { put(JSON.parse(e.data)); });
+source.addEventListener("update", function (e) { put(JSON.parse(e.data)); });
+source.addEventListener("remove", function (e) { remove(JSON.parse(e.data)); });
+</script>
+</body>
+</html>
+"""
+
+##############################################################################
+
+## Encode an event in the SSE format
+def encodeEvent(kind, data):
+    return ("event: " + kind + "\ndata: " + json.dumps(data, separators=(",", ":")) + "\n\n").encode("utf-8")
+
+##############################################################################
+
+class LiveHTTPServer(ThreadingHTTPServer):
+    request_queue_size = connectionBacklog
+    daemon_threads = True
+
+##############################################################################
+
+class LiveServer():
+
+    ## snapshot: function returning the views (dictionaries) of all current alarms
+    def __init__(self, port, snapshot, la, lo, zoom):
+        self.port = port
+        self.snapshot = snapshot
+        self.page = (pageHTML % {"la": la, "lo": lo, "zoom": zoom}).encode("utf-8")
+
+        self.viewers = []  # one queue of encoded events per viewer
+        self.lock = threading.Lock()
+
+        ## Counters
+        self.events = 0
+        self.dropped = 0
+
+    def start(self):
+        server = LiveHTTPServer(("", self.port), self.handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ## Send a change (add, update or remove) of an alarm to all viewers
+    ## The event is encoded once and shared by all of them
+    def publish(self, kind, view):
+        event = encodeEvent(kind, view)
+
+        with self.lock:
+            self.events = self.events + 1
+            for viewer in list(self.viewers):
+                if viewer.qsize() < maxPendingEvents:
+                    viewer.put_nowait(event)
+                else:
+                    ## The viewer is too slow. It is disconnected and it will reconnect with a full snapshot
+                    ## (the extra position of the queue is reserved for this)
+                    self.viewers.remove(viewer)
+                    viewer.put_nowait(None)
+                    self.dropped = self.dropped + 1
+
+    def addViewer(self):
+        viewer = queue.Queue(maxPendingEvents + 1)
+        ## The current state is sent first; later changes follow in order
+        with self.lock:
+            viewer.put_nowait(encodeEvent("reset", self.snapshot()))
+            self.viewers.append(viewer)
+        return viewer
+
+    def removeViewer(self, viewer):
+        with self.lock:
+            if viewer in self.viewers:
+                self.viewers.remove(viewer)
+
+    def getViewers(self):
+        return len(self.viewers)
+
+    def printValues(self):
+        print ("Live viewers:", len(self.viewers), ", published changes:", self.events, ", slow viewers dropped:", self.dropped)
+
+    ## Request handler bound to this server
+    def handler(self):
+        live = self
+
+        class LiveHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == "/":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(live.page)))
+                    self.end_headers()
+                    self.wfile.write(live.page)
+
+                elif self.path == "/events":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Cache-Control", "no-cache")
+                    self.end_headers()
+                    self.stream(live.addViewer())
+
+                else:
+                    self.send_error(404)
+
+            def stream(self, viewer):
+                try:
+                    while True:
+                        try:
+                            event = viewer.get(timeout=keepAliveTime)
+                        except queue.Empty:
+                            event = b": keep-alive\n\n"
+
+                        if event is None:
+                            break
+                        self.wfile.write(event)
+                        self.wfile.flush()
+
+                except OSError:
+                    pass  # the viewer has disconnected
+
+                live.removeViewer(viewer)
+
+            def log_message(self, format, *args):
+                pass
+
+        return LiveHandler
@@ -0,0 +1,76 @@
+# *********************************************************************
+# Aggregation of the traces of the alarms in the EAC
+# Each trace has the time of every stage, from the reading of the sensors in the EDU
+# to the creation of the map in the EAC. The latency between consecutive stages (hops)
+# is kept in rolling windows, presented as percentiles
+# Times are taken from the clocks of the different units, which should be synchronized (NTP)
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date         : 12/05/2020
+# *********************************************************************
+
+import collections
+import threading
+
+from elementsEAC import validTrace
+
+##############################################################################
+
+## Number of latencies kept for each hop
+windowSize = 1000
+
+## Number of trace ids remembered, so a trace is only counted once
+maxRecorded = 10000
+
+##############################################################################
+
+class TraceStats():
+
+    def __init__(self):
+        self.hops = collections.OrderedDict()  # "stage -> stage" -> deque of latencies (ms)
+        self.recorded = collections.OrderedDict()  # trace id -> None
+        self.lock = threading.Lock()
+
+    ## Record a complete trace ({"id": ..., "hops": [[stage, ms], ...]})
+    ## Returns False if the trace was already recorded (or if it is malformed)
+    def record(self, trace):
+        if validTrace(trace) is None:
+            return False
+        hops = trace["hops"]
+        if len(hops) < 2:
+            return False
+
+        with self.lock:
+            if trace.get("id") in self.recorded:
+                return False
+            self.recorded[trace.get("id")] = None
+            if len(self.recorded) > maxRecorded:
+                self.recorded.popitem(last=False)
+
+            for i in range(1, len(hops)):
+                self.add(hops[i - 1][0] + " -> " + hops[i][0], hops[i][1] - hops[i - 1][1])
+            self.add("total (" + hops[0][0] + " -> " + hops[-1][0] + ")", hops[-1][1] - hops[0][1])
+
+        return True
+
+    def add(self, name, latency):
+        window = self.hops.get(name)
+        if window is None:
+            window = collections.deque(maxlen=windowSize)
+            self.hops[name] = window
+        window.append(latency)
+
+    ## Percentiles (ms) of the latency of each hop
+    def getPercentiles(self):
+        result = {}
+        with self.lock:
+            for name, window in self.hops.items():
+                ordered = sorted(window)
+                n = len(ordered)
+                result[name] = {"count": n, "p50": ordered[n // 2], "p95": ordered[min(n - 1, n * 95 // 100)],
+                                "p99": ordered[min(n - 1, n * 99 // 100)], "max": ordered[-1]}
+        return result
+
+    def printValues(self):
+        for name, p in self.getPercentiles().items():
+            print ("Latency of", name, "(ms): p50 =", p["p50"], ", p95 =", p["p95"], ", p99 =", p["p99"], ", max =", p["max"], ", samples =", p["count"])
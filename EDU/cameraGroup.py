@@ -0,0 +1,177 @@
+# **************************************************
+# Group of cameras of an EDU, used as a single camera (detect, getFirePixels, getFrame)
+# The cameras are listed in a CSV file, each one with its own calibration
+# At each sensing cycle, a limited number of frames is analysed by a set of threads
+# (OpenCV releases the GIL, so the analysis is spread over the cores of the Raspberry Pi)
+# The cameras are chosen by priority: cameras whose last frames were close to the fire
+# threshold are analysed first, and the others in turn, according to their waiting time
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import csv
+import os
+import queue
+import threading
+import time
+
+from fireCamera import Camera
+import hardware
+
+###################################################
+
+## A camera is "hot" when its fire pixels reach this fraction of its threshold
+## A camera that waited as many cycles as the number of cameras has the same priority as one at the threshold
+hotRatio = 0.5
+
+###################################################
+## Cameras of a CSV file with the columns source,lowerH,lowerS,lowerV,upperH,upperS,upperV,threshold
+## source is the number of a camera device, a video file or "simulated" (see hardware.py)
+## Empty columns (or missing ones) take the default calibration of fireCamera.py
+def loadCameras(path, clock):
+    cameras = []
+    with open(path) as f:
+        for row in csv.DictReader(f):
+            source = row["source"].strip()
+            threshold = int(row.get("threshold") or 20000)
+
+            if source == "simulated":
+                ## The simulated cameras detect fire at different times
+                camera = hardware.SimulatedCamera(clock, start=60 + 30 * len(cameras))
+                camera.threshold = threshold
+            else:
+                lower = None
+                upper = None
+                if row.get("lowerH"):
+                    lower = [int(row["lowerH"]), int(row["lowerS"]), int(row["lowerV"])]
+                if row.get("upperH"):
+                    upper = [int(row["upperH"]), int(row["upperS"]), int(row["upperV"])]
+                camera = Camera(int(source) if source.isdigit() else source, lower, upper, threshold)
+
+            cameras.append(camera)
+
+    if len(cameras) == 0:
+        raise ValueError("No cameras in " + path)
+    return cameras
+
+###################################################
+
+class CameraGroup:
+
+    ## framesPerCycle: frames analysed at each call of detect (default: one per core)
+    def __init__(self, cameras, framesPerCycle=0):
+        self.cameras = cameras
+        if framesPerCycle <= 0:
+            framesPerCycle = os.cpu_count() or 1
+        self.framesPerCycle = min(framesPerCycle, len(cameras))
+
+        ## Threads of the analysis. They wait for the numbers of the cameras to be analysed
+        self.tasks = queue.Queue()
+        self.errors = []
+        for i in range(self.framesPerCycle):
+            threading.Thread(target=self.analysisThread, daemon=True).start()
+
+        ## The clips are recorded from the first real camera (the simulated ones have no frames)
+        self.ringCamera = None
+        for camera in cameras:
+            if isinstance(camera, Camera):
+                self.ringCamera = camera
+                break
+
+        self.fire = [False] * len(cameras)  # result of the last analysis of each camera
+        self.firePixels = [0] * len(cameras)
+        self.waiting = [0] * len(cameras)  # cycles since the last analysis
+
+        ## Counters
+        self.analysed = [0] * len(cameras)
+        self.cycles = 0
+        self.startTime = time.monotonic()
+        self.startCPU = time.process_time()
+
+    ## Priority of a camera: proximity to the fire threshold and waiting time
+    def priority(self, i):
+        camera = self.cameras[i]
+        return self.firePixels[i] / camera.threshold + self.waiting[i] / len(self.cameras)
+
+    ## Cameras to be analysed in this cycle: all the hot cameras (even beyond framesPerCycle),
+    ## and then the others by priority in the remaining frames
+    ## A waiting camera may have a higher priority than a hot one, but it never takes its place
+    def schedule(self):
+        order = sorted(range(len(self.cameras)), key=self.priority, reverse=True)
+        hot = [i for i in order if self.firePixels[i] >= hotRatio * self.cameras[i].threshold]
+        others = [i for i in order if i not in hot]
+        return hot + others[:max(0, self.framesPerCycle - len(hot))]
+
+    def analyse(self, i):
+        self.fire[i] = self.cameras[i].detect()
+        self.firePixels[i] = self.cameras[i].getFirePixels()
+
+    def analysisThread(self):
+        while True:
+            i = self.tasks.get()
+            try:
+                self.analyse(i)
+            except Exception as e:
+                self.errors.append(e)
+            finally:
+                self.tasks.task_done()
+
+    ## Fire is detected if it is detected by any camera (in its last analysed frame)
+    def detect(self):
+        selected = self.schedule()
+
+        if len(selected) == 1:
+            self.analyse(selected[0])
+        else:
+            for i in selected:
+                self.tasks.put(i)
+            self.tasks.join()
+
+            ## Errors of the cameras are raised to the sensing thread
+            if len(self.errors) > 0:
+                error = self.errors[0]
+                self.errors = []
+                raise error
+
+        self.cycles = self.cycles + 1
+        for i in range(len(self.cameras)):
+            if i in selected:
+                self.waiting[i] = 0
+                self.analysed[i] = self.analysed[i] + 1
+            else:
+                self.waiting[i] = self.waiting[i] + 1
+
+        return any(self.fire)
+
+    ## The camera closest to the detection of fire
+    def getFirePixels(self):
+        return max(self.firePixels)
+
+    def getFrame(self):
+        return self.cameras[self.firePixels.index(max(self.firePixels))].getFrame()
+
+    def setRing(self, ring):
+        if self.ringCamera is not None:
+            self.ringCamera.setRing(ring)
+
+    def hasRing(self):
+        return self.ringCamera is not None
+
+    ## The stages of all the real cameras are measured by the same profiler
+    def setProfiler(self, profiler):
+        for camera in self.cameras:
+            if isinstance(camera, Camera):
+                camera.setProfiler(profiler)
+
+    def getSize(self):
+        return len(self.cameras)
+
+    ## Effective FPS of each camera and CPU of the EDU (percentage of one core)
+    def printValues(self):
+        elapsed = time.monotonic() - self.startTime
+        cpu = (time.process_time() - self.startCPU) / elapsed * 100 if elapsed > 0 else 0.0
+        print ("Cameras:", len(self.cameras), ", frames per cycle:", self.framesPerCycle, ", cycles:", self.cycles, ", CPU of the EDU (% of one core):", round(cpu, 1))
+        for i in range(len(self.cameras)):
+            print ("  Camera", i, ": frames =", self.analysed[i], ", FPS =", round(self.analysed[i] / elapsed, 2) if elapsed > 0 else 0.0,
+                   ", fire pixels =", self.firePixels[i], ", fire =", self.fire[i])
@@ -16,14 +16,25 @@ import threading
 import atexit
 import socket
 import math
+import json
+import uuid
+import signal
 import sys, getopt
-import grovepi  #It has to be previously installed
-from grove_rgb_lcd import *
+
+## Time of the start of the EDU, for the time to the first ER
+startTime = time.monotonic()
 
 ## Elements to support the operation of the EDU
-from elementsEDUCamera import ListEI, EI, ListEC, EC, ER
+from elementsEDUCamera import ListEI, EI, ListEC, EC, ER, encodeER
 from fireCamera import Camera
+from cameraGroup import CameraGroup, loadCameras
 import moduleGPS
+import hardware
+from erQueue import ERQueue
+from sensorHistory import SensorHistory
+from videoRing import VideoRing
+from evidenceUploader import EvidenceUploader
+from stageProfiler import StageProfiler, profilerThread
 
 ########################################################
 debug = True  #Used to present trace messages on the screen
@@ -36,15 +47,92 @@ la = 41.176898 #Latitude of the EDU - If GPS fails
 lo = -8.585529 #Longitude of the EDU - If GPS fails
 eventsInstance = ListEI() #List of all possible EI (both detected and undetected)
 eventsComplex = ListEC() #List of all possible EC (both detected and undetected)
-idER = 1 #Indicates the current id of generated Events Reports
+idER = 1 #Indicates the current id of transmitted Events Reports
+bootER = int(time.time() * 1000) #Start of the EDU, sent with the id so the EPU knows when the ids start again
+lockER = threading.Lock() #createER is accessed by the sensing and the refreshing threads
+sendingER = False #An ER was taken from the queue and it was not transmitted yet (e.g. the EPU is not reachable)
+textTimestamp = True #ER carry the time in milliseconds since the epoch; the time.ctime() text is optional (display only)
 
 ## Communication with the Emergency Processor Unit (EPU)
 ## They can be provided as command-line options
 ipEPU = "192.168.1.100" #EPU address
 portEPU = 55055         #EPU port
 
-## Camera object
-camera = Camera()
+## ER may be transmitted through TCP (default) or as UDP datagrams, avoiding the TCP handshake
+## With UDP, the id of the ER is used by the EPU as a sequence number to detect lost ER
+## Only ER with complex events are kept to be retransmitted when the EPU requests them
+transportER = "tcp"  #tcp or udp. It can be provided as a command-line option
+udpSocket = None
+sentComplexER = {}  #id of the ER -> JSON of the ER with complex events
+maxSentComplexER = 32  #number of ER with complex events kept for retransmission
+lockUDP = threading.Lock()
+
+## ER are inserted in a bounded queue and transmitted by a sender thread, so the sensing is not delayed by the network
+## Consecutive ER with the same events are coalesced in the queue
+## The id of the ER is only assigned when it is transmitted, so coalesced ER do not look lost to the EPU
+queueSize = 16  #It can be provided as a command-line option
+queueER = None
+retryTime = 5  #Seconds before trying again to transmit an ER when the EPU can not be contacted
+
+## Hardware: "grove" (GrovePi+, Raspberry camera and Grove GPS) or "simulated" (see hardware.py)
+## The devices are only opened in main() (see initializeHardware)
+backend = "grove"
+clock = hardware.Clock()  #Clock of the EDU, accelerated with clockSpeed > 1
+clockSpeed = 1.0
+sensorTrace = None  #CSV trace of readings for the simulated sensors (None uses a scripted trace)
+recordFile = None  #The readings of the sensors are recorded to this CSV file
+videoFile = None  #Video file used as the camera
+nmeaFile = None  #Log of NMEA sentences used as the GPS
+displayDelay = False  #The simulated display blocks as long as the real one
+sensors = None
+display = None
+camera = None
+maxCycles = 0  #The EDU exits after this number of sensing cycles (0 runs forever)
+
+## Several cameras may be used, listed in a CSV file with their calibration (see cameraGroup.py)
+## At each sensing cycle, framesPerCycle frames are analysed in parallel (0 is one per core)
+cameraFile = None
+framesPerCycle = 0
+
+## Time of the stages of the detection of fire (see stageProfiler.py)
+## The profiler may be enabled at the start (-o True) or while the EDU is running (signal SIGUSR1 or the local socket)
+## The percentiles are reported at each refresh of the ER: in debug mode, in profileFile and through profilePort (UDP, 127.0.0.1)
+profileEnabled = False
+profileFile = None
+profilePort = 0  #0 disables the socket
+profiler = StageProfiler()
+
+## History of the readings of the sensors and the camera (see sensorHistory.py and historyReader.py)
+## It is optional: an empty name disables the history. It can be provided as a command-line option
+historyFile = ""
+history = None
+
+## Clips of the camera around the detection of complex events (see videoRing.py)
+## The recent frames are kept in memory as JPEG images. The clips are only recorded when a directory is given (-c),
+## since the capture and the encoding of the frames take CPU of the EDU
+## The simulated camera has no frames, so it has no clips (a video file can be used instead)
+## With several cameras, the clips are recorded from the first one that is not simulated
+clipDirectory = None
+clipPre = 10  #Seconds of video before the detection
+clipPost = 10  #Seconds of video after the detection
+clipMemory = 8  #Memory of the ring of frames (MB)
+clipFPS = 10  #Frames per second of the clips, captured by a thread of the camera (the sensing cycle only analyses the last one)
+videoRing = None
+
+## Evidences of the complex events: a downscaled image of the camera is uploaded to the EPU (see evidenceUploader.py)
+## The ER only carries the id of the evidence, so its transmission is not delayed by the image
+## The upload is limited to evidenceRate bytes per second and paused while there are ER to be sent
+evidencePort = 0  #Evidence port of the EPU (0 disables the upload). It can be provided as a command-line option
+evidenceRate = 20000  #Bytes per second
+currentEvidence = None  #Evidence of the detected complex events
+uploader = None
+
+## The LCD display is written by its own thread, only when the text changes
+## Writes over I2C are slow, so they are also limited to one every displayInterval seconds
+displayInterval = 1.0
+displayText = None  #Text to be presented
+displayChanged = threading.Event()
+firstER = True  #The time to the first ER is printed only once
 
 ###############################################
 ## List of possible EI
@@ -82,12 +170,6 @@ sensorSmoke = 1 #analog A1
 sensorWater = 8 #digital D8
 sensorHumidity = 4 # Digital D4
 
-grovepi.pinMode (sensorAudio,"INPUT")
-grovepi.pinMode (sensorSmoke,"INPUT")
-#grovepi.pinMode (sensorTemperature,"INPUT")
-grovepi.pinMode (sensorWater,"INPUT")
-grovepi.pinMode (sensorHumidity,"INPUT")
-
 ###############################################
 ## List of possible EC
 ## All EC are detected by the (Raspberry) camera and thus they will be detected according to the EDU implementation
@@ -117,18 +199,21 @@ class sensingThread (threading.Thread):
                 
         currentEI = 0 # This variable is used to avoid the transmission of multiple ER for the same set of detected EI
         currentEC = 0 # The same, but for complex events
+        cycles = 0
+        start = time.perf_counter()
+        maxCycleTime = 0.0
         
-        while True:
+        while maxCycles == 0 or cycles < maxCycles:
+            cycles = cycles + 1
+            cycleStart = time.perf_counter()
             try:                
+                ## Time of the reading, the first stage of the trace of the alarm
+                self.senseMs = int(time.time() * 1000)
+
                 ## Check all connected sensors
                 
-                ## Humidity is taken from DHT11
-                [temp,humidity] = grovepi.dht(sensorHumidity,0) #0 because the component is the "blue" one; 1 is for the "white" (DHT22) sensor
-                noise = grovepi.analogRead(sensorAudio)
+                [humidity, noise, smoke, water] = sensors.read()
                 noise = 20 * math.log(noise,10) #Simple simplification to return value in dB (approximation, since the sensor is not calibrated)
-                smoke = grovepi.analogRead(sensorSmoke) #MQ-2 reading (is also needs calibration)
-                water = grovepi.digitalRead(sensorWater) #Returns 1 if it is dry, and 0 otherwise
-                #temperature = grovepi.temp(sensorTemperature, '1.2') #This sensor has a better temperature range
                 
                 if debug:
                     print ("\nSensed data at", datetime.datetime.today())
@@ -153,6 +238,10 @@ class sensingThread (threading.Thread):
                             
                 #### Visual sensing - only for Fire in this implementation
                 detectEC(eventsComplex.getEventW(1))
+
+                ## The readings are kept in the history, with the number of fire pixels of the camera
+                if history is not None:
+                    history.append(time.time(), [humidity, noise, smoke, water, camera.getFirePixels()])
                 
                 # Display de types and number of detected events
                 displayEvents() 
@@ -181,8 +270,25 @@ class sensingThread (threading.Thread):
             except (IOError, TypeError) as e:
                 print (str(e))
             
+            maxCycleTime = max(maxCycleTime, time.perf_counter() - cycleStart)
+
             ## Frequency of monitoring
-            time.sleep (fs)
+            clock.sleep (fs)
+
+        ## Benchmark of the sensing loop (-n)
+        elapsed = time.perf_counter() - start
+        print ("Sensing cycles:", cycles, "in", round(elapsed, 3), "s (" + str(round(cycles / elapsed, 1)), "cycles per second), longest cycle (ms):", round(maxCycleTime * 1000, 3))
+        queueER.printValues()
+        if isinstance(camera, CameraGroup):
+            camera.printValues()
+        if profiler.isEnabled():
+            profiler.printValues()
+        if uploader is not None:
+            uploader.printValues()
+        if videoRing is not None:
+            videoRing.printValues()
+        if isinstance(display, hardware.SimulatedDisplay):
+            print ("Display writes:", display.getWrites(), ", I2C bus time per cycle (ms):", round(display.getBusTime() / cycles * 1000, 3))
 
 ##########################################################################
             
@@ -197,7 +303,12 @@ class refreshThread (threading.Thread):
     def run(self):
         while True:
             ## It has to sleep first, making this more reasonable for refreshing            
-            time.sleep (fx)
+            clock.sleep (fx)
+
+            ## Effective FPS of the cameras and time of the stages of the detection
+            if debug and isinstance(camera, CameraGroup):
+                camera.printValues()
+            reportProfile()
             
             try:
                 ## It must not refresh an ER when there is no detected event
@@ -232,13 +343,21 @@ def detectEI(sensed, event):
             
 ## This method checks if a certain EI can be assumed as detected
 def detectEC(event):
-    global camera
+    global camera, currentEvidence
     
     # OPenCV procedures - defined in fireCamera.py
     if (camera.detect()):
+        ## A new detection: the clip of the camera is saved and the evidence is uploaded
+        if not event.isDetected():
+            if videoRing is not None:
+                videoRing.trigger()
+            if uploader is not None:
+                currentEvidence = str(idEDU) + "_" + str(int(time.time() * 1000))
+                uploader.submit(currentEvidence, camera.getFrame())
         event.setDetected()
     else:
         event.setUndetected()
+        currentEvidence = None
         
         
 
@@ -263,10 +382,51 @@ def showDetectedEC():
 ##########################################################################
     
 def displayEvents():
-    global eventsInstance, eventsComplex
+    global eventsInstance, eventsComplex, displayText
     
     # Present number of detected events in the LCD display
-    setText("Instance: " + str(eventsInstance.getNumberDetectedEvents()) + "\nComplex: " + str(eventsComplex.getNumberDetectedEvents()))
+    # The text is written by displayThread, so the sensing is never blocked by the display
+    displayText = "Instance: " + str(eventsInstance.getNumberDetectedEvents()) + "\nComplex: " + str(eventsComplex.getNumberDetectedEvents())
+    displayChanged.set()
+
+##########################################################################
+
+## Periodic report of the profiler of the camera
+def reportProfile():
+    if not profiler.isEnabled():
+        return
+    if debug:
+        profiler.printValues()
+    if profileFile is not None:
+        profiler.writeFile(profileFile)
+
+##########################################################################
+
+## Fifth thread - write the LCD display when its text changes
+class displayThread (threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        written = None
+        while True:
+            displayChanged.wait()
+            displayChanged.clear()
+
+            text = displayText
+            if text == written:
+                continue
+
+            try:
+                display.setText(text)
+                written = text
+            except (IOError, OSError) as e:
+                print ("Error when writing the display:", e)
+
+            ## Changes during this interval are merged into a single write (the last text)
+            time.sleep(displayInterval)
   
 
 ##########################################################################
@@ -275,17 +435,30 @@ def displayEvents():
 ## This method creates the Events Reports
 ## This method is accessed by two concurrent threads
 def createER(self):        
-    global idEDU, idER, la, lo, eventsInstance, eventsComplex
-        
     ## Requesting block for the use of this method
-    lock = threading.Lock()
-    lock.acquire()
+    with lockER:
+        buildER(self)
+
+def buildER(self):
+    global idEDU, la, lo, eventsInstance, eventsComplex
     
-    ## Current time
-    timestamp = time.ctime()
+    ## Current time, in milliseconds since the epoch
+    ## The textual timestamp is optional, only for display
+    epochMs = int(time.time() * 1000)
+    timestamp = None
+    if textTimestamp:
+        timestamp = time.ctime(epochMs / 1000)
     
-    eventsReport = ER(idEDU, idER, timestamp, la, lo)
-    idER = idER + 1
+    eventsReport = ER(idEDU, None, timestamp, la, lo, epochMs)  # the id is assigned by the sender thread
+
+    ## The trace starts at the reading of the sensors (or at the refresh of the ER)
+    senseMs = getattr(self, "senseMs", None)
+    if senseMs is not None:
+        eventsReport.setTrace({"id": uuid.uuid4().hex[:16], "hops": [["edu.sense", senseMs]]})
+    else:
+        eventsReport.setTrace({"id": uuid.uuid4().hex[:16], "hops": []})
+        eventsReport.addHop("edu.refresh")
+    eventsReport.addHop("edu.er")
     
     ## Insert events. The limit is 5 events
     countEventsEI = 0
@@ -312,16 +485,42 @@ def createER(self):
     if countEventsEC > 5:
         if debug:
             print ("More than 5 complex events were detected, but only 5 of them will be reported.")
+
+    ## Id of the image uploaded to the EPU
+    if countEventsEC > 0:
+        eventsReport.setEvidence(currentEvidence)
         
-    ## Send the ER to the EPU
-    transmitER (eventsReport)
-    
-    ## Releasing this method to be used by other thread
-    lock.release()
+    ## The ER is sent to the EPU by the sender thread
+    queueER.put(eventsReport)
+
+##########################################################################
+
+## Third thread - transmit the queued ER to the EPU
+class senderThread (threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+
+    def run(self):
+        global idER, sendingER
+
+        while True:
+            er = queueER.get()
+            sendingER = True
+            er.setId(idER)
+            er.setBoot(bootER)
+            idER = idER + 1
+
+            ## The EPU is contacted again until the ER is transmitted
+            ## Meanwhile, new ER are coalesced or discarded by the queue
+            while not transmitER(er):
+                time.sleep(retryTime)
+            sendingER = False
 
 ##########################################################################
     
 ## Communication with the EPU
+## Returns False if the EPU could not be contacted
 def transmitER(er):
     global debug, ipEPU, portEPU
     
@@ -329,12 +528,18 @@ def transmitER(er):
         print ("Transmitting ER generated at " + str(er.getTimestamp()) + "\nNumber of reported EI: " + str(er.getNumberEI()) + "\nNumber of reported EC: " + str(er.getNumberEC()))
         
     ## Serializing the ER to the JSON format
-    jsonER = er.toJSON()
+    ## When the EPU is not reachable, the same ER is sent again: its edu.send hop is the time of the last attempt
+    er.setHop("edu.send")
+    jsonER = encodeER(er)
     
     if debug:
         print ("\nER in the JSON format:")
         print (jsonER)
     
+    if transportER == "udp":
+        transmitUDP(er, jsonER)
+        return True
+
     ## Open connection to the EPU, send ER, and then close the connection
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)    
     try:
@@ -345,13 +550,113 @@ def transmitER(er):
             print ("\nConnection established to the EPU. Sending ER...")
         
         s.sendall(bytes(jsonER, 'utf-8'))
-        s.close()
+        printFirstER()
+        return True
         
     except socket.error as e:
-        print ("The EPU could not be contacted. Exiting EDU...")
+        print ("The EPU could not be contacted. Trying again in", retryTime, "s...")
         print ("Error:", e)
-        sys.exit(1)
-        
+        return False
+
+    finally:
+        s.close()
+
+##########################################################################
+
+## Send the ER as a single UDP datagram
+def transmitUDP(er, jsonER):
+    global udpSocket, sentComplexER
+
+    ## ER with complex events are kept, since the EPU may request them again
+    if er.getNumberEC() > 0:
+        with lockUDP:
+            sentComplexER[er.getId()] = jsonER
+            if len(sentComplexER) > maxSentComplexER:
+                del sentComplexER[min(sentComplexER)]
+
+    try:
+        udpSocket.sendto(bytes(jsonER, 'utf-8'), (ipEPU, portEPU))
+        printFirstER()
+
+    except socket.error as e:
+        print ("The ER could not be sent to the EPU through UDP.")
+        print ("Error:", e)
+
+##########################################################################
+
+## Time from the start of the EDU to the first transmitted ER (startup benchmark)
+def printFirstER():
+    global firstER
+
+    if firstER:
+        firstER = False
+        print ("First ER sent", round(time.monotonic() - startTime, 3), "s after the start of the EDU")
+
+##########################################################################
+
+## Fourth thread (only for UDP) - receive retransmission requests from the EPU
+class retransmissionThread (threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        while True:
+            try:
+                received, address = udpSocket.recvfrom(4096)
+                missing = json.loads(received.decode('utf-8'))["nack"]
+            except (OSError, ValueError, KeyError) as e:
+                print ("Error when receiving a retransmission request:", e)
+                continue
+
+            for i in missing:
+                with lockUDP:
+                    jsonER = sentComplexER.get(i)
+
+                ## Only ER with complex events are retransmitted
+                if jsonER is not None:
+                    if debug:
+                        print ("Retransmitting ER", i, "to the EPU")
+                    try:
+                        udpSocket.sendto(bytes(jsonER, 'utf-8'), (ipEPU, portEPU))
+                    except socket.error as e:
+                        print ("Error:", e)
+
+##########################################################################
+
+## Open the sensors, the display and the camera of the selected backend
+## This is done in main(), so importing this module is fast and has no effect on the hardware
+def initializeHardware():
+    global clock, sensors, display, camera
+
+    clock = hardware.Clock(clockSpeed)
+
+    if backend == "simulated":
+        sensors = hardware.SimulatedSensors(clock, sensorTrace)
+        display = hardware.SimulatedDisplay(displayDelay)
+        if videoFile is None and cameraFile is None:
+            camera = hardware.SimulatedCamera(clock)
+    else:
+        sensors = hardware.GroveSensors(sensorAudio, sensorSmoke, sensorWater, sensorHumidity)
+        display = hardware.GroveDisplay()
+
+    if cameraFile is not None:
+        camera = CameraGroup(loadCameras(cameraFile, clock), framesPerCycle)
+    elif camera is None:
+        camera = Camera(videoFile if videoFile is not None else 0)
+
+    if recordFile is not None:
+        sensors = hardware.SensorRecorder(sensors, clock, recordFile)
+
+## The GPS of the selected backend. The simulated backend only has a GPS when a NMEA log is given
+def openGPS():
+    if nmeaFile is not None:
+        return moduleGPS.groveGPS(ser=hardware.NMEAPlayer(clock, nmeaFile))
+    if backend == "simulated":
+        return None
+    return moduleGPS.groveGPS()
+
 ##########################################################################
       
 ## Initiliaze all Events of Interest of type Instance
@@ -385,20 +690,26 @@ def initializeEC():
 def exit_handler():
     if debug:
         print ("Events Detector Unit is exiting...")
-    sys.exit(0)
+
+    ## The open minute and hour of the history are stored
+    if history is not None:
+        history.close()
     
 ##########################################################################    
 
 # main code of the EDU      
 def main(argv):
-    global la, lo, debug, idEDU, ipEPU, portEPU
+    global la, lo, debug, idEDU, ipEPU, portEPU, transportER, udpSocket, backend, clockSpeed, sensorTrace, recordFile, videoFile, nmeaFile, maxCycles, queueSize, queueER, historyFile, history, clipDirectory, clipPre, clipPost, clipMemory, clipFPS, videoRing, evidencePort, evidenceRate, uploader, cameraFile, framesPerCycle, profileEnabled, profileFile, profilePort
     
     ## Parse arguments from the command-line
-    ## Options: debug idU ipEPU portEPU
-    opts, ars = getopt.getopt(argv,"hd:u:i:p:",["debug=","idEDU=","ipEPU=","portEPU="])
+    ## Options: debug idU ipEPU portEPU transportER backend clockSpeed sensorTrace recordFile videoFile nmeaFile maxCycles queueSize historyFile
+    ##          clipDirectory clipPre clipPost clipMemory evidencePort evidenceRate cameraFile framesPerCycle
+    ##          profileEnabled profileFile profilePort clipFPS (only --fps)
+    opts, ars = getopt.getopt(argv,"hd:u:i:p:t:b:s:r:w:v:g:n:q:y:c:x:z:m:e:k:a:l:o:f:j:",["debug=","idEDU=","ipEPU=","portEPU=","transport=","backend=","speed=","trace=","record=","video=","nmea=","cycles=","queue=","history=",
+                                                                          "clips=","pre=","post=","memory=","evidence=","rate=","cameras=","frames=","profile=","profileFile=","profilePort=","fps="])
     for opt,arg in opts:
         if opt == "-h":
-            print ("edu.py -d <debug> -u <idEDU> -i <ipEPU> -p <portEDU>")
+            print ("edu.py -d <debug> -u <idEDU> -i <ipEPU> -p <portEDU> -t <transport> -b <backend> -s <clockSpeed> -r <sensorTrace> -w <recordFile> -v <videoFile> -g <nmeaFile> -n <maxCycles> -q <queueSize> -y <historyFile> -c <clipDirectory> -x <clipPre> -z <clipPost> -m <clipMemory> -e <evidencePort> -k <evidenceRate> -a <cameraFile> -l <framesPerCycle> -o <profileEnabled> -f <profileFile> -j <profilePort> --fps <clipFPS>")
             sys.exit(1)
         elif opt in ("-d", "--debug"):
             if arg == "True":
@@ -411,16 +722,64 @@ def main(argv):
             ipEPU = arg
         elif opt in ("-p", "--portEPU"):
             portEPU = int(arg)
+        elif opt in ("-t", "--transport"):
+            transportER = arg.lower()
+        elif opt in ("-b", "--backend"):
+            backend = arg.lower()
+        elif opt in ("-s", "--speed"):
+            clockSpeed = float(arg)
+        elif opt in ("-r", "--trace"):
+            sensorTrace = arg
+        elif opt in ("-w", "--record"):
+            recordFile = arg
+        elif opt in ("-v", "--video"):
+            videoFile = arg
+        elif opt in ("-g", "--nmea"):
+            nmeaFile = arg
+        elif opt in ("-n", "--cycles"):
+            maxCycles = int(arg)
+        elif opt in ("-q", "--queue"):
+            queueSize = int(arg)
+        elif opt in ("-y", "--history"):
+            historyFile = arg
+        elif opt in ("-c", "--clips"):
+            clipDirectory = arg
+        elif opt in ("-x", "--pre"):
+            clipPre = float(arg)
+        elif opt in ("-z", "--post"):
+            clipPost = float(arg)
+        elif opt in ("-m", "--memory"):
+            clipMemory = float(arg)
+        elif opt == "--fps":
+            clipFPS = float(arg)
+        elif opt in ("-e", "--evidence"):
+            evidencePort = int(arg)
+        elif opt in ("-k", "--rate"):
+            evidenceRate = float(arg)
+        elif opt in ("-a", "--cameras"):
+            cameraFile = arg
+        elif opt in ("-l", "--frames"):
+            framesPerCycle = int(arg)
+        elif opt in ("-o", "--profile"):
+            profileEnabled = arg == "True"
+        elif opt in ("-f", "--profileFile"):
+            profileFile = arg
+        elif opt in ("-j", "--profilePort"):
+            profilePort = int(arg)
     ########            
     
     print ("Events Detector Unit is initializing...")
     print ("It supports the detection of both instance and complex events.")
+
+    ## Sensors, display and camera
+    initializeHardware()
        
     ## Get GPS location - only once at startup
     if debug:
         print("Obtaining GPS position...")
-    gps = moduleGPS.groveGPS()    
-    gps.read()
+    gps = openGPS()
+    if gps is not None:
+        gps.read()
     #la = gps.latitude
     #lo = gps.longitude
     if debug:
@@ -431,6 +790,49 @@ def main(argv):
     ## Initialize EC definitions - valid for complex events
     initializeEC()
     
+    ## ER as UDP datagrams. The same socket receives retransmission requests
+    if transportER == "udp":
+        udpSocket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udpSocket.bind(("", 0))
+        retransmissionThread().start()
+    
+    ## History of the readings
+    if historyFile != "":
+        history = SensorHistory(historyFile)
+        if debug:
+            history.printValues()
+
+    ## Ring of frames for the clips of the detections
+    if clipDirectory is not None and clipDirectory != "" and (isinstance(camera, Camera) or (isinstance(camera, CameraGroup) and camera.hasRing())):
+        videoRing = VideoRing(clipDirectory, clipPre, clipPost, int(clipMemory * 1024 * 1024), clipFPS)
+        camera.setRing(videoRing)
+        videoRing.start()
+
+    ## Upload of the evidences, paused while there are ER waiting to be sent
+    ## The ER being sent is no longer in the queue: while the EPU is not reachable, it is retried by the sender
+    if evidencePort > 0:
+        uploader = EvidenceUploader(ipEPU, evidencePort, idEDU, evidenceRate, lambda: sendingER or queueER.getSize() > 0)
+        uploader.start()
+
+    ## Profiler of the stages of the detection, switched with SIGUSR1 (kill -USR1 <pid>) or the local socket
+    if profileEnabled:
+        profiler.setEnabled(True)
+    if isinstance(camera, (Camera, CameraGroup)):
+        camera.setProfiler(profiler)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.setEnabled(not profiler.isEnabled()))
+    if profilePort > 0:
+        profilerThread(profiler, profilePort).start()
+
+    ## The display is written by its own thread
+    displayThread().start()
+
+    ## Queue of ER to be transmitted, and the thread that sends them
+    queueER = ERQueue(queueSize)
+    sender = senderThread()
+    sender.daemon = maxCycles > 0
+    sender.start()
+
     print ("Ready to detect events.\n")
 
     ## Initialize thread to read all the sensors
@@ -438,7 +840,9 @@ def main(argv):
     checkSensors.start()
     
     ## Initialize thread to refresh ER
+    ## With a limited number of cycles (benchmark), it does not keep the EDU running
     refreshER = refreshThread()    
+    refreshER.daemon = maxCycles > 0
     refreshER.start()
     
     atexit.register(exit_handler)
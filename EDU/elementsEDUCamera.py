@@ -1,13 +1,17 @@
 # **************************************************
 # Accessory classes for the EDU for scalar and visual sensing
-# They model the concepts of Event of Interest and Events Report
+# They model the concepts of Event of Interest (the Events Report is in common/cityAlarmModel.py)
 # The concepts of instance and complex events are modelled here
 # Author      : Daniel G. Costa
 # E-mail      : danielgcosta@uefs.br
 # Date        : 12/05/2020
 #**************************************************
 
-import json
+import os, sys
+
+## The ER and its JSON conversion are shared by all units (../common)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from cityAlarmModel import ER, GPS, encodeER
 
 ###################################################
 ## Models a list of all EI
@@ -140,58 +144,3 @@ class EC:
     
     def isDetected (self):
         return self.detected
-    
-## Models an Events Report    
-class ER:
-    
-    def __init__(self, u, i, ts, latitude, longitude):
-        self.edu = u
-        self.id = i
-        self.timestamp = ts
-        self.gps = GPS(latitude,longitude)
-        self.eventsInstance = []  # array of integers (types of detected events - instance)
-        self.eventsComplex = []  # array of integers (types of detected events - complex)
-    
-    def putEventTypeInstance(self, y):        
-        self.eventsInstance.append(y)
-    
-    def putEventTypeComplex(self, w):        
-        self.eventsComplex.append(w)
-
-    def getTimestamp (self):
-        return self.timestamp
-    
-    def getLatitude (self):
-        return self.la
-
-    def getLongitude (self):
-        return self.lo
-    
-    def getEventsTypesInstance (self):
-        return self.eventsInstance
-
-    def getEventsTypesComplex (self):
-        return self.eventsComplex
-    
-    def getNumberEI(self):       
-        return len(self.eventsInstance)  # Number of EI (Instance) in the ER
-        
-    def getNumberEC(self):      
-        return len(self.eventsComplex)  # Number of EC (Complex) in the ER
-        
-    def printValues(self):
-        for y in self.eventsInstance:
-            print ("Type instance =",  y)
-        for w in self.eventsComplex:
-            print ("Type complex =",  w)
-            
-    ## This is required to convert the ER to JSON
-    def toJSON(self):
-        return json.dumps(self,default=lambda o: o.__dict__,sort_keys=True, indent=4)
-   
-#####################################################
-## Supportive class for the JSON convertion
-class GPS():
-    def __init__(self, latitude, longitude):
-        self.la = latitude
-        self.lo = longitude
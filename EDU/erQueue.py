@@ -0,0 +1,74 @@
+# **************************************************
+# Bounded queue of the ER waiting to be transmitted to the EPU
+# The sensing and refreshing threads only insert the ER, so they are never
+# delayed by the network. A sender thread of the EDU transmits them in order
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import collections
+import threading
+import time
+
+###################################################
+
+class ERQueue:
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.queue = collections.deque()  # [enqueue time, er]
+        self.condition = threading.Condition()
+
+        ## Counters to follow the behaviour of the queue
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+        self.maxWaitTime = 0.0
+
+    ## The detected events of an ER, used to compare consecutive ER
+    def eventsOf(self, er):
+        return (tuple(er.getEventsTypesInstance()), tuple(er.getEventsTypesComplex()))
+
+    ## Insert an ER. It never blocks
+    ## If the last queued ER has the same events, it is replaced by the new one (a newer report of the same situation)
+    ## When the queue is full, the oldest ER without complex events is discarded (or the oldest ER, if all have them)
+    def put(self, er):
+        with self.condition:
+            if len(self.queue) > 0 and self.eventsOf(self.queue[-1][1]) == self.eventsOf(er):
+                self.queue[-1][1] = er
+                self.coalesced = self.coalesced + 1
+                return
+
+            if len(self.queue) >= self.maxSize:
+                victim = self.queue[0]
+                for entry in self.queue:
+                    if entry[1].getNumberEC() == 0:
+                        victim = entry
+                        break
+                self.queue.remove(victim)
+                self.dropped = self.dropped + 1
+
+            self.queue.append([time.monotonic(), er])
+            self.condition.notify()
+
+    ## Remove the oldest ER, waiting until there is one
+    ## With a timeout (seconds), None is returned if no ER arrives in time
+    def get(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: len(self.queue) > 0, timeout):
+                return None
+
+            enqueued, er = self.queue.popleft()
+            wait = time.monotonic() - enqueued
+            if wait > self.maxWaitTime:
+                self.maxWaitTime = wait
+            self.sent = self.sent + 1
+            return er
+
+    def getSize(self):
+        return len(self.queue)
+
+    def printValues(self):
+        with self.condition:
+            print ("ER queue size:", len(self.queue), "of", self.maxSize, ", sent:", self.sent, ", coalesced:", self.coalesced, ", dropped:", self.dropped, ", max wait (s):", round(self.maxWaitTime, 4))
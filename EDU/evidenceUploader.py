@@ -0,0 +1,139 @@
+# **************************************************
+# Upload of evidences (images of the camera) from the EDU to the EPU
+# When a complex event is detected, a downscaled JPEG image of the camera is sent
+# to the evidence port of the EPU, in chunks and limited to a rate (bytes per second).
+# Chunks are only sent while there is no ER waiting, so the ER are never delayed.
+# The EPU replies with the bytes it already has, so interrupted uploads are resumed,
+# and confirms the complete evidence with the same reply
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import collections
+import json
+import socket
+import threading
+import time
+
+###################################################
+
+## Size (pixels) and JPEG quality of the images
+snapshotSize = 240
+snapshotQuality = 60
+
+chunkSize = 4096
+retryTime = 5  # seconds before resuming an interrupted upload
+maxPending = 8  # evidences waiting to be uploaded; the oldest is discarded
+
+###################################################
+
+class EvidenceUploader (threading.Thread):
+
+    ## rate: bytes per second
+    ## busy: optional function; while it returns True (e.g. ER waiting to be sent), no chunk is sent
+    def __init__(self, ipEPU, port, edu, rate, busy=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.ipEPU = ipEPU
+        self.port = port
+        self.edu = edu
+        self.rate = rate
+        self.busy = busy
+
+        self.pending = collections.deque()  # [id, frame]
+        self.condition = threading.Condition()
+
+        ## Counters
+        self.uploaded = 0
+        self.discarded = 0
+        self.bytesSent = 0  # including the bytes sent again after interruptions
+        self.evidenceBytes = 0  # size of the uploaded evidences
+        self.resumed = 0
+        self.uploadTime = 0.0
+
+    ## Ask for the upload of an image. frame is a frame of the camera or an already encoded JPEG image
+    def submit(self, evidence, frame):
+        with self.condition:
+            if len(self.pending) >= maxPending:
+                self.pending.popleft()
+                self.discarded = self.discarded + 1
+            self.pending.append([evidence, frame])
+            self.condition.notify()
+
+    ## Downscaled JPEG image of a frame
+    def encode(self, frame):
+        if isinstance(frame, bytes):
+            return frame
+
+        import cv2
+        small = cv2.resize(frame, (snapshotSize, snapshotSize))
+        ok, jpeg = cv2.imencode(".jpg", small, [int(cv2.IMWRITE_JPEG_QUALITY), snapshotQuality])
+        if not ok:
+            raise ValueError("The image could not be encoded")
+        return jpeg.tobytes()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.pending) > 0)
+                evidence, frame = self.pending.popleft()
+
+            try:
+                data = self.encode(frame)
+            except ValueError as e:
+                print ("Error when encoding the evidence:", e)
+                continue
+
+            start = time.monotonic()
+            while not self.upload(evidence, data):
+                time.sleep(retryTime)
+
+            self.uploaded = self.uploaded + 1
+            self.evidenceBytes = self.evidenceBytes + len(data)
+            self.uploadTime = self.uploadTime + time.monotonic() - start
+
+    ## Send an evidence, from the offset received from the EPU
+    ## Returns False if the upload was interrupted
+    def upload(self, evidence, data):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            s.settimeout(10)
+            s.connect((self.ipEPU, self.port))
+            s.sendall((json.dumps({"edu": self.edu, "id": evidence, "size": len(data)}) + "\n").encode("utf-8"))
+
+            reader = s.makefile("rb")
+            offset = json.loads(reader.readline(1024).decode("utf-8"))["offset"]
+            if offset >= len(data):
+                return True  # already stored by the EPU
+            if offset > 0:
+                self.resumed = self.resumed + 1
+
+            while offset < len(data):
+                while self.busy is not None and self.busy():
+                    time.sleep(0.05)
+
+                chunk = data[offset:offset + chunkSize]
+                s.sendall(chunk)
+                offset = offset + len(chunk)
+                self.bytesSent = self.bytesSent + len(chunk)
+
+                ## Rate of the upload
+                time.sleep(len(chunk) / self.rate)
+
+            ## Without the confirmation, the EPU may not have received the last chunks
+            return json.loads(reader.readline(1024).decode("utf-8"))["offset"] >= len(data)
+
+        except (OSError, ValueError, KeyError) as e:
+            print ("Evidence", evidence, "upload interrupted:", e)
+            return False
+
+        finally:
+            s.close()
+
+    def printValues(self):
+        average = self.evidenceBytes // self.uploaded if self.uploaded > 0 else 0
+        print ("Evidences uploaded:", self.uploaded, ", pending:", len(self.pending), ", discarded:", self.discarded, ", resumed:", self.resumed,
+               ", bytes sent:", self.bytesSent, ", bytes per evidence:", average,
+               ", average upload time (s):", round(self.uploadTime / self.uploaded, 3) if self.uploaded > 0 else 0)
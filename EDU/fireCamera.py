@@ -1,54 +1,158 @@
 # **************************************************
 # This class is used to capture an image from the Raspberry Camera and
 # to detect the presence of fire
-# It exploits the OpenCV, Numpy and Matplotlib libraries
+# It exploits the OpenCV and Numpy libraries
 # Author      : Daniel G. Costa
 # E-mail      : danielgcosta@uefs.br
 # Date        : 12/05/2020
 # **************************************************
 
-import cv2
-import numpy as np
-import matplotlib.pyplot as plt
+import threading
 import time
 
+## OpenCV and Numpy take long to load, so they are only imported when the camera is opened
+cv2 = None
+np = None
+
 class Camera:
     
-    def __init__(self):
+    ## source is the number of the camera device or a video file (played in loop)
+    ## lower and upper are the HSV bounds of the colors of fire, and threshold is the number of pixels of a detection
+    def __init__(self, source=0, lower=None, upper=None, threshold=20000):
+        global cv2, np
+        import cv2
+        import numpy as np
 
         # Object to access the camera
-        self.myCamera = cv2.VideoCapture(0)
+        self.myCamera = cv2.VideoCapture(source)
+        self.videoFile = isinstance(source, str)
+        self.firePixels = 0  # Result of the last detection
+        self.frame = None  # Last captured frame (evidence of the detections)
+        self.ring = None  # Ring of recent frames (see videoRing.py)
+        self.profiler = None  # Time of the stages of the detection (see stageProfiler.py)
+
+        # With the ring, the frames are captured by a thread at the frame rate of the ring
+        # and the detection uses the last one
+        self.captured = None
+        self.condition = threading.Condition()
         
         # Basic configuration for the detection of fire
         # This is a simple calibration since we are not using
         # artifical inteligence for automatic detection
-        self.lower_bound = np.array([10,10,100])
-        self.upper_bound = np.array([100,255,255])
+        # Each camera may have its own bounds (see cameraGroup.py)
+        self.lower_bound = np.array(lower if lower is not None else [10,10,100])
+        self.upper_bound = np.array(upper if upper is not None else [100,255,255])
+        self.threshold = threshold
 
     def detect(self): 
         # Initialize de camera
-            
-        ret, frame = self.myCamera.read()
-            
-        # Basic configurations of the captured image
-        frame = cv2.resize(frame,(480,480))
-        frame = cv2.flip(frame,1)  # Flip the camera in 180 grades
+
+        # Time of each stage, only when the profiler is enabled
+        profiler = self.profiler if self.profiler is not None and self.profiler.enabled else None
+        if profiler:
+            start = t = time.perf_counter()
+
+        if self.ring is None:
+            frame = self.read()
+            if profiler:
+                t = profiler.mark("read", t)
+            if frame is None:
+                raise IOError("No frame was read from the camera")
+            frame = self.prepare(frame)
+            if profiler:
+                t = profiler.mark("resize", t)
+        else:
+            # Last frame of the capture thread (already resized)
+            frame = self.lastCaptured()
+            if profiler:
+                t = profiler.mark("read", t)
+            if frame is None:
+                raise IOError("No frame was captured by the camera")
+        self.frame = frame
 
         # Configuraitons for the detection of fire
         frame_smooth = cv2.GaussianBlur(frame,(7,7),0)
+        if profiler:
+            t = profiler.mark("blur", t)
         mask = np.zeros_like(frame)
         mask[0:480, 0:480] = [255,255,255]
         img_roi = cv2.bitwise_and(frame_smooth, mask)
+        if profiler:
+            t = profiler.mark("mask", t)
 
         # Processing the captured image
         frame_hsv = cv2.cvtColor(img_roi,cv2.COLOR_BGR2HSV)
+        if profiler:
+            t = profiler.mark("cvtColor", t)
         image_binary = cv2.inRange(frame_hsv, self.lower_bound, self.upper_bound)
+        if profiler:
+            t = profiler.mark("inRange", t)
 
         check_if_fire_detected = cv2.countNonZero(image_binary)
+        self.firePixels = int(check_if_fire_detected)
+        if profiler:
+            profiler.mark("countNonZero", t)
+            profiler.mark("total", start)
    
-        if int(check_if_fire_detected) >= 20000:
+        if int(check_if_fire_detected) >= self.threshold:
         # Fire is detected!
             return True
         else:
             # No fire
             return False
+
+    def read(self):
+        ret, frame = self.myCamera.read()
+        if not ret and self.videoFile:
+            # End of the video file: it starts again
+            self.myCamera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.myCamera.read()
+        return frame
+
+    # Basic configurations of the captured image
+    def prepare(self, frame):
+        frame = cv2.resize(frame,(480,480))
+        return cv2.flip(frame,1)  # Flip the camera in 180 grades
+
+    ## Ring that receives the captured frames (encoded in background for the clips of the detections)
+    ## The camera is then read by the capture thread, at the frame rate of the ring
+    def setRing(self, ring):
+        self.ring = ring
+        threading.Thread(target=self.captureThread, daemon=True).start()
+
+    def captureThread(self):
+        period = 1.0 / self.ring.fps
+        next = time.monotonic()
+        while True:
+            frame = self.read()
+            if frame is not None:
+                frame = self.prepare(frame)
+                with self.condition:
+                    self.captured = frame
+                    self.condition.notify_all()
+                self.ring.offer(frame)
+
+            next = next + period
+            delay = next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next = time.monotonic()  # the camera is slower than the frame rate of the ring
+
+    ## None if the capture thread has no frame yet (the sensing cycle is skipped)
+    def lastCaptured(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.captured is not None, 10)
+            return self.captured
+
+    ## Profiler of the stages of the detection
+    def setProfiler(self, profiler):
+        self.profiler = profiler
+
+    ## Number of pixels with the colors of fire in the last frame
+    def getFirePixels(self):
+        return self.firePixels
+
+    ## Last captured frame
+    def getFrame(self):
+        return self.frame
@@ -0,0 +1,207 @@
+# **************************************************
+# Hardware abstraction for the EDU
+# The sensors, the LCD display, the camera and the GPS are accessed through the
+# classes of this module, so the EDU may run with the real hardware (GrovePi+,
+# Raspberry camera and Grove GPS) or with simulated devices on any computer
+# The simulated devices follow a clock that may be accelerated
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import time
+import bisect
+import csv
+
+###################################################
+## Clock of the EDU. With speed > 1, the periods of sensing and refreshing
+## (and the simulated sensors, camera and GPS) run faster than real time
+## The time of the ER is always the real time, since it is compared with the EPU and the EAC
+class Clock:
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self.start = time.monotonic()
+
+    ## Seconds since the start of the EDU, in the time of the clock
+    def elapsed(self):
+        return (time.monotonic() - self.start) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+    def getSpeed(self):
+        return self.speed
+
+###################################################
+## Sensors of the reference implementation, connected to the GrovePi+
+## read() returns the raw readings as [humidity, noise, smoke, water]
+class GroveSensors:
+
+    def __init__(self, sensorAudio, sensorSmoke, sensorWater, sensorHumidity):
+        import grovepi  #It has to be previously installed
+        self.grovepi = grovepi
+
+        self.sensorAudio = sensorAudio
+        self.sensorSmoke = sensorSmoke
+        self.sensorWater = sensorWater
+        self.sensorHumidity = sensorHumidity
+
+        grovepi.pinMode (sensorAudio,"INPUT")
+        grovepi.pinMode (sensorSmoke,"INPUT")
+        grovepi.pinMode (sensorWater,"INPUT")
+        grovepi.pinMode (sensorHumidity,"INPUT")
+
+    def read(self):
+        ## Humidity is taken from DHT11
+        [temp,humidity] = self.grovepi.dht(self.sensorHumidity,0) #0 because the component is the "blue" one; 1 is for the "white" (DHT22) sensor
+        noise = self.grovepi.analogRead(self.sensorAudio)
+        smoke = self.grovepi.analogRead(self.sensorSmoke) #MQ-2 reading (is also needs calibration)
+        water = self.grovepi.digitalRead(self.sensorWater) #Returns 1 if it is dry, and 0 otherwise
+        return [humidity, noise, smoke, water]
+
+###################################################
+## Simulated sensors, playing a trace of readings
+## The trace is a CSV file with the columns t,humidity,noise,smoke,water (t in seconds since the start)
+## It may be written by hand or recorded from an EDU (SensorRecorder). The trace is repeated when it ends
+## Without a file, a scripted trace with periods of smoke, noise and flooding is used
+scriptedTrace = [[0, 50, 5, 200, 1],
+                 [30, 50, 40, 650, 1],  # smoke and noise
+                 [50, 50, 5, 200, 1],
+                 [90, 8, 5, 200, 0],  # low humidity and flooding
+                 [110, 50, 5, 200, 1],
+                 [120, 50, 5, 200, 1]]
+
+class SimulatedSensors:
+
+    def __init__(self, clock, path=None):
+        self.clock = clock
+        self.trace = scriptedTrace
+
+        if path is not None:
+            self.trace = []
+            with open(path) as f:
+                for row in csv.DictReader(f):
+                    self.trace.append([float(row["t"]), float(row["humidity"]), float(row["noise"]), float(row["smoke"]), int(row["water"])])
+            if len(self.trace) == 0:
+                raise ValueError("Empty sensor trace: " + path)
+
+        self.times = [row[0] for row in self.trace]
+        self.period = max(self.times[-1], 1)
+
+    def read(self):
+        t = self.clock.elapsed() % self.period
+        row = self.trace[max(bisect.bisect_right(self.times, t) - 1, 0)]
+        return row[1:]
+
+###################################################
+## Records the readings of other sensors (real or simulated) as a trace for SimulatedSensors
+class SensorRecorder:
+
+    def __init__(self, sensors, clock, path):
+        self.sensors = sensors
+        self.clock = clock
+        self.file = open(path, "w", newline="")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(["t", "humidity", "noise", "smoke", "water"])
+
+    def read(self):
+        readings = self.sensors.read()
+        self.writer.writerow([round(self.clock.elapsed(), 3)] + list(readings))
+        self.file.flush()
+        return readings
+
+###################################################
+## Grove RGB LCD display
+class GroveDisplay:
+
+    def __init__(self):
+        from grove_rgb_lcd import setText
+        self.write = setText
+
+    def setText(self, text):
+        self.write(text)
+
+###################################################
+## Simulated LCD display. It keeps the last text and the time the I2C bus would be busy
+## setText of grove_rgb_lcd waits 0.1 s for the commands of the display and sends each character
+setupTime = 0.1
+characterTime = 0.0003
+
+class SimulatedDisplay:
+
+    ## busDelay: setText blocks for the same time as the real display
+    def __init__(self, busDelay=False):
+        self.busDelay = busDelay
+        self.text = ""
+        self.writes = 0
+        self.busTime = 0.0
+
+    def setText(self, text):
+        busy = setupTime + characterTime * len(text)
+        if self.busDelay:
+            time.sleep(busy)
+
+        self.text = text
+        self.writes = self.writes + 1
+        self.busTime = self.busTime + busy
+
+    def getText(self):
+        return self.text
+
+    def getWrites(self):
+        return self.writes
+
+    def getBusTime(self):
+        return self.busTime
+
+###################################################
+## Simulated camera. Fire is detected during duration seconds, every period seconds
+## (a video file can also be used, through the Camera of fireCamera.py)
+evidenceSize = 12000
+
+class SimulatedCamera:
+
+    def __init__(self, clock, period=300, start=60, duration=60):
+        self.clock = clock
+        self.period = period
+        self.start = start
+        self.duration = duration
+        self.threshold = 20000  # fire pixels of a detection, as in fireCamera.py
+        self.fire = False
+
+    def detect(self):
+        t = self.clock.elapsed() % self.period
+        self.fire = self.start <= t < self.start + self.duration
+        return self.fire
+
+    ## Number of pixels with the colors of fire (as in fireCamera.py)
+    def getFirePixels(self):
+        return 25000 if self.fire else 500
+
+    ## The simulated camera has no images: the evidence is a block of bytes
+    ## with the size of a typical 240x240 JPEG image
+    def getFrame(self):
+        return b"\xff\xd8" + bytes(evidenceSize - 4) + b"\xff\xd9"
+
+###################################################
+## Plays a log of NMEA sentences as if it was the serial port of the GPS (see moduleGPS.py)
+## One line is returned for each second of the clock. The log is repeated when it ends
+class NMEAPlayer:
+
+    ## Raised by pyserial on timeouts (moduleGPS checks it)
+    class SerialTimeException(Exception):
+        pass
+
+    def __init__(self, clock, path):
+        self.clock = clock
+        with open(path, "rb") as f:
+            self.lines = [line for line in f if line.strip() != b""]
+        if len(self.lines) == 0:
+            raise ValueError("Empty NMEA log: " + path)
+
+    def readline(self):
+        return self.lines[int(self.clock.elapsed()) % len(self.lines)]
+
+    def flush(self):
+        pass
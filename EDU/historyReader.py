@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+# **************************************************
+# Reader of the history of readings of the EDU (see sensorHistory.py)
+# The records of a tier in a time interval are written as CSV
+# It can be used while the EDU is running
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import sys, getopt
+import time
+import csv
+
+from sensorHistory import SensorHistory, channels
+
+###################################################
+
+historyFile = "sensorHistory.dat"
+tier = "raw"
+start = None  # seconds since the epoch; negative values are relative to now
+end = None
+outputFile = None  # None writes to the screen
+info = False
+
+###################################################
+
+def parseTime(value):
+    t = float(value)
+    if t < 0:
+        return time.time() + t
+    return t
+
+def main(argv):
+    global historyFile, tier, start, end, outputFile, info
+
+    opts, ars = getopt.getopt(argv, "hf:t:s:e:o:i", ["file=", "tier=", "start=", "end=", "output=", "info"])
+    for opt, arg in opts:
+        if opt == "-h":
+            print ("historyReader.py -f <historyFile> -t <tier: raw, minute or hour> -s <start> -e <end> -o <outputFile> -i")
+            print ("start and end are seconds since the epoch (negative values are relative to now, e.g. -s -3600)")
+            sys.exit(1)
+        elif opt in ("-f", "--file"):
+            historyFile = arg
+        elif opt in ("-t", "--tier"):
+            tier = arg
+        elif opt in ("-s", "--start"):
+            start = parseTime(arg)
+        elif opt in ("-e", "--end"):
+            end = parseTime(arg)
+        elif opt in ("-o", "--output"):
+            outputFile = arg
+        elif opt in ("-i", "--info"):
+            info = True
+
+    history = SensorHistory(historyFile, readOnly=True)
+
+    if info:
+        history.printValues()
+        return
+
+    records = history.query(history.tierNumber(tier), start, end)
+
+    output = sys.stdout if outputFile is None else open(outputFile, "w", newline="")
+    writer = csv.writer(output)
+    writer.writerow(["time", "date", "count"] + [c + "_mean" for c in channels] + [c + "_max" for c in channels])
+    for t, count, means, maximums in records:
+        writer.writerow([round(t, 3), time.ctime(t), count] + [round(v, 3) for v in means] + [round(v, 3) for v in maximums])
+
+    if outputFile is not None:
+        output.close()
+
+###################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
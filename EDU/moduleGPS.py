@@ -6,7 +6,6 @@
 # Date        : 12/05/2020
 # **************************************************
 
-import serial
 import time
 import sys
 import re
@@ -32,8 +31,12 @@ patterns=["$GPGGA",
 
 class groveGPS:
     
-    def __init__(self, port='/dev/ttyAMA0', baud=9600, timeout=0):
-        self.ser = serial.Serial(port, baud, timeout=timeout)
+    ## ser may be given to read the sentences from another source (e.g. NMEAPlayer of hardware.py)
+    def __init__(self, port='/dev/ttyAMA0', baud=9600, timeout=0, ser=None):
+        if ser is None:
+            import serial  # pyserial is only loaded when the GPS is used
+            ser = serial.Serial(port, baud, timeout=timeout)
+        self.ser = ser
         self.ser.flush()
         self.raw_line = ""
         self.gga = []
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Overhead of the ring of frames of the clips (see videoRing.py and the capture thread of fireCamera.py)
+# The detection of fire runs at a sensing period over a video file, without the ring and with the
+# ring at several frame rates. A detection is triggered in the middle of each run, so a clip is written.
+# For each configuration, the CPU of the process (percentage of one core), the time of the detection
+# and the frames of the clip are presented
+# Without a video file, a synthetic video (a moving fire-colored square) is created
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# *********************************************************************
+
+import os
+import sys, getopt
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from fireCamera import Camera
+from videoRing import VideoRing
+
+##############################################################################
+
+videoFile = None
+duration = 10.0  # seconds of each configuration
+period = 0.5  # sensing period (s)
+rates = [0, 5, 10, 15]  # frames per second of the ring (0: without the ring)
+clipPre = 2
+clipPost = 2
+clipMemory = 8  # MB
+
+##############################################################################
+
+## Synthetic video of 640x480 frames
+def createVideo(path, frames=300):
+    import cv2
+    import numpy as np
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (640, 480))
+    for i in range(frames):
+        frame = np.full((480, 640, 3), 60, np.uint8)
+        x = (i * 4) % 480
+        frame[100:300, x:x + 160] = (0, 140, 255)  # orange (BGR)
+        writer.write(frame)
+    writer.release()
+
+def measure(source, fps, directory):
+    camera = Camera(source)
+    ring = None
+    if fps > 0:
+        ring = VideoRing(directory, clipPre, clipPost, int(clipMemory * 1024 * 1024), fps)
+        ring.start()
+        camera.setRing(ring)
+
+    detections = []
+    cpu = time.process_time()
+    start = time.monotonic()
+    triggered = False
+    while time.monotonic() - start < duration:
+        cycle = time.perf_counter()
+        camera.detect()
+        detections.append(time.perf_counter() - cycle)
+
+        if ring is not None and not triggered and time.monotonic() - start >= duration / 2:
+            ring.trigger()
+            triggered = True
+
+        delay = period - (time.perf_counter() - cycle)
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.monotonic() - start
+    cpu = (time.process_time() - cpu) / elapsed * 100
+
+    name = "without the ring" if fps == 0 else "ring at " + str(fps) + " FPS"
+    print(name + ": CPU (% of one core) =", round(cpu, 1), ", detection time (ms) =", round(sum(detections) / len(detections) * 1000, 2))
+    if ring is not None:
+        ## The clip ends clipPost seconds after the trigger, at the middle of the run
+        time.sleep(0.5)
+        clips = [f for f in os.listdir(directory) if f.endswith(".mjpeg")]
+        frames = clipFrames(os.path.join(directory, clips[0])) if len(clips) > 0 else 0
+        print("    encoded =", ring.encoded, ", skipped =", ring.skipped, ", encoding time (ms) =", round(ring.encodeTime / max(1, ring.encoded) * 1000, 2),
+              ", ring memory (KB) =", ring.bytes // 1024, ", clip frames =", frames, "(" + str(clipPre + clipPost), "s)")
+
+## Number of JPEG images of a MJPEG clip
+def clipFrames(path):
+    with open(path, "rb") as f:
+        return f.read().count(b"\xff\xd9")
+
+##############################################################################
+
+def main(argv):
+    global videoFile, duration, period, rates
+
+    opts, ars = getopt.getopt(argv, "hv:d:p:r:", ["video=", "duration=", "period=", "rates="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("ringBenchmark.py -v <videoFile> -d <duration (s)> -p <sensing period (s)> -r <frame rates, e.g. 0,5,10,15>")
+            sys.exit(1)
+        elif opt in ("-v", "--video"):
+            videoFile = arg
+        elif opt in ("-d", "--duration"):
+            duration = float(arg)
+        elif opt in ("-p", "--period"):
+            period = float(arg)
+        elif opt in ("-r", "--rates"):
+            rates = [float(r) for r in arg.split(",")]
+
+    temporary = tempfile.mkdtemp()
+    try:
+        source = videoFile
+        if source is None:
+            source = os.path.join(temporary, "video.avi")
+            createVideo(source)
+
+        print("Sensing period:", period, "s,", duration, "s per configuration")
+        ## Each configuration runs in its own process, so the threads of the previous ring are not measured
+        for fps in rates:
+            directory = os.path.join(temporary, "clips_" + str(fps))
+            process = multiprocessing.Process(target=measure, args=(source, fps, directory))
+            process.start()
+            process.join()
+    finally:
+        shutil.rmtree(temporary)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
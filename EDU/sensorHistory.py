@@ -0,0 +1,242 @@
+# **************************************************
+# History of the readings of the EDU, kept in a memory-mapped file
+# Every reading of the sensors (and the number of fire pixels of the camera) is
+# stored in a fixed-size ring of raw records. Downsampled tiers (1 minute and 1 hour,
+# with the mean and the maximum of each channel) are updated incrementally, so weeks
+# of history fit in a few MB. Only the pages of the new records are written
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import mmap
+import os
+import struct
+import threading
+import time
+
+###################################################
+
+## Channels of each record
+channels = ["humidity", "noise", "smoke", "water", "firePixels"]
+
+## Tiers: [name, resolution in seconds (0 keeps every reading), default capacity in records]
+## With the default capacities: about 1 day of raw readings (fs = 5 s), 4 weeks of minutes and 1 year of hours
+tiers = [["raw", 0, 20000],
+         ["minute", 60, 40320],
+         ["hour", 3600, 8760]]
+
+magic = b"CAHIST01"
+
+## File header: magic, number of channels, number of tiers
+headerFormat = struct.Struct("<8sII")
+## Header of each tier: resolution, capacity, number of records written (the ring position)
+tierFormat = struct.Struct("<IIQ")
+## Record: time (seconds since the epoch), number of readings, mean of each channel, maximum of each channel
+recordFormat = struct.Struct("<dI" + "f" * len(channels) * 2)
+
+## The changed pages are written to the file at least every flushInterval seconds
+## (the system may write them before), with the open buckets of the downsampled tiers.
+## A crash (or a power loss) loses at most this interval, in every tier
+flushInterval = 60
+
+###################################################
+
+class SensorHistory:
+
+    ## capacities: number of records of each tier (None uses the defaults)
+    ## The file is created (or recreated, if its layout is different) when needed
+    def __init__(self, path, capacities=None, readOnly=False):
+        if capacities is None:
+            capacities = [tier[2] for tier in tiers]
+
+        self.path = path
+        self.readOnly = readOnly
+        size = headerFormat.size + tierFormat.size * len(tiers) + sum(capacities) * recordFormat.size
+
+        if readOnly:
+            self.file = open(path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.readLayout()
+            return
+
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, "wb") as f:
+                f.truncate(size)
+            created = True
+        else:
+            created = False
+
+        self.file = open(path, "r+b")
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+        if created or not self.validLayout(capacities):
+            headerFormat.pack_into(self.map, 0, magic, len(channels), len(tiers))
+            for i, tier in enumerate(tiers):
+                tierFormat.pack_into(self.map, headerFormat.size + i * tierFormat.size, tier[1], capacities[i], 0)
+
+        self.readLayout()
+
+        ## Readings of the open bucket of each downsampled tier: [bucket, count, sums, maximums, position]
+        ## The open buckets are stored when they are closed, at each flush and when the history is closed (position of the stored record)
+        ## The last record of each tier is open again, so a restart within the same minute (or hour) continues it
+        self.buckets = [None] * len(tiers)
+        for tier in range(1, len(tiers)):
+            written = self.getWritten(tier)
+            if written > 0:
+                t, count, means, maximums = self.readRecord(tier, written - 1)
+                self.buckets[tier] = [int(t // self.resolutions[tier]), count, [m * count for m in means], maximums, written - 1]
+
+        self.lock = threading.Lock()  # readings may still arrive while the EDU exits
+        self.closed = False
+        self.lastFlush = time.monotonic()
+
+    def validLayout(self, capacities):
+        m, n, t = headerFormat.unpack_from(self.map, 0)
+        if m != magic or n != len(channels) or t != len(tiers):
+            return False
+        for i, tier in enumerate(tiers):
+            resolution, capacity, written = tierFormat.unpack_from(self.map, headerFormat.size + i * tierFormat.size)
+            if resolution != tier[1] or capacity != capacities[i]:
+                return False
+        return True
+
+    ## Layout of the tiers, as stored in the file
+    def readLayout(self):
+        m, n, t = headerFormat.unpack_from(self.map, 0)
+        if m != magic or n != len(channels) or t != len(tiers):
+            raise ValueError("Not a history file of the EDU: " + self.path)
+
+        self.resolutions = []
+        self.capacities = []
+        self.tierOffsets = []
+        offset = headerFormat.size + tierFormat.size * len(tiers)
+        for i in range(len(tiers)):
+            resolution, capacity, written = tierFormat.unpack_from(self.map, headerFormat.size + i * tierFormat.size)
+            self.resolutions.append(resolution)
+            self.capacities.append(capacity)
+            self.tierOffsets.append(offset)
+            offset = offset + capacity * recordFormat.size
+
+    def getWritten(self, tier):
+        return tierFormat.unpack_from(self.map, headerFormat.size + tier * tierFormat.size)[2]
+
+    ## Write a record at the next position of the ring of a tier (or over the record at index, which is not advanced)
+    ## The record is written before the position is advanced, so readers never see a partial new record
+    ## Returns the index of the record
+    def writeRecord(self, tier, t, count, means, maximums, index=None):
+        written = self.getWritten(tier)
+        if index is None:
+            index = written
+        position = self.tierOffsets[tier] + (index % self.capacities[tier]) * recordFormat.size
+        recordFormat.pack_into(self.map, position, t, count, *(list(means) + list(maximums)))
+        if index == written:
+            tierFormat.pack_into(self.map, headerFormat.size + tier * tierFormat.size, self.resolutions[tier], self.capacities[tier], written + 1)
+        return index
+
+    def readRecord(self, tier, index):
+        n = len(channels)
+        values = recordFormat.unpack_from(self.map, self.tierOffsets[tier] + (index % self.capacities[tier]) * recordFormat.size)
+        return [values[0], values[1], list(values[2:2 + n]), list(values[2 + n:])]
+
+    ## Store the mean and the maximum of a bucket (again over its record, if it was already stored)
+    def storeBucket(self, tier, bucket):
+        bucket[4] = self.writeRecord(tier, bucket[0] * self.resolutions[tier], bucket[1], [s / bucket[1] for s in bucket[2]], bucket[3], bucket[4])
+
+    ## Store a reading. values follow the order of channels
+    def append(self, t, values):
+        with self.lock:
+            if self.closed:
+                return
+
+            self.writeRecord(0, t, 1, values, values)
+
+            for tier in range(1, len(tiers)):
+                bucket = int(t // self.resolutions[tier])
+                current = self.buckets[tier]
+
+                if current is not None and current[0] != bucket:
+                    ## The bucket is closed: its mean and maximum are stored
+                    self.storeBucket(tier, current)
+                    current = None
+
+                if current is None:
+                    self.buckets[tier] = [bucket, 1, list(values), list(values), None]
+                else:
+                    current[1] = current[1] + 1
+                    for i, v in enumerate(values):
+                        current[2][i] = current[2][i] + v
+                        if v > current[3][i]:
+                            current[3][i] = v
+
+            if time.monotonic() - self.lastFlush >= flushInterval:
+                self.storeBuckets()
+                self.flush()
+
+    ## Number of the tier with the given name
+    def tierNumber(self, name):
+        for i, tier in enumerate(tiers):
+            if tier[0] == name:
+                return i
+        raise ValueError("Unknown tier: " + str(name))
+
+    ## Time of the record with the given ring position
+    def timeAt(self, tier, index):
+        return struct.unpack_from("<d", self.map, self.tierOffsets[tier] + (index % self.capacities[tier]) * recordFormat.size)[0]
+
+    ## Records of a tier with start <= time < end, as [time, count, means, maximums]
+    ## The ring is ordered by time, so the first record is found with a binary search
+    def query(self, tier, start=None, end=None):
+        written = self.getWritten(tier)
+        first = max(0, written - self.capacities[tier])
+
+        low, high = first, written
+        if start is not None:
+            while low < high:
+                middle = (low + high) // 2
+                if self.timeAt(tier, middle) < start:
+                    low = middle + 1
+                else:
+                    high = middle
+
+        records = []
+        for index in range(low, written):
+            record = self.readRecord(tier, index)
+            if end is not None and record[0] >= end:
+                break
+            records.append(record)
+        return records
+
+    ## Store the open buckets, over their records (they are continued by the next readings)
+    def storeBuckets(self):
+        for tier in range(1, len(tiers)):
+            if self.buckets[tier] is not None:
+                self.storeBucket(tier, self.buckets[tier])
+
+    ## Write the changed pages to the file
+    def flush(self):
+        if not self.readOnly:
+            self.map.flush()
+            self.lastFlush = time.monotonic()
+
+    ## The open buckets are stored, so the readings of the current minute and hour are not lost
+    def close(self):
+        if self.readOnly:
+            self.map.close()
+            self.file.close()
+            return
+
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+
+            self.storeBuckets()
+            self.flush()
+            self.map.close()
+            self.file.close()
+
+    def printValues(self):
+        for i, tier in enumerate(tiers):
+            written = self.getWritten(i)
+            print ("Tier", tier[0], ": records =", min(written, self.capacities[i]), "of", self.capacities[i], ", written =", written)
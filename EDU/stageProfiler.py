@@ -0,0 +1,122 @@
+# **************************************************
+# Profiler of the stages of the detection of fire (see fireCamera.py)
+# The time of each stage (read, resize, blur, ...) is kept for the last frames,
+# and the percentiles are presented in the debug output, written to a local stats
+# file and answered through a local UDP socket
+# It can be enabled and disabled while the EDU is running (SIGUSR1 or the socket).
+# When it is disabled, the camera only checks a flag at each stage
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import collections
+import json
+import os
+import socket
+import threading
+import time
+
+###################################################
+
+percentiles = [50, 90, 99]
+
+###################################################
+
+class StageProfiler:
+
+    ## window: number of the last measures of each stage used for the percentiles
+    def __init__(self, window=1000, enabled=False):
+        self.window = window
+        self.enabled = enabled
+        self.stages = {}  # name -> deque of seconds (in the order of the pipeline)
+        self.counts = {}  # name -> measures since the start
+
+        ## The cameras of a group are analysed by several threads (see cameraGroup.py) with the same profiler
+        self.lock = threading.Lock()
+
+    def isEnabled(self):
+        return self.enabled
+
+    def setEnabled(self, enabled):
+        self.enabled = enabled
+        print ("Profiling of the camera", "enabled" if enabled else "disabled")
+
+    ## Record the stage that started at start, and return the current time (start of the next stage)
+    def mark(self, stage, start):
+        now = time.perf_counter()
+        with self.lock:
+            measures = self.stages.get(stage)
+            if measures is None:
+                measures = self.stages.setdefault(stage, collections.deque(maxlen=self.window))
+            measures.append(now - start)
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+        return now
+
+    def clear(self):
+        with self.lock:
+            self.stages = {}
+            self.counts = {}
+
+    ## Percentiles (ms) of each stage: {stage: {"count": n, "p50": ..., "p90": ..., "p99": ..., "mean": ...}}
+    def getStats(self):
+        ## The measures are copied under the lock, and sorted without it
+        with self.lock:
+            copies = [(stage, list(measures), self.counts.get(stage, 0)) for stage, measures in self.stages.items()]
+
+        stats = {}
+        for stage, measures, count in copies:
+            values = sorted(measures)
+            if len(values) == 0:
+                continue
+            stageStats = {"count": count}
+            for p in percentiles:
+                stageStats["p" + str(p)] = round(values[min(len(values) - 1, len(values) * p // 100)] * 1000, 3)
+            stageStats["mean"] = round(sum(values) / len(values) * 1000, 3)
+            stats[stage] = stageStats
+        return stats
+
+    def printValues(self):
+        stats = self.getStats()
+        print ("Camera stages (ms, last", self.window, "frames):")
+        for stage, s in stats.items():
+            print ("  " + stage.ljust(12), "p50 =", s["p50"], ", p90 =", s["p90"], ", p99 =", s["p99"], ", mean =", s["mean"], ", frames =", s["count"])
+
+    ## Local stats file (JSON), replaced atomically so it can be read at any time
+    def writeFile(self, path):
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump({"time": time.time(), "enabled": self.enabled, "stages": self.getStats()}, f)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print ("Error when writing the profile:", e)
+
+###################################################
+## Local UDP socket of the profiler (only on 127.0.0.1)
+## "on" and "off" enable and disable the profiler, "clear" discards the measures,
+## and any other datagram is answered with the stats (JSON)
+class profilerThread (threading.Thread):
+
+    def __init__(self, profiler, port):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.profiler = profiler
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", port))
+
+    def run(self):
+        while True:
+            try:
+                received, address = self.socket.recvfrom(64)
+                command = received.decode("utf-8", "replace").strip()
+                if command == "on":
+                    self.profiler.setEnabled(True)
+                elif command == "off":
+                    self.profiler.setEnabled(False)
+                elif command == "clear":
+                    self.profiler.clear()
+
+                reply = {"enabled": self.profiler.isEnabled(), "stages": self.profiler.getStats()}
+                self.socket.sendto(json.dumps(reply).encode("utf-8"), address)
+            except OSError as e:
+                print ("Error in the socket of the profiler:", e)
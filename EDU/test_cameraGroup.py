@@ -0,0 +1,75 @@
+# *********************************************************************
+# Tests of the scheduling of the cameras of an EDU (cameraGroup.py)
+# Run from this directory with: python3 -m unittest test_cameraGroup
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# *********************************************************************
+
+import unittest
+
+from cameraGroup import CameraGroup
+
+########################################################
+
+## Camera with a given number of fire pixels in its frames
+class FakeCamera():
+
+    def __init__(self, firePixels=0, threshold=20000):
+        self.firePixels = firePixels
+        self.threshold = threshold
+        self.frames = 0
+
+    def detect(self):
+        self.frames = self.frames + 1
+        return self.firePixels >= self.threshold
+
+    def getFirePixels(self):
+        return self.firePixels
+
+########################################################
+
+class CameraGroupTest(unittest.TestCase):
+
+    ## A hot camera (at hotRatio of its threshold) is analysed, even if a waiting camera has a higher priority
+    def test_hot_camera_before_waiting_camera(self):
+        group = CameraGroup([FakeCamera(), FakeCamera(), FakeCamera()], 1)
+        group.firePixels = [10000, 0, 0]
+        group.waiting = [0, 2, 0]
+        self.assertGreater(group.priority(1), group.priority(0))
+        self.assertEqual(group.schedule(), [0])
+
+    ## All the hot cameras are analysed, even beyond framesPerCycle
+    def test_all_hot_cameras(self):
+        group = CameraGroup([FakeCamera() for i in range(4)], 2)
+        group.firePixels = [15000, 0, 12000, 11000]
+        self.assertEqual(group.schedule(), [0, 2, 3])
+
+    ## The remaining frames go to the other cameras, by priority
+    def test_remaining_frames_by_priority(self):
+        group = CameraGroup([FakeCamera() for i in range(4)], 3)
+        group.firePixels = [15000, 0, 2000, 0]
+        group.waiting = [0, 3, 0, 1]
+        self.assertEqual(group.schedule(), [0, 1, 3])
+
+    ## Without hot cameras, all cameras are analysed in turn
+    def test_cameras_in_turn(self):
+        cameras = [FakeCamera() for i in range(3)]
+        group = CameraGroup(cameras, 1)
+        for cycle in range(6):
+            group.detect()
+        self.assertEqual([camera.frames for camera in cameras], [2, 2, 2])
+
+    ## A hot camera is analysed at every cycle, and fire in any camera is a detection
+    def test_hot_camera_every_cycle(self):
+        cameras = [FakeCamera(), FakeCamera(25000), FakeCamera()]
+        group = CameraGroup(cameras, 1)
+        group.firePixels = [0, 25000, 0]  # its last frame had fire
+        detections = [group.detect() for cycle in range(6)]
+        self.assertTrue(detections[-1])
+        self.assertEqual(cameras[1].frames, 6)
+
+########################################################
+
+if __name__ == '__main__':
+    unittest.main()
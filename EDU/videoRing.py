@@ -0,0 +1,165 @@
+# **************************************************
+# Ring of the recent frames of the camera, kept as JPEG images in memory
+# The camera offers its frames at fps frames per second (see the capture thread of fireCamera.py)
+# When a complex event is detected, the frames before and after the detection
+# are written to a clip (a MJPEG file: the JPEG images one after the other)
+# The frames are encoded by a background thread, so the sensing is not delayed.
+# If the encoder is busy, the new frame replaces the one waiting to be encoded
+# The frames after the detection are written to the clip as they are encoded, so only the ring is kept in memory
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 12/05/2020
+# **************************************************
+
+import collections
+import os
+import threading
+import time
+
+###################################################
+
+## Longest clip after its first detection (s). New detections extend the clip up to this limit,
+## so a fire detected for hours gives a sequence of clips instead of a single endless one
+maxClipSeconds = 60
+
+###################################################
+
+class VideoRing (threading.Thread):
+
+    ## preSeconds and postSeconds: window of the clip around the detection
+    ## maxBytes: memory used by the encoded frames of the ring
+    ## fps: frames per second captured for the ring
+    ## listener: optional function called with the path of each written clip
+    def __init__(self, directory, preSeconds, postSeconds, maxBytes, fps=10, quality=70, listener=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.directory = directory
+        self.preSeconds = preSeconds
+        self.postSeconds = postSeconds
+        self.maxBytes = maxBytes
+        self.fps = fps
+        self.quality = quality
+        self.listener = listener
+
+        self.frames = collections.deque()  # [time, JPEG bytes]
+        self.bytes = 0
+        self.pending = None  # [time, frame] waiting to be encoded
+        self.triggers = []  # times of the detections not yet handled
+        self.clip = None  # clip being written: [end time, time limit, file, name, number of frames]
+        self.condition = threading.Condition()
+
+        ## Counters, to measure the overhead of the ring
+        self.encoded = 0
+        self.skipped = 0
+        self.encodeTime = 0.0
+        self.clips = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    ## Called by the camera with each captured frame. It never blocks
+    def offer(self, frame):
+        with self.condition:
+            if self.pending is not None:
+                self.skipped = self.skipped + 1
+            self.pending = [time.monotonic(), frame]
+            self.condition.notify()
+
+    ## Called when a complex event is detected
+    def trigger(self):
+        with self.condition:
+            self.triggers.append([time.monotonic(), time.time()])
+            self.condition.notify()
+
+    def run(self):
+        import cv2
+
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending is not None or len(self.triggers) > 0, 1.0)
+                item = self.pending
+                self.pending = None
+                triggers = self.triggers
+                self.triggers = []
+
+            for t, date in triggers:
+                if self.clip is None:
+                    self.startClip(t, date)
+                else:
+                    ## A new detection extends the current clip, up to its limit
+                    self.clip[0] = min(t + self.postSeconds, self.clip[1])
+
+            if item is not None:
+                start = time.perf_counter()
+                ok, jpeg = cv2.imencode(".jpg", item[1], [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+                self.encodeTime = self.encodeTime + time.perf_counter() - start
+
+                if ok:
+                    frame = [item[0], jpeg.tobytes()]
+                    self.encoded = self.encoded + 1
+                    self.put(frame)
+                    if self.clip is not None and frame[0] <= self.clip[0]:
+                        self.writeFrame(frame)
+
+            if self.clip is not None and time.monotonic() > self.clip[0]:
+                self.endClip()
+
+    ## Insert an encoded frame, removing the old ones (out of the window or above the memory limit)
+    def put(self, frame):
+        self.frames.append(frame)
+        self.bytes = self.bytes + len(frame[1])
+        while len(self.frames) > 1 and (self.bytes > self.maxBytes or self.frames[0][0] < frame[0] - self.preSeconds):
+            old = self.frames.popleft()
+            self.bytes = self.bytes - len(old[1])
+
+    ## The clip starts with the frames of the ring in the window before the detection
+    ## It is written to a temporary file, renamed when the clip ends
+    def startClip(self, t, date):
+        name = os.path.join(self.directory, "clip_" + time.strftime("%Y%m%d_%H%M%S", time.localtime(date)))
+        if os.path.exists(name + ".mjpeg"):
+            name = name + "_" + str(self.clips)  # the previous clip ended in the same second
+        name = name + ".mjpeg"
+        try:
+            f = open(name + ".tmp", "wb")
+        except OSError as e:
+            print ("Error when writing the clip:", e)
+            return
+
+        self.clip = [t + min(self.postSeconds, maxClipSeconds), t + maxClipSeconds, f, name, 0]
+        for frame in list(self.frames):
+            if self.clip is None:
+                break
+            if frame[0] >= t - self.preSeconds:
+                self.writeFrame(frame)
+
+    def writeFrame(self, frame):
+        try:
+            self.clip[2].write(frame[1])
+            self.clip[4] = self.clip[4] + 1
+        except OSError as e:
+            print ("Error when writing the clip:", e)
+            self.clip[2].close()
+            self.clip = None
+
+    def endClip(self):
+        f, name, frames = self.clip[2], self.clip[3], self.clip[4]
+        self.clip = None
+        try:
+            f.close()
+            if frames == 0:
+                os.remove(name + ".tmp")
+                return
+            os.replace(name + ".tmp", name)
+        except OSError as e:
+            print ("Error when writing the clip:", e)
+            return
+
+        self.clips = self.clips + 1
+        print ("Clip with", frames, "frames written to", name)
+        if self.listener is not None:
+            self.listener(name)
+
+    def printValues(self):
+        average = self.encodeTime / self.encoded * 1000 if self.encoded > 0 else 0.0
+        print ("Video ring: frames =", len(self.frames), ", memory (KB) =", self.bytes // 1024, "of", self.maxBytes // 1024,
+               ", encoded =", self.encoded, ", skipped =", self.skipped, ", average encoding time (ms) =", round(average, 3), ", clips =", self.clips)
@@ -0,0 +1,63 @@
+# *********************************************************************
+# Table of the currently active Emergency Alarms (EA) of the EPU
+# Each incident (position of the EA) keeps only its last EA, which is published
+# as a retained MQTT message. When the incident is not refreshed anymore, it
+# expires and an empty retained message (tombstone) clears it in the Broker
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import threading
+import time
+
+from eaTransmitter import encodeGeohash
+
+########################################################
+
+## Number of geohash characters identifying an incident (9 is about 5x5 m)
+incidentPrecision = 9
+
+########################################################
+
+## Identification of the incident of an EA
+def incidentKey(ea):
+    return encodeGeohash(ea.getLatitude(), ea.getLongitude(), incidentPrecision)
+
+########################################################
+
+class ActiveAlarms():
+
+    def __init__(self, activeTime):
+        self.activeTime = activeTime  # seconds without refresh before an incident expires
+        self.alarms = {}  # incident -> [JSON of the last EA, expiration time]
+        self.lock = threading.Lock()
+
+    ## Insert or refresh an incident
+    def put(self, key, eaJSON):
+        with self.lock:
+            self.alarms[key] = [eaJSON, time.monotonic() + self.activeTime]
+
+    ## Incident of a previous execution of the EPU (retained by the Broker)
+    ## It is kept as refreshed now, unless it was already refreshed by a new EA
+    def recover(self, key, eaJSON):
+        with self.lock:
+            if key not in self.alarms:
+                self.alarms[key] = [eaJSON, time.monotonic() + self.activeTime]
+
+    ## Remove and return the keys of the expired incidents
+    def expire(self):
+        now = time.monotonic()
+        with self.lock:
+            expired = [key for key, alarm in self.alarms.items() if alarm[1] <= now]
+            for key in expired:
+                del self.alarms[key]
+        return expired
+
+    ## Copy of the active incidents: incident -> JSON of the last EA
+    def getAlarms(self):
+        with self.lock:
+            return {key: alarm[0] for key, alarm in self.alarms.items()}
+
+    def getSize(self):
+        return len(self.alarms)
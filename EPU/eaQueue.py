@@ -0,0 +1,154 @@
+# *********************************************************************
+# Bounded priority queue placed between the computation of the EA and
+# its publication to the MQTT Broker
+# EA with complex events and higher severity levels (sl) are published first
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import heapq
+import threading
+import time
+
+########################################################
+
+## Supported policies when the queue is full
+## drop: the EA with the lowest priority is discarded (it may be the new one)
+## coalesce: a queued EA for the same location is replaced by the new one (stale refresh),
+##           and only then the lowest priority EA is discarded
+##           A queued EA is never replaced by an EA of lower priority (e.g. a complex event by an instance refresh):
+##           both are queued, so the fire alarm is still published
+## block: the receiving thread waits for space in the queue (backpressure to the ingestion of ER)
+overflowPolicies = ["drop", "coalesce", "block"]
+
+## Priority classes, used to report the latency inside the queue
+PRIORITY_COMPLEX = 0
+PRIORITY_INSTANCE = 1
+
+########################################################
+
+class EAQueue():
+
+    def __init__(self, maxSize, policy):
+        if policy not in overflowPolicies:
+            raise ValueError("Unknown overflow policy: " + str(policy))
+
+        self.maxSize = maxSize
+        self.policy = policy
+
+        ## Entries are lists: [priority class, -sl, sequence, enqueue time, ea, key]
+        ## An entry whose ea is None was replaced (coalesced) and is ignored when popped
+        ## When these entries outnumber the queued EA, the heap is compacted (see compact)
+        self.heap = []
+        self.size = 0
+        self.sequence = 0  # FIFO order among EA with the same priority
+        self.pending = {}  # location of the EA -> queued entry
+        self.condition = threading.Condition()
+
+        ## Counters to follow the behaviour of the queue
+        self.dropped = 0
+        self.coalesced = 0
+        self.blocked = 0
+        self.published = [0, 0]  # per priority class
+        self.waitTime = [0.0, 0.0]  # accumulated time inside the queue per priority class
+        self.maxWaitTime = [0.0, 0.0]
+
+    ## Returns the priority of an EA. Lower values are published first
+    def priorityOf(self, ea):
+        if len(ea.getEventsTypesComplex()) > 0:
+            return (PRIORITY_COMPLEX, -ea.getSeverityLevel())
+        return (PRIORITY_INSTANCE, -ea.getSeverityLevel())
+
+    ## Insert an EA. Returns False if the EA was discarded
+    def put(self, ea):
+        key = (ea.getLatitude(), ea.getLongitude())
+        priority = self.priorityOf(ea)
+
+        with self.condition:
+            queued = self.pending.get(key)
+            if self.policy == "coalesce" and queued is not None and priority <= (queued[0], queued[1]):
+                ## The queued EA is a stale refresh of the same location
+                queued[4] = None
+                self.size = self.size - 1
+                self.coalesced = self.coalesced + 1
+                self.compact()
+
+            if self.size >= self.maxSize:
+                if self.policy == "block":
+                    self.blocked = self.blocked + 1
+                    while self.size >= self.maxSize:
+                        self.condition.wait()
+                elif not self.dropLowest(priority):
+                    self.dropped = self.dropped + 1
+                    return False
+
+            entry = [priority[0], priority[1], self.sequence, time.monotonic(), ea, key]
+            self.sequence = self.sequence + 1
+            heapq.heappush(self.heap, entry)
+            self.pending[key] = entry
+            self.size = self.size + 1
+
+            self.condition.notify_all()
+
+        return True
+
+    ## Discard the queued EA with the lowest priority, if it is lower than the given priority
+    def dropLowest(self, priority):
+        worst = None
+        for entry in self.heap:
+            if entry[4] is not None and (worst is None or entry[:3] > worst[:3]):
+                worst = entry
+
+        if worst is None or (worst[0], worst[1]) <= priority:
+            return False
+
+        worst[4] = None
+        if self.pending.get(worst[5]) is worst:
+            del self.pending[worst[5]]
+        self.size = self.size - 1
+        self.dropped = self.dropped + 1
+        self.compact()
+        return True
+
+    ## Remove the replaced and dropped entries from the heap, when they outnumber the queued EA
+    ## Otherwise the heap grows without bound while the broker is stalled
+    def compact(self):
+        if len(self.heap) - self.size > self.size:
+            self.heap = [entry for entry in self.heap if entry[4] is not None]
+            heapq.heapify(self.heap)
+
+    ## Remove the EA with the highest priority, waiting until there is one
+    ## With a timeout (seconds), None is returned if no EA arrives in time
+    def get(self, timeout=None):
+        with self.condition:
+            while True:
+                if self.size == 0 and not self.condition.wait_for(lambda: self.size > 0, timeout):
+                    return None
+
+                entry = heapq.heappop(self.heap)
+                if entry[4] is None:
+                    continue  # coalesced or dropped
+
+                if self.pending.get(entry[5]) is entry:
+                    del self.pending[entry[5]]
+                self.size = self.size - 1
+
+                wait = time.monotonic() - entry[3]
+                self.published[entry[0]] = self.published[entry[0]] + 1
+                self.waitTime[entry[0]] = self.waitTime[entry[0]] + wait
+                if wait > self.maxWaitTime[entry[0]]:
+                    self.maxWaitTime[entry[0]] = wait
+
+                self.condition.notify_all()
+                return entry[4]
+
+    def getSize(self):
+        return self.size
+
+    def printValues(self):
+        with self.condition:
+            print ("EA queue size:", self.size, "of", self.maxSize, ", policy:", self.policy, ", dropped:", self.dropped, ", coalesced:", self.coalesced, ", blocked:", self.blocked)
+            for p, name in ((PRIORITY_COMPLEX, "complex"), (PRIORITY_INSTANCE, "instance")):
+                if self.published[p] > 0:
+                    print ("Published", name, "EA:", self.published[p], ", average wait (s):", round(self.waitTime[p] / self.published[p], 4), ", max wait (s):", round(self.maxWaitTime[p], 4))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Load test of the queue of EA (see eaQueue.py)
+# EA are produced faster than they can be published (overload), with a small fraction
+# of EA with complex events. The time from the creation of each EA to its publication
+# is measured per priority class, for every overflow policy and for the previous
+# behaviour of the EPU (EA published in arrival order)
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import sys, getopt
+import queue
+import random
+import threading
+import time
+
+from elementsEPU import EA
+from eaQueue import EAQueue, overflowPolicies, PRIORITY_COMPLEX, PRIORITY_INSTANCE
+
+##############################################################################
+
+numberEA = 20000  # EA produced in each test
+complexFraction = 0.02  # fraction of EA with complex events
+productionRate = 5000.0  # EA per second produced by the scoring stage
+publishTime = 1.0  # milliseconds to publish each EA (1000 EA per second: 5 times less than produced)
+queueSize = 1000
+numberLocations = 500  # distinct positions of EDUs (refreshes of the same position can be coalesced)
+
+##############################################################################
+
+def createEA(i, rnd):
+    ea = EA(i, None, 41.0 + rnd.randrange(numberLocations) * 0.001, -8.6, int(time.time() * 1000))
+    if rnd.random() < complexFraction:
+        ea.putEventComplex(1)
+        ea.setSeverityLevel(rnd.randint(60, 100))
+    else:
+        ea.putEventInstance(rnd.choice([3, 4, 8, 16]))
+        ea.setSeverityLevel(rnd.randint(10, 60))
+    return ea
+
+## Arrival order, as published before the queue of EA (only the time of publication is limited)
+class FIFOQueue():
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def put(self, ea):
+        self.queue.put(ea)
+        return True
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+## Latency (ms) of the EA of each priority class, and number of produced EA
+def run(eaQueue):
+    rnd = random.Random(1)
+    created = {}  # id of the EA -> creation time
+    latency = {PRIORITY_COMPLEX: [], PRIORITY_INSTANCE: []}
+    produced = {PRIORITY_COMPLEX: 0, PRIORITY_INSTANCE: 0}
+    finished = threading.Event()
+
+    def producer():
+        start = time.perf_counter()
+        for i in range(numberEA):
+            ## Pace of the production
+            delay = start + i / productionRate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            ea = createEA(i, rnd)
+            p = PRIORITY_COMPLEX if len(ea.getEventsTypesComplex()) > 0 else PRIORITY_INSTANCE
+            produced[p] = produced[p] + 1
+            created[i] = time.perf_counter()
+            eaQueue.put(ea)
+        finished.set()
+
+    def consumer():
+        while True:
+            ea = eaQueue.get(0.2)
+            if ea is None:
+                if finished.is_set():
+                    return
+                continue
+
+            ## Time of the publication
+            time.sleep(publishTime / 1000)
+            p = PRIORITY_COMPLEX if len(ea.getEventsTypesComplex()) > 0 else PRIORITY_INSTANCE
+            latency[p].append((time.perf_counter() - created[ea.getId()]) * 1000)
+
+    threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return latency, produced
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+def report(name, latency, produced):
+    print(name)
+    for p, className in ((PRIORITY_COMPLEX, "complex "), (PRIORITY_INSTANCE, "instance")):
+        values = latency[p]
+        if len(values) == 0:
+            print("   ", className, ": published 0 of", produced[p])
+            continue
+        print("   ", className, ": published", len(values), "of", produced[p],
+              ", latency (ms) p50 =", round(percentile(values, 50), 1), ", p99 =", round(percentile(values, 99), 1), ", max =", round(max(values), 1))
+
+##############################################################################
+
+def main(argv):
+    global numberEA, complexFraction, productionRate, publishTime, queueSize
+
+    policies = ["fifo"] + overflowPolicies
+
+    opts, ars = getopt.getopt(argv, "hn:c:p:s:q:o:", ["number=", "complex=", "production=", "publish=", "queue=", "policy="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("eaQueueBenchmark.py -n <numberEA> -c <complexFraction> -p <productionRate> -s <publishTime (ms)> -q <queueSize> -o <policy: fifo, drop, coalesce or block>")
+            sys.exit(1)
+        elif opt in ("-n", "--number"):
+            numberEA = int(arg)
+        elif opt in ("-c", "--complex"):
+            complexFraction = float(arg)
+        elif opt in ("-p", "--production"):
+            productionRate = float(arg)
+        elif opt in ("-s", "--publish"):
+            publishTime = float(arg)
+        elif opt in ("-q", "--queue"):
+            queueSize = int(arg)
+        elif opt in ("-o", "--policy"):
+            policies = [arg]
+
+    print("EA:", numberEA, ", produced per second:", productionRate, ", published per second:", round(1000 / publishTime), ", queue size:", queueSize)
+
+    for policy in policies:
+        if policy == "fifo":
+            latency, produced = run(FIFOQueue())
+            report("Arrival order (previous EPU)", latency, produced)
+        else:
+            latency, produced = run(EAQueue(queueSize, policy))
+            report("EAQueue, policy " + policy, latency, produced)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
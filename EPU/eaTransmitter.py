@@ -7,21 +7,147 @@
 # Date        : 2020/05/12
 # *********************************************************************
 
-import paho.mqtt.client as mqtt
-from time import sleep
+from time import sleep, monotonic
 import sys
 
 ########################################################
 
+## EA are also published to hierarchical topics, derived from their position and severity:
+## EPU_CityAlarmCamera_<id>/<band>/<c1>/<c2>/.../<cN>, with c1..cN the characters of the geohash
+## An EAC may then subscribe only to its area, e.g. "EPU_CityAlarmCamera_1/+/e/z/3/#"
+geohashBase32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+## Severity bands - the upper limit of the sl in each band
+severityBands = [[25, "low"], [50, "medium"], [75, "high"]]
+highestBand = "critical"
+
+## Seconds to receive the retained incidents of a previous execution of the EPU (see recoverActive)
+recoveryTime = 5
+
+## Seconds between attempts to connect to the MQTT Broker (doubled after each failure, up to maxConnectRetry)
+connectRetry = 1
+maxConnectRetry = 60
+
+########################################################
+
+## Standard geohash encoding of a position
+def encodeGeohash(la, lo, precision):
+    laRange = [-90.0, 90.0]
+    loRange = [-180.0, 180.0]
+
+    geohash = []
+    bits = 0
+    value = 0
+    even = True  # even bits are longitude bits
+    while len(geohash) < precision:
+        if even:
+            middle = (loRange[0] + loRange[1]) / 2
+            if lo >= middle:
+                value = (value << 1) | 1
+                loRange[0] = middle
+            else:
+                value = value << 1
+                loRange[1] = middle
+        else:
+            middle = (laRange[0] + laRange[1]) / 2
+            if la >= middle:
+                value = (value << 1) | 1
+                laRange[0] = middle
+            else:
+                value = value << 1
+                laRange[1] = middle
+        even = not even
+
+        bits = bits + 1
+        if bits == 5:
+            geohash.append(geohashBase32[value])
+            bits = 0
+            value = 0
+
+    return "".join(geohash)
+
+def severityBand(sl):
+    for band in severityBands:
+        if sl < band[0]:
+            return band[1]
+    return highestBand
+
+########################################################
+
 class epuMQTT():
-    def __init__(self, ipBroker, epuId):
+    def __init__(self, ipBroker, epuId, precision=0):
+        ## paho is only imported to publish, so the topics can be computed without it (see topicBenchmark.py)
+        import paho.mqtt.client as mqtt
+
         self.broker = ipBroker
         self.description = "EPU_CityAlarmCamera_" + str(epuId)
+        self.precision = precision  # number of geohash levels in the area topics (0: not used)
 
         # MQTT client object is created
         self.clientmqtt = mqtt.Client("")
+        self.connected = False
+        self.recovering = None  # end of the recovery of the retained incidents
+        self.onActive = None
+
+    ## Keep the connection to the MQTT Broker open for successive EA
+    ## The EPU can not publish without the Broker, so the connection is tried again until it succeeds
+    ## (meanwhile, the EA wait in the queue of EA). Later disconnections are handled by the loop of paho
+    def open (self):
+        delay = connectRetry
+        while True:
+            try:
+                self.clientmqtt.connect(self.broker)
+                self.clientmqtt.loop_start()
+                self.connected = True
+                return
+
+            except OSError as e:
+                print("Connection to the MQTT Broker has failed. Address: ", self.broker, "(" + str(e) + "). Trying again in", delay, "s...")
+                sleep(delay)
+                delay = min(delay * 2, maxConnectRetry)
+
+    ## The last EA of each active incident is kept by the Broker (retained message)
+    ## so EACs receive the current alarms as soon as they subscribe
+    def publishActive (self, key, eaJSON):
+        self.clientmqtt.publish (self.description + "/active/" + key, eaJSON, retain=True)
+
+    ## Empty retained message (tombstone): the Broker forgets the expired incident
+    def clearActive (self, key):
+        self.clientmqtt.publish (self.description + "/active/" + key, "", retain=True)
+
+    ## The table of active incidents is lost when the EPU restarts, but the Broker still retains them
+    ## The EPU subscribes to its own retained incidents, given to onActive(key, eaJSON), so they expire (and are cleared) again
+    def recoverActive (self, onActive):
+        self.onActive = onActive
+        self.clientmqtt.on_message = self.on_message
+        self.clientmqtt.subscribe (self.description + "/active/+")
+        self.recovering = monotonic() + recoveryTime
+
+    ## The retained messages are sent right after subscribing: the subscription is then removed
+    def endRecovery (self):
+        if self.recovering is not None and monotonic() >= self.recovering:
+            self.clientmqtt.unsubscribe (self.description + "/active/+")
+            self.recovering = None
+
+    def on_message (self, client, userdata, message):
+        ## Only retained messages were published before this execution; empty ones are tombstones
+        if message.retain and len(message.payload) > 0:
+            self.onActive(message.topic.split("/")[-1], message.payload.decode())
+
+    ## Topic of the area (and severity band) of the EA
+    def areaTopic (self, ea):
+        geohash = encodeGeohash(ea.getLatitude(), ea.getLongitude(), self.precision)
+        return self.description + "/" + severityBand(ea.getSeverityLevel()) + "/" + "/".join(geohash)
+
+    def publishEA (self, eaJSON, ea=None):
+        ## Already connected: there is no need to wait or to disconnect
+        if self.connected:
+            self.clientmqtt.publish (self.description, eaJSON)
+            if ea is not None and self.precision > 0:
+                self.clientmqtt.publish (self.areaTopic(ea), eaJSON)
+            print("The Emergency Alarm was published!")
+            return
 
-    def publishEA (self, eaJSON):
         try:
             self.clientmqtt.connect(self.broker)
 
@@ -29,6 +155,8 @@ class epuMQTT():
         
             # Associating a "topic" to a "payload"
             self.clientmqtt.publish (self.description, eaJSON)
+            if ea is not None and self.precision > 0:
+                self.clientmqtt.publish (self.areaTopic(ea), eaJSON)
 
             sleep(1)
             
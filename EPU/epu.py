@@ -11,20 +11,39 @@
 
 # Basic modules
 import atexit
+import time
 import socket
 import threading
 import json
 import datetime
 import haversine
-import numpy as np
+import math
 import sys, getopt
 
 ## Elements to support the operation of the EDU
-from elementsEPU import ER, RiskZone, EA
+from elementsEPU import ER, RiskZone, EA, decodeER, encodeEA
+
+## Currently active incidents, kept as retained MQTT messages
+from activeAlarms import ActiveAlarms, incidentKey
+
+## Catalogue of Risk Zones
+from riskZones import RiskZoneIndex, loadRiskZones, fileState
 
 ## Supportive module to communicate through MQTT
 from eaTransmitter import epuMQTT
 
+## Priority queue between the computation and the publication of EA
+from eaQueue import EAQueue, overflowPolicies
+
+## Token buckets to protect the EPU against storms of ER
+from rateLimiter import RateLimiter
+
+## Detection of lost and duplicated ER received through UDP
+from sequenceTracker import SequenceTracker
+
+## Images of the camera sent by the EDUs with complex events
+from evidenceStore import EvidenceServer
+
 ########################################################
 debug = True #Used to present trace messages on the screen
 
@@ -40,22 +59,40 @@ tmax = 100  #maximum impact of the time function
 
 ## Keep track of generated Emergency Alarms
 idEA = 1
+lockEA = threading.Lock()
 
-## All defined Risk Zones
-listRZ = []
+## All defined Risk Zones, indexed by position (see riskZones.py)
+## The index is never modified: a reload builds a new one and replaces this reference
+listRZ = None
 
 ## For temporal variable ct (gaussian)
 ## Check definitions in https://doi.org/10.3390/s20010170
 mu = 12  #average
 sigma = 6 #standard deviation
 
-## To receive ER from the EDUs
+## To receive ER from the EDUs (the same port is used for TCP and UDP)
 localPort = 55055
 
+## ER received through UDP are tracked by their ids
+## Lost ER may be requested again to the EDU - only ER with complex events are retransmitted
+## This parameter can be provided during initialization (command line)
+requestRetransmission = True
+sequenceER = SequenceTracker()
+
 ## IP address of the MQTT Broker
 ## This parameter can be provided during initialization (command line)
 ipBroker = "192.168.1.100"
 
+## EA are also published to topics of their area (geohash) and severity band - see eaTransmitter.py
+## Number of geohash characters in the topics (5 is about 5x5 km). 0 disables the area topics
+## This parameter can be provided during initialization (command line)
+geohashPrecision = 5
+
+## The last EA of every active incident is kept as a retained MQTT message, so new EACs
+## get the current alarms immediately. Incidents not refreshed within activeTime seconds expire
+activeTime = 120
+activeEA = None
+
 ## Definitions of the risk zones
 ## The format is [la,lo,radius,risk] - radius in km
 ## Defined locations are FEUP, Matosinhos and Gaia (Porto District, Portugal)
@@ -63,6 +100,35 @@ definedRZ = [[41.179220,-8.597667,50,70], \
                  [41.185324,-8.696129,20,50], \
                 [41.129798,-8.607621,30,90]]
 
+## Risk Zones may instead be loaded from a CSV or GeoJSON file, which is watched for changes
+## This parameter can be provided during initialization (command line)
+fileRZ = None
+reloadTime = 5  #period (s) to check if the file of Risk Zones was modified
+
+## Generated EA wait in a bounded priority queue before being published
+## EA with complex events and higher sl are published first
+## These parameters can be provided during initialization (command line)
+queueSize = 1000  #maximum number of EA waiting for publication
+overflowPolicy = "coalesce"  #drop, coalesce or block (see eaQueue.py)
+queueEA = None
+
+## Rate limits for the reception of ER (token buckets)
+## A flapping sensor may generate an ER every fs seconds, all of them becoming new EA
+## A healthy EDU sends an ER every fs (5) seconds while an event is detected (0.2 ER per second), so the limit has headroom above it
+## ER with complex events are always admitted (see rateLimiter.py)
+eduRate = 0.5  #ER per second for each EDU. This parameter can be provided during initialization (command line)
+eduBurst = 5  #ER that an EDU may send in a burst
+ipRate = 1.0  #ER per second for each source IP address (several EDUs may share an address)
+ipBurst = 20
+summaryTime = 30  #period (s) to process the summaries of suppressed ER
+rateLimiter = None
+
+## Evidences (images of the camera) uploaded by the EDUs are stored in evidenceDirectory as <id>.jpg
+## The EA carries the id of the evidence of its ER. The image may arrive after the EA, since its upload is slower
+evidencePort = 0  #Port to receive the evidences (0 disables them: the server is optional). It can be provided as a command-line option
+evidenceDirectory = "evidence"
+evidenceServer = None
+
 
 ##############################################################################
 
@@ -76,79 +142,267 @@ class receiveERThread(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        global idEA
-        
-        ## The ER that will be received
-        er = None
-
         received = self.connection.recv(1024).decode('utf-8')
 
-        # Reconstructing the ER from the JSON format to the object ER
-        try:
-            parsed_data = json.loads(received)
-            er = ER(parsed_data["edu"], parsed_data["id"],parsed_data["timestamp"],parsed_data["gps"]["la"],parsed_data["gps"]["lo"])
-            eventsInstance = parsed_data["eventsInstance"]
-            eventsComplex = parsed_data["eventsComplex"]
+        ## The received ER
+        er = parseER(received)
 
-            #Different types of events - Different procedures
-            for y in eventsInstance:
-                er.putEventTypeInstance (y)
+        if er is None:
+            print ("Error processing ER when computing EA.")
 
-            for w in eventsComplex:
-                er.putEventTypeComplex(w)
+        ## ER beyond the rate of the EDU (or of its address) are folded into a summary
+        elif rateLimiter.admit(er, self.address):
+            processER(er)
 
-            print ("Received ER from EDU n.", parsed_data["edu"])
+        elif debug:
+            print ("ER from EDU n.", er.getEDU(), "was suppressed (rate limit)")
 
-        except:
-            print ("Error when processing received ER..." + sys.exc_info()[0])
+##############################################################################
 
-        ## Generating the EA
-        numberEI = 0
-        numberEC = 0
-        if er is not None:
-            ea = EA(idEA, er.getTimestamp(),er.getLatitude(),er.getLongitude())
-            idEA = idEA + 1
+## Receive ER from the EDUs through UDP datagrams
+## The id of the ER is used as a sequence number to detect lost and duplicated ER
+class receiveUDPThread(threading.Thread):
 
-            for y in er.getEventsTypesInstance():
-                ea.putEventInstance(y)
-                numberEI = numberEI + 1
+    def __init__(self, s):
+        self.socket = s
 
-            for w in er.getEventsTypesComplex():
-                ea.putEventComplex(w)
-                numberEC = numberEC + 1
+        threading.Thread.__init__(self)
+        self.daemon = True
 
-            ## Compute the magnitude of the alarm
-            computeSeveryLevel(ea, numberEI, numberEC)
+    def run(self):
+        while True:
+            try:
+                received, address = self.socket.recvfrom(65535)
+            except OSError as e:
+                print ("Error when receiving ER through UDP...")
+                print (e)
+                continue
+
+            er = parseER(received.decode('utf-8'))
+            if er is None:
+                print ("Error processing ER when computing EA.")
+                continue
+
+            duplicate, missing = sequenceER.register(er.getEDU(), er.getId(), er.getBoot())
+
+            if len(missing) > 0:
+                print ("ER lost from EDU n.", er.getEDU(), ":", missing)
+
+                ## Ask the EDU to send again the missing ER (only those with complex events are kept by the EDU)
+                if requestRetransmission:
+                    nack = json.dumps({"epu": idEPU, "nack": missing})
+                    self.socket.sendto(bytes(nack, 'utf-8'), address)
+
+            if duplicate:
+                if debug:
+                    print ("Duplicated ER", er.getId(), "from EDU n.", er.getEDU(), "was ignored")
+            elif rateLimiter.admit(er, address[0]):
+                processER(er)
+            elif debug:
+                print ("ER from EDU n.", er.getEDU(), "was suppressed (rate limit)")
 
             if debug:
-                ea.printValues()
+                sequenceER.printValues()
 
-            ## Transmit the EA - MQQT Protocol
-            transmitEA (ea)
+##############################################################################
 
-        else:
-            print ("Error processing ER when computing EA.")
-			
+## Reconstructing the ER from the JSON format to the object ER
+## Returns None if the received data is not a valid ER
+def parseER(received):
+    er = None
+
+    try:
+        er = decodeER(received)
+
+        ## The trace of the alarm (created in the EDU) is continued in the EPU
+        er.addHop("epu.receive")
+
+        print ("Received ER from EDU n.", er.getEDU())
+
+    except:
+        print ("Error when processing received ER..." + str(sys.exc_info()[0]))
+        er = None
+
+    return er
+
+##############################################################################
+
+## Periodically process the summaries of the suppressed ER
+## Each summary generates a single EA with all the events reported during the storm
+class stormSummaryThread(threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        global summaryTime, rateLimiter
+
+        while True:
+            time.sleep(summaryTime)
+
+            for summary in rateLimiter.takeSummaries():
+                er = ER(summary.er.getEDU(), summary.er.getId(), summary.er.getTimestamp(), summary.er.getLatitude(), summary.er.getLongitude(), summary.er.getEpochMs())
+                er.setTrace(summary.er.getTrace())
+                for y in sorted(summary.typesInstance)[:5]:
+                    er.putEventTypeInstance(y)
+                for w in sorted(summary.typesComplex)[:5]:
+                    er.putEventTypeComplex(w)
+
+                if debug:
+                    print ("\nSummary of", summary.count, "suppressed ER from EDU n.", er.getEDU())
+
+                processER(er)
+
+            if debug:
+                rateLimiter.printValues()
+
+##############################################################################
+
+## Generate the EA associated to a received ER
+def processER(er):
+    global idEA
+
+    with lockEA:
+        ea = EA(idEA, er.getTimestamp(),er.getLatitude(),er.getLongitude(),er.getEpochMs())
+        idEA = idEA + 1
+
+    numberEI = 0
+    numberEC = 0
+    for y in er.getEventsTypesInstance():
+        ea.putEventInstance(y)
+        numberEI = numberEI + 1
+
+    for w in er.getEventsTypesComplex():
+        ea.putEventComplex(w)
+        numberEC = numberEC + 1
+
+    ## Compute the magnitude of the alarm
+    computeSeveryLevel(ea, numberEI, numberEC)
+
+    ea.setTrace(er.getTrace())
+    ea.addHop("epu.scored")
+
+    ## Reference to the image of the camera (stored by evidenceServer)
+    ea.setEvidence(er.getEvidence())
+
+    if debug:
+        ea.printValues()
+        print ("Time since the ER was created (ms):", int(time.time() * 1000) - er.getEpochMs())
+
+    ## The EA is published by publishEAThread, according to its priority
+    if not queueEA.put(ea) and debug:
+        print ("EA queue is full. EA", ea.getId(), "was discarded.")
+
+##############################################################################
+
+## Publish the queued EA, always taking the one with the highest priority
+class publishEAThread(threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        global queueEA
+
+        ## A single connection to the MQTT Broker is kept while publishing
+        transmitter = epuMQTT(ipBroker, idEPU, geohashPrecision)
+        transmitter.open()
+        transmitter.recoverActive(activeEA.recover)
+
+        while True:
+            ## Waiting is limited, so expired incidents are cleared even without new EA
+            ea = queueEA.get(1.0)
+
+            if ea is not None:
+                ## Transmit the EA - MQQT Protocol
+                ea.addHop("epu.publish")
+                jsonEA = transmitEA (ea, transmitter)
+
+                key = incidentKey(ea)
+                activeEA.put(key, jsonEA)
+                transmitter.publishActive(key, jsonEA)
+
+                if debug:
+                    queueEA.printValues()
+
+            transmitter.endRecovery()
+
+            for key in activeEA.expire():
+                if debug:
+                    print ("Incident", key, "has expired")
+                transmitter.clearActive(key)
 
 ##############################################################################
 
 def initializeRiskZones():
     global listRZ
 
-    idRZ = 1
-    for rz in definedRZ:
-        listRZ.append (RiskZone(idRZ,rz[0],rz[1],rz[2],rz[3]))
-        idRZ = idRZ + 1
+    definitions = definedRZ
+    if fileRZ is not None:
+        definitions = loadRiskZones(fileRZ)
+
+    listRZ = RiskZoneIndex(definitions)
 
     if debug:
-        print ("Defined Risk Zones:")
-        for r in listRZ:
-            r.printValues()
+        print ("Defined Risk Zones:", listRZ.getSize())
+        if listRZ.getSize() <= 20:
+            listRZ.printValues()
+
+##############################################################################
+
+## Reload the Risk Zones when their file is modified
+## The new index is built in this thread, while the EA keep being computed with the old one
+## The file is only loaded after its modification time and size are the same in two checks,
+## so a file still being written is not loaded. If it can not be loaded, the old index is kept
+class riskZonesWatcher(threading.Thread):
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+    def run(self):
+        global listRZ
+
+        loaded = fileState(fileRZ)  # state of the file of the current index
+        changed = None  # new state, waiting to be stable
+
+        while True:
+            time.sleep(reloadTime)
+
+            state = fileState(fileRZ)
+            if state is None or state == loaded:
+                changed = None
+                continue
+
+            if state != changed:
+                ## Modified since the last check: it may still be being written
+                changed = state
+                continue
+
+            loaded = state
+            changed = None
+
+            try:
+                start = time.monotonic()
+                index = RiskZoneIndex(loadRiskZones(fileRZ))
+                if index.getSize() == 0:
+                    raise ValueError("No Risk Zones in " + fileRZ)
+
+                ## Replacing the reference is atomic, so readers are never blocked
+                listRZ = index
+
+                print ("Risk Zones reloaded from", fileRZ, ":", index.getSize(), "zones in", round(time.monotonic() - start, 3), "s")
+
+            except Exception as e:
+                print ("Error when reloading the Risk Zones. The previous ones are kept...")
+                print (e)
 
 ##############################################################################
 
 def computeSeveryLevel(ea, ni, nc):
-    global listRZ, fe, fr, ft, rmax, tmax
+    global fe, fr, ft, rmax, tmax
 
     if debug:
         print ("Computing the magnitude of the EA...")
@@ -180,13 +434,11 @@ def computeSeveryLevel(ea, ni, nc):
 
 ## This method verifies what is the current Risk Zone associated to the ER and returns the corresponding rz value
 def computeAssociatedRZ(la,lo):
-    global listRZ
-
     ## Given RZ center and the EDU position, is this distance minor than the defined radius of a RZ?
     edu = (la, lo)
 
     riskLevel = 0
-    for rz in listRZ:
+    for rz in listRZ.getCandidates(la, lo):
         zone = (rz.getLatitude(), rz.getLongitude())
         distance = haversine.haversine(edu,zone)
 
@@ -220,15 +472,15 @@ def computeGausseanFunction(x):
     ## x is the hour of the day
     global mu, sigma
 
-    return np.exp(-np.power(x - mu, 2.) / (2 * np.power(sigma, 2.)))
+    return math.exp(-math.pow(x - mu, 2.) / (2 * math.pow(sigma, 2.)))
 
 ##############################################################################
 
-def transmitEA(ea):
+def transmitEA(ea, transmitter=None):
     global idEPU, ipBroker
 
     ## Convert the Emergency Alarm to the JSON format
-    jsonEA = ea.toJSON()
+    jsonEA = encodeEA(ea)
 
     if debug:
         print("\nTransmitting the Emergency Alarm", ea.getId())
@@ -237,7 +489,11 @@ def transmitEA(ea):
 
     ## Connect to the MQTT Broker and publish the Emergency Alarm (JSON format)
     ## This class was created to support the communication to the MQTT
-    epuMQTT(ipBroker,idEPU).publishEA (jsonEA) # This publishes the JSON-based EA to the MQTT Broker
+    if transmitter is None:
+        transmitter = epuMQTT(ipBroker,idEPU,geohashPrecision)
+    transmitter.publishEA (jsonEA, ea) # This publishes the JSON-based EA to the MQTT Broker
+
+    return jsonEA
 
 ##############################################################################
 
@@ -249,14 +505,14 @@ def exit_handler():
 ##############################################################################
 
 def main(argv):
-    global idEPU, ipBroker, fe, fr, ft, localPort, debug
+    global idEPU, ipBroker, fe, fr, ft, localPort, debug, queueSize, overflowPolicy, queueEA, eduRate, rateLimiter, fileRZ, requestRetransmission, geohashPrecision, activeEA, evidencePort, evidenceDirectory, evidenceServer
 
     ## Parse arguments from the command-line
-    ## Options: debug idEPU ipMQTT
-    opts, ars = getopt.getopt(argv, "hd:e:i:", ["debug=", "idEPU=", "ipBroker="])
+    ## Options: debug idEPU ipMQTT queueSize overflowPolicy eduRate fileRZ nack geohashPrecision evidencePort evidenceDirectory
+    opts, ars = getopt.getopt(argv, "hd:e:i:q:o:r:z:n:g:v:f:", ["debug=", "idEPU=", "ipBroker=", "queueSize=", "overflowPolicy=", "eduRate=", "fileRZ=", "nack=", "geohash=", "evidencePort=", "evidenceDirectory="])
     for opt, arg in opts:
         if opt == "-h":
-            print("epu.py -d <debug> -e <idEPU> -i <ipBroker>")
+            print("epu.py -d <debug> -e <idEPU> -i <ipBroker> -q <queueSize> -o <overflowPolicy> -r <eduRate> -z <fileRZ> -n <nack> -g <geohashPrecision> -v <evidencePort> -f <evidenceDirectory>")
             sys.exit(1)
         elif opt in ("-d", "--debug"):
             if arg == "True":
@@ -267,6 +523,25 @@ def main(argv):
             idEPU = arg
         elif opt in ("-i", "--ipBroker"):   # IP address of the MQTT Broker
             ipBroker = arg
+        elif opt in ("-q", "--queueSize"):   # Maximum number of EA waiting for publication
+            queueSize = int(arg)
+        elif opt in ("-o", "--overflowPolicy"):   # drop, coalesce or block
+            overflowPolicy = arg
+        elif opt in ("-r", "--eduRate"):   # ER per second accepted from each EDU
+            eduRate = float(arg)
+        elif opt in ("-z", "--fileRZ"):   # CSV or GeoJSON file with the Risk Zones
+            fileRZ = arg
+        elif opt in ("-n", "--nack"):   # Request the retransmission of lost ER (UDP)
+            if arg == "True":
+                requestRetransmission = True
+            else:
+                requestRetransmission = False
+        elif opt in ("-g", "--geohash"):   # Precision of the area topics
+            geohashPrecision = int(arg)
+        elif opt in ("-v", "--evidencePort"):   # Port for the evidences of the EDUs (0 disables them)
+            evidencePort = int(arg)
+        elif opt in ("-f", "--evidenceDirectory"):   # Directory of the stored evidences
+            evidenceDirectory = arg
     ########
 
     if debug:
@@ -277,14 +552,39 @@ def main(argv):
         print("The sum of the calibration constants must be equal to 1.0. EPU exiting...")
         sys.exit(1)
 
+    if overflowPolicy not in overflowPolicies:
+        print("The overflow policy must be one of", overflowPolicies, ". EPU exiting...")
+        sys.exit(1)
+
     ## Create the Risk Zones according to the definitions
     initializeRiskZones()
+    if fileRZ is not None:
+        riskZonesWatcher().start()
+
+    ## EA are published by a dedicated thread, according to their priority
+    queueEA = EAQueue(queueSize, overflowPolicy)
+    activeEA = ActiveAlarms(activeTime)
+    publishEAThread().start()
+
+    ## Storms of ER are folded into summaries
+    rateLimiter = RateLimiter(eduRate, eduBurst, ipRate, ipBurst)
+    stormSummaryThread().start()
+
+    ## Evidences of the EDUs are received in a separate port, so they never delay the ER
+    if evidencePort > 0:
+        evidenceServer = EvidenceServer(evidencePort, evidenceDirectory, debug)
+        evidenceServer.start()
 
     ## Receive ER from the EDU
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     s.bind(("", localPort))
 
-    print("EPU is ready and waiting connections at port", localPort, "...")
+    ## ER may also be received as UDP datagrams
+    u = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    u.bind(("", localPort))
+    receiveUDPThread(u).start()
+
+    print("EPU is ready and waiting connections at port", localPort, "(TCP and UDP) ...")
     ## Put the socket into listening mode
     s.listen()
 
@@ -0,0 +1,183 @@
+# *********************************************************************
+# Reception and storage of the evidences sent by the EDUs
+# An evidence is a JPEG image of the camera taken when a complex event is detected.
+# The EDU sends a header line ({"edu": ..., "id": ..., "size": ...}) and the EPU replies
+# with the number of bytes it already has ({"offset": ...}), so interrupted transfers
+# are resumed. When the evidence is complete, the EPU confirms it with the same line ({"offset": size})
+# Partial evidences are kept as <id>.part and complete ones as <id>.jpg
+# The directory is limited in size and age: the oldest files are removed first
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import json
+import os
+import socket
+import threading
+import time
+
+from elementsEPU import validEvidence
+
+########################################################
+
+## Largest accepted evidence (bytes)
+maxEvidenceSize = 2 * 1024 * 1024
+
+## Seconds without data before a transfer is abandoned (it can be resumed later)
+transferTimeout = 30
+
+## Limits of the directory: total size (bytes) and age (seconds) of the evidences and of the partial ones
+maxStoredBytes = 500 * 1024 * 1024
+evidenceRetention = 7 * 24 * 3600
+partRetention = 3600  # interrupted transfers not resumed within this time are removed
+
+## Period (s) of the removal of old files, which is also done after each stored evidence
+cleanupInterval = 60
+
+########################################################
+
+class EvidenceServer(threading.Thread):
+
+    def __init__(self, port, directory, debug=False):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.port = port
+        self.directory = directory
+        self.debug = debug
+        os.makedirs(directory, exist_ok=True)
+
+        ## One transfer at a time for each evidence
+        self.receiving = set()
+        self.lock = threading.Lock()
+
+        ## Counters, updated by the threads of the transfers (under the lock)
+        self.stored = 0
+        self.resumed = 0
+        self.bytes = 0
+        self.removed = 0
+
+    def run(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("", self.port))
+        s.listen(5)
+        s.settimeout(cleanupInterval)
+
+        self.cleanup()
+        while True:
+            try:
+                c, a = s.accept()
+            except socket.timeout:
+                self.cleanup()
+                continue
+            threading.Thread(target=self.receive, args=(c,), daemon=True).start()
+
+    ## Remove the expired evidences and partial evidences, and then the oldest files while the directory is too large
+    ## Partial evidences being received are kept
+    def cleanup(self):
+        now = time.time()
+        with self.lock:
+            files = []
+            for name in os.listdir(self.directory):
+                evidence, extension = os.path.splitext(name)
+                if extension not in (".jpg", ".part") or evidence in self.receiving:
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append([st.st_mtime, st.st_size, path, extension])
+
+            files.sort()
+            total = sum(f[1] for f in files)
+            for modified, size, path, extension in files:
+                retention = evidenceRetention if extension == ".jpg" else partRetention
+                if now - modified < retention and total <= maxStoredBytes:
+                    continue
+                try:
+                    os.remove(path)
+                    self.removed = self.removed + 1
+                except OSError:
+                    continue
+                total = total - size
+
+    def getPath(self, evidence):
+        return os.path.join(self.directory, evidence + ".jpg")
+
+    def hasEvidence(self, evidence):
+        return os.path.exists(self.getPath(evidence))
+
+    ## Receive (part of) an evidence
+    def receive(self, c):
+        registered = False
+        try:
+            c.settimeout(transferTimeout)
+            reader = c.makefile("rb")
+            header = json.loads(reader.readline(1024).decode("utf-8"))
+            evidence = validEvidence(header.get("id"))
+            size = int(header["size"])
+            if evidence is None or not 0 < size <= maxEvidenceSize:
+                print ("Invalid evidence from EDU", header.get("edu"))
+                return
+
+            with self.lock:
+                if evidence in self.receiving:
+                    return
+                self.receiving.add(evidence)
+                registered = True
+
+            part = os.path.join(self.directory, evidence + ".part")
+            if self.hasEvidence(evidence):
+                offset = size
+            elif os.path.exists(part) and os.path.getsize(part) < size:
+                offset = os.path.getsize(part)
+                with self.lock:
+                    self.resumed = self.resumed + 1
+            else:
+                offset = 0
+
+            ## The EDU only sends the data after receiving the offset
+            c.sendall((json.dumps({"offset": offset}) + "\n").encode("utf-8"))
+            if offset >= size:
+                return
+
+            with open(part, "r+b" if offset > 0 else "wb") as f:
+                f.seek(offset)
+                f.truncate()
+                while offset < size:
+                    data = c.recv(min(65536, size - offset))
+                    if not data:
+                        break
+                    f.write(data)
+                    offset = offset + len(data)
+                    with self.lock:
+                        self.bytes = self.bytes + len(data)
+
+            if offset >= size:
+                os.replace(part, self.getPath(evidence))
+                with self.lock:
+                    self.stored = self.stored + 1
+                c.sendall((json.dumps({"offset": size}) + "\n").encode("utf-8"))
+                if self.debug:
+                    print ("Evidence", evidence, "from EDU", header.get("edu"), "stored (" + str(size), "bytes)")
+
+                ## The new evidence may exceed the size of the directory
+                with self.lock:
+                    self.receiving.discard(evidence)
+                    registered = False
+                self.cleanup()
+
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print ("Evidence transfer interrupted:", e)
+
+        finally:
+            if registered:
+                with self.lock:
+                    self.receiving.discard(evidence)
+            c.close()
+
+    def printValues(self):
+        print ("Evidences stored:", self.stored, ", resumed transfers:", self.resumed, ", received bytes:", self.bytes, ", old files removed:", self.removed)
@@ -0,0 +1,151 @@
+# *********************************************************************
+# Protection of the EPU against storms of Events Reports (ER)
+# Each EDU (and each source IP address) has a token bucket, refilled lazily
+# ER received without an available token are folded into a summary, which is
+# later processed as a single ER instead of producing individual alarms
+# ER with complex events (e.g. fire) are never held back: they are always admitted
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import threading
+import time
+
+########################################################
+
+## Token buckets indexed by a key (id of the EDU or IP address)
+class TokenBuckets():
+
+    def __init__(self, rate, burst):
+        self.rate = rate  # tokens per second
+        self.burst = burst  # maximum number of accumulated tokens
+
+        ## key -> [tokens, time of the last refill]
+        ## The bucket is only refilled when it is accessed
+        self.buckets = {}
+
+    ## Returns True if the bucket of the key has a token (it is not consumed)
+    def hasToken(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            return True
+
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        bucket[0] = tokens
+        bucket[1] = now
+
+        return tokens >= 1.0
+
+    def consume(self, key, now):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [self.burst - 1.0, now]
+        else:
+            bucket[0] = bucket[0] - 1.0
+
+    ## Buckets that would be full again are equivalent to absent buckets
+    def purge(self, now):
+        full = self.burst / self.rate
+        for key in [k for k, b in self.buckets.items() if now - b[1] > full]:
+            del self.buckets[key]
+
+    def getSize(self):
+        return len(self.buckets)
+
+########################################################
+
+## Summary of the ER suppressed for one EDU
+class SuppressedER():
+
+    def __init__(self, er):
+        self.er = er  # most recent suppressed ER
+        self.count = 1
+        self.typesInstance = set(er.getEventsTypesInstance())
+        self.typesComplex = set(er.getEventsTypesComplex())
+
+    def fold(self, er):
+        self.er = er
+        self.count = self.count + 1
+        self.typesInstance.update(er.getEventsTypesInstance())
+        self.typesComplex.update(er.getEventsTypesComplex())
+
+########################################################
+
+class RateLimiter():
+
+    def __init__(self, eduRate, eduBurst, ipRate, ipBurst):
+        self.eduBuckets = TokenBuckets(eduRate, eduBurst)
+        self.ipBuckets = TokenBuckets(ipRate, ipBurst)
+        self.summaries = {}  # id of the EDU -> SuppressedER
+        self.lock = threading.Lock()
+
+        ## Suppression counters
+        self.admitted = 0
+        self.admittedComplex = 0  # ER with complex events admitted without a token
+        self.suppressed = 0
+        self.suppressedEDU = {}  # id of the EDU -> total of suppressed ER
+        self.suppressedIP = {}  # IP address -> total of suppressed ER
+
+    ## Returns True if the ER can be processed. Otherwise, it is folded into the summary of its EDU
+    ## now is only given by simulations (see stormBenchmark.py)
+    def admit(self, er, address, now=None):
+        if now is None:
+            now = time.monotonic()
+        edu = er.getEDU()
+
+        with self.lock:
+            eduOk = self.eduBuckets.hasToken(edu, now)
+            ipOk = self.ipBuckets.hasToken(address, now)
+
+            if eduOk and ipOk:
+                self.eduBuckets.consume(edu, now)
+                self.ipBuckets.consume(address, now)
+                self.admitted = self.admitted + 1
+                return True
+
+            ## Alarms of complex events are not delayed until the next summary
+            if er.getNumberEC() > 0:
+                self.admitted = self.admitted + 1
+                self.admittedComplex = self.admittedComplex + 1
+                return True
+
+            self.suppressed = self.suppressed + 1
+            self.suppressedEDU[edu] = self.suppressedEDU.get(edu, 0) + 1
+            self.suppressedIP[address] = self.suppressedIP.get(address, 0) + 1
+
+            if edu in self.summaries:
+                self.summaries[edu].fold(er)
+            else:
+                self.summaries[edu] = SuppressedER(er)
+
+            return False
+
+    ## Returns (and clears) all pending summaries
+    def takeSummaries(self, now=None):
+        with self.lock:
+            summaries = list(self.summaries.values())
+            self.summaries = {}
+
+            if now is None:
+                now = time.monotonic()
+            self.eduBuckets.purge(now)
+            self.ipBuckets.purge(now)
+
+        return summaries
+
+    def getStats(self):
+        with self.lock:
+            return {"admitted": self.admitted, "admittedComplex": self.admittedComplex, "suppressed": self.suppressed,
+                    "suppressedEDU": dict(self.suppressedEDU), "suppressedIP": dict(self.suppressedIP),
+                    "buckets": self.eduBuckets.getSize() + self.ipBuckets.getSize()}
+
+    def printValues(self):
+        stats = self.getStats()
+        print ("ER admitted:", stats["admitted"], "(" + str(stats["admittedComplex"]), "with complex events above the rate), ER suppressed:", stats["suppressed"], ", active buckets:", stats["buckets"])
+        for edu, n in stats["suppressedEDU"].items():
+            print ("Suppressed ER from EDU n.", edu, ":", n)
+        for ip, n in stats["suppressedIP"].items():
+            print ("Suppressed ER from address", ip, ":", n)
@@ -0,0 +1,107 @@
+# *********************************************************************
+# Catalogue of Risk Zones (RZ) for the EPU
+# Risk Zones can be loaded from CSV or GeoJSON files, and they are indexed in a
+# regular grid, so only the zones close to an EDU are checked when computing the EA
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import csv
+import json
+import math
+import os
+
+from elementsEPU import RiskZone
+
+########################################################
+
+## Approximated length (km) of one degree of latitude
+kmDegree = 111.2
+
+## Size (degrees) of the cells of the grid
+cellSize = 0.5
+
+########################################################
+
+## Read the definitions of the Risk Zones from a file
+## CSV: one zone per line, as la,lo,radius,risk (radius in km). A header line is accepted
+## GeoJSON: Point features, with "radius" (km) and "risk" properties
+## The returned format is the same of definedRZ: [la,lo,radius,risk]
+def loadRiskZones(path):
+    if path.lower().endswith((".json", ".geojson")):
+        with open(path) as f:
+            data = json.load(f)
+
+        zones = []
+        for feature in data["features"]:
+            lo, la = feature["geometry"]["coordinates"][:2]
+            properties = feature["properties"]
+            zones.append([float(la), float(lo), float(properties["radius"]), float(properties["risk"])])
+        return zones
+
+    zones = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 4 or row[0].strip().startswith("#"):
+                continue
+            try:
+                zones.append([float(row[0]), float(row[1]), float(row[2]), float(row[3])])
+            except ValueError:
+                continue  # header line
+    return zones
+
+########################################################
+
+## Immutable set of Risk Zones, indexed in a grid
+## A new index is built when the catalogue changes, and then it replaces the old one
+class RiskZoneIndex():
+
+    def __init__(self, definitions):
+        self.zones = []
+        self.grid = {}  # (row, column) -> list of RiskZone
+
+        idRZ = 1
+        for rz in definitions:
+            zone = RiskZone(idRZ, rz[0], rz[1], rz[2], rz[3])
+            self.zones.append(zone)
+            idRZ = idRZ + 1
+
+            ## The zone is inserted in all the cells covered by its bounding box
+            dla = rz[2] / kmDegree
+            dlo = rz[2] / (kmDegree * max(math.cos(math.radians(rz[0])), 0.01))
+            for row in range(self.cell(rz[0] - dla), self.cell(rz[0] + dla) + 1):
+                for column in range(self.cell(rz[1] - dlo), self.cell(rz[1] + dlo) + 1):
+                    cell = self.grid.get((row, column))
+                    if cell is None:
+                        self.grid[(row, column)] = [zone]
+                    else:
+                        cell.append(zone)
+
+    def cell(self, degrees):
+        return int(math.floor(degrees / cellSize))
+
+    ## Risk Zones that may contain the given position
+    def getCandidates(self, la, lo):
+        return self.grid.get((self.cell(la), self.cell(lo)), ())
+
+    def getZones(self):
+        return self.zones
+
+    def getSize(self):
+        return len(self.zones)
+
+    def printValues(self):
+        for r in self.zones:
+            r.printValues()
+
+########################################################
+
+## Returns the modification time and the size of the file, or None if it is not available
+## A file being written changes its state until it is complete
+def fileState(path):
+    try:
+        info = os.stat(path)
+        return (info.st_mtime_ns, info.st_size)
+    except OSError:
+        return None
@@ -0,0 +1,111 @@
+# *********************************************************************
+# Tracking of the ER received through UDP
+# The id of the ER (idER in the EDU) is used as a per-EDU sequence number,
+# allowing the detection of gaps (lost datagrams) and duplicates
+# The ids start again at 1 when the EDU is restarted. The ER carry the start time of
+# the EDU (boot), so a restart is detected by a new boot. For older EDUs, without boot,
+# an id 1 after higher ids (or an id far behind the highest one) is taken as a restart
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import threading
+
+########################################################
+
+## Maximum number of missing ER remembered for each EDU
+maxMissing = 64
+
+########################################################
+
+## Sequence state of a single EDU
+class EDUSequence():
+
+    def __init__(self, seq, boot=None):
+        self.highest = seq
+        self.boot = boot
+        self.missing = set()
+
+########################################################
+
+class SequenceTracker():
+
+    def __init__(self):
+        self.edus = {}  # id of the EDU -> EDUSequence
+        self.lock = threading.Lock()
+
+        ## Counters
+        self.received = 0
+        self.duplicates = 0
+        self.lost = 0  # detected gaps (ER that were never recovered are counted here)
+        self.recovered = 0
+        self.restarts = 0
+
+    ## Register a received ER. boot is the start time of the EDU sent with the ER (None for older EDUs)
+    ## Returns (duplicate, missing): if the ER was already received and the list of newly detected missing ER
+    def register(self, edu, seq, boot=None):
+        with self.lock:
+            self.received = self.received + 1
+
+            state = self.edus.get(edu)
+            if state is None:
+                self.edus[edu] = EDUSequence(seq, boot)
+                return (False, [])
+
+            if boot is not None and state.boot is not None and boot != state.boot:
+                if boot < state.boot:
+                    ## Delayed ER sent before the restart of the EDU: it is not tracked
+                    return (False, [])
+                return self.restart(edu, seq, boot)
+
+            if boot is None and seq == 1 and state.highest > 1:
+                return self.restart(edu, seq, boot)
+
+            if seq == state.highest + 1:
+                state.highest = seq
+                return (False, [])
+
+            if seq > state.highest:
+                ## Gap: the ER between the highest received and this one were lost (or delayed)
+                missing = list(range(max(state.highest + 1, seq - maxMissing), seq))
+                state.highest = seq
+                state.missing.update(missing)
+                self.lost = self.lost + len(missing)
+                self.trim(state)
+                return (False, missing)
+
+            if seq in state.missing:
+                ## Retransmitted or reordered ER
+                state.missing.discard(seq)
+                self.lost = self.lost - 1
+                self.recovered = self.recovered + 1
+                return (False, [])
+
+            if boot is None and state.highest - seq > maxMissing:
+                ## An older EDU was restarted and its first ER were lost
+                return self.restart(edu, seq, boot)
+
+            self.duplicates = self.duplicates + 1
+            return (True, [])
+
+    ## The EDU was restarted and its ids started again. The ER missing before the restart are not requested anymore
+    def restart(self, edu, seq, boot):
+        self.restarts = self.restarts + 1
+        self.edus[edu] = EDUSequence(seq, boot)
+
+        ## The ER before this one (since the restart) were lost
+        missing = list(range(max(1, seq - maxMissing), seq))
+        self.edus[edu].missing.update(missing)
+        self.lost = self.lost + len(missing)
+        return (False, missing)
+
+    ## Keep only the most recent missing ER
+    def trim(self, state):
+        if len(state.missing) > maxMissing:
+            for seq in sorted(state.missing)[:len(state.missing) - maxMissing]:
+                state.missing.discard(seq)
+
+    def printValues(self):
+        with self.lock:
+            print ("UDP ER received:", self.received, ", duplicates:", self.duplicates, ", lost:", self.lost, ", recovered:", self.recovered, ", EDU restarts:", self.restarts)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Simulation of a storm of ER (see rateLimiter.py)
+# Healthy EDUs send an ER every fs seconds while they detect events, and a misbehaving
+# EDU (flapping sensor) sends ER much faster. The ER are given to the RateLimiter of the
+# EPU with a simulated clock, so minutes of traffic are simulated at once.
+# For each EDU, the admitted and suppressed ER and the generated EA are presented
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import sys, getopt
+
+from elementsEPU import ER
+from rateLimiter import RateLimiter
+
+##############################################################################
+
+## Limits of the EPU (defaults of epu.py)
+eduRate = 0.5
+eduBurst = 5
+ipRate = 1.0
+ipBurst = 20
+summaryTime = 30
+
+duration = 120.0  # simulated seconds
+fs = 5.0  # period of the healthy EDUs
+flapPeriod = 0.2  # period of the misbehaving EDU
+
+## [id of the EDU, IP address, period (s), instance events, complex events]
+def scenario():
+    return [[1, "10.0.0.1", fs, [4], [1]],  # fire and smoke
+            [2, "10.0.0.2", fs, [8], []],  # noise
+            [3, "10.0.0.3", flapPeriod, [16], []]]  # flapping water sensor
+
+##############################################################################
+
+def simulate(eduRate):
+    limiter = RateLimiter(eduRate, eduBurst, ipRate, ipBurst)
+    edus = scenario()
+
+    ## Every ER of the simulation, in the order of their times
+    reports = []
+    for edu, address, period, typesInstance, typesComplex in edus:
+        t = 0.0
+        while t < duration:
+            reports.append((t, edu, address, typesInstance, typesComplex))
+            t = t + period
+    reports.sort()
+
+    sent = {}
+    admitted = {}
+    complexDelay = {}  # maximum time (s) from a suppressed ER with complex events to its summary
+    pendingComplex = {}  # id of the EDU -> time of the first suppressed ER with complex events
+    summaries = {}
+    nextSummary = summaryTime
+
+    for t, edu, address, typesInstance, typesComplex in reports:
+        while t >= nextSummary:
+            takeSummaries(limiter, nextSummary, summaries, pendingComplex, complexDelay)
+            nextSummary = nextSummary + summaryTime
+
+        er = ER(edu, len(reports), None, 41.17, -8.59, int(t * 1000))
+        for y in typesInstance:
+            er.putEventTypeInstance(y)
+        for w in typesComplex:
+            er.putEventTypeComplex(w)
+
+        sent[edu] = sent.get(edu, 0) + 1
+        if limiter.admit(er, address, t):
+            admitted[edu] = admitted.get(edu, 0) + 1
+        elif len(typesComplex) > 0 and edu not in pendingComplex:
+            pendingComplex[edu] = t
+
+    takeSummaries(limiter, nextSummary, summaries, pendingComplex, complexDelay)
+
+    print("eduRate =", eduRate, "ER/s, burst =", eduBurst, ",", duration, "s simulated")
+    for edu, address, period, typesInstance, typesComplex in edus:
+        kind = "with complex events" if len(typesComplex) > 0 else "instance events"
+        print("    EDU", edu, "(one ER every", period, "s,", kind + "):",
+              "sent", sent.get(edu, 0), ", admitted", admitted.get(edu, 0), ", suppressed", sent.get(edu, 0) - admitted.get(edu, 0),
+              ", EA", admitted.get(edu, 0) + summaries.get(edu, 0), ", max delay of complex events (s):", complexDelay.get(edu, 0.0))
+
+def takeSummaries(limiter, now, summaries, pendingComplex, complexDelay):
+    for summary in limiter.takeSummaries(now):
+        edu = summary.er.getEDU()
+        summaries[edu] = summaries.get(edu, 0) + 1
+        if edu in pendingComplex:
+            complexDelay[edu] = max(complexDelay.get(edu, 0.0), round(now - pendingComplex.pop(edu), 1))
+
+##############################################################################
+
+def main(argv):
+    global duration, flapPeriod
+
+    rates = [0.1, eduRate]
+
+    opts, ars = getopt.getopt(argv, "hd:f:r:", ["duration=", "flap=", "rate="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("stormBenchmark.py -d <duration (s)> -f <period of the misbehaving EDU (s)> -r <eduRate>")
+            sys.exit(1)
+        elif opt in ("-d", "--duration"):
+            duration = float(arg)
+        elif opt in ("-f", "--flap"):
+            flapPeriod = float(arg)
+        elif opt in ("-r", "--rate"):
+            rates = [float(arg)]
+
+    for rate in rates:
+        simulate(rate)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+# *********************************************************************
+# Tests of the queue of EA (eaQueue.py)
+# Run from this directory with: python3 -m unittest test_eaQueue
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import unittest
+
+from elementsEPU import EA
+from eaQueue import EAQueue
+
+########################################################
+
+def createEA(i, la, sl, complexEvent=False):
+    ea = EA(i, None, la, -8.6, 0)
+    if complexEvent:
+        ea.putEventComplex(1)
+    else:
+        ea.putEventInstance(4)
+    ea.setSeverityLevel(sl)
+    return ea
+
+########################################################
+
+class EAQueueTest(unittest.TestCase):
+
+    ## A refresh of the same location replaces the queued EA
+    def test_coalesce_refresh(self):
+        queue = EAQueue(10, "coalesce")
+        queue.put(createEA(1, 41.0, 30))
+        queue.put(createEA(2, 41.0, 30))
+        self.assertEqual(queue.getSize(), 1)
+        self.assertEqual(queue.coalesced, 1)
+        self.assertEqual(queue.get(0).getId(), 2)
+
+    ## An EA with complex events is not replaced by a later instance refresh of the same location
+    def test_coalesce_keeps_complex(self):
+        queue = EAQueue(10, "coalesce")
+        queue.put(createEA(1, 41.0, 80, True))
+        queue.put(createEA(2, 41.0, 30))
+        self.assertEqual(queue.coalesced, 0)
+        self.assertEqual([queue.get(0).getId() for i in range(2)], [1, 2])
+
+        ## The next refresh replaces only the instance EA
+        queue.put(createEA(3, 41.0, 80, True))
+        queue.put(createEA(4, 41.0, 30))
+        queue.put(createEA(5, 41.0, 30))
+        self.assertEqual(queue.coalesced, 1)
+        self.assertEqual([queue.get(0).getId() for i in range(2)], [3, 5])
+
+    ## The replaced entries do not accumulate in the heap
+    def test_heap_compacted(self):
+        queue = EAQueue(10, "coalesce")
+        for i in range(1000):
+            queue.put(createEA(i, 41.0 + (i % 5) * 0.001, 30))
+        self.assertEqual(queue.getSize(), 5)
+        self.assertLessEqual(len(queue.heap), 2 * queue.getSize() + 1)
+
+########################################################
+
+if __name__ == '__main__':
+    unittest.main()
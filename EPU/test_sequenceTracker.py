@@ -0,0 +1,78 @@
+# *********************************************************************
+# Tests of the tracking of the ER received through UDP (sequenceTracker.py)
+# Run from this directory with: python3 -m unittest test_sequenceTracker
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import unittest
+
+from sequenceTracker import SequenceTracker
+
+########################################################
+
+class SequenceTrackerTest(unittest.TestCase):
+
+    def test_gaps_and_duplicates(self):
+        tracker = SequenceTracker()
+        self.assertEqual(tracker.register(1, 1, 1000), (False, []))
+        self.assertEqual(tracker.register(1, 2, 1000), (False, []))
+        self.assertEqual(tracker.register(1, 5, 1000), (False, [3, 4]))
+        self.assertEqual(tracker.register(1, 3, 1000), (False, []))  # retransmitted
+        self.assertEqual(tracker.register(1, 5, 1000), (True, []))
+        self.assertEqual(tracker.recovered, 1)
+
+    ## The ids of a restarted EDU start again at 1, below the highest id received before
+    def test_restart_with_boot(self):
+        tracker = SequenceTracker()
+        for seq in range(1, 31):
+            tracker.register(1, seq, 1000)
+
+        for seq in range(1, 6):
+            self.assertEqual(tracker.register(1, seq, 2000), (False, []))
+        self.assertEqual(tracker.duplicates, 0)
+        self.assertEqual(tracker.restarts, 1)
+
+        ## The sequence of the new boot is tracked
+        self.assertEqual(tracker.register(1, 5, 2000), (True, []))
+        self.assertEqual(tracker.register(1, 8, 2000), (False, [6, 7]))
+
+    ## The first ER after the restart were lost: they are requested again
+    def test_restart_with_lost_first_er(self):
+        tracker = SequenceTracker()
+        for seq in range(1, 31):
+            tracker.register(1, seq, 1000)
+
+        self.assertEqual(tracker.register(1, 3, 2000), (False, [1, 2]))
+        self.assertEqual(tracker.register(1, 1, 2000), (False, []))
+
+    ## ER sent before the restart and delivered late are processed, but not tracked
+    def test_late_er_of_previous_boot(self):
+        tracker = SequenceTracker()
+        tracker.register(1, 30, 1000)
+        tracker.register(1, 1, 2000)
+        self.assertEqual(tracker.register(1, 29, 1000), (False, []))
+        self.assertEqual(tracker.register(1, 2, 2000), (False, []))
+        self.assertEqual(tracker.restarts, 1)
+
+    ## Older EDUs do not send the boot: an id 1 after higher ids is a restart
+    def test_restart_without_boot(self):
+        tracker = SequenceTracker()
+        for seq in range(1, 31):
+            tracker.register(1, seq)
+
+        for seq in range(1, 6):
+            self.assertEqual(tracker.register(1, seq), (False, []))
+        self.assertEqual(tracker.duplicates, 0)
+
+    def test_edus_are_independent(self):
+        tracker = SequenceTracker()
+        tracker.register(1, 10, 1000)
+        self.assertEqual(tracker.register(2, 1, 1000), (False, []))
+        self.assertEqual(tracker.register(1, 11, 1000), (False, []))
+
+########################################################
+
+if __name__ == '__main__':
+    unittest.main()
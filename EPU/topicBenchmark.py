@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Simulation of the delivery of EA to EACs in a city divided in districts (see eaTransmitter.py)
+# EA are created at the positions of EDUs spread over the city, and every EAC monitors a single
+# district (a geohash cell). The messages delivered by the MQTT Broker to each EAC are counted when
+# the EAC subscribes to the topic of the EPU (all EA) and when it subscribes to the area topics of its
+# district (all severity bands, or only the high and critical bands)
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import sys, getopt
+import random
+
+from elementsEPU import EA
+from eaTransmitter import encodeGeohash, severityBand
+
+##############################################################################
+
+description = "EPU_CityAlarmCamera_1"
+geohashPrecision = 5  # default of epu.py
+numberEA = 10000
+numberEDU = 400
+
+## Area of the city (latitude and longitude limits): about 17 x 17 km
+city = [[41.10, 41.25], [-8.75, -8.55]]
+
+##############################################################################
+
+## Matching of a topic and a subscription, with the wildcards of MQTT ("+": one level, "#": remaining levels)
+def topicMatches(subscription, topic):
+    filters = subscription.split("/")
+    levels = topic.split("/")
+    for i in range(len(filters)):
+        if filters[i] == "#":
+            return True
+        if i >= len(levels) or (filters[i] != "+" and filters[i] != levels[i]):
+            return False
+    return len(filters) == len(levels)
+
+## Topics of an EA, as published by epuMQTT.publishEA
+def topicsEA(ea):
+    geohash = encodeGeohash(ea.getLatitude(), ea.getLongitude(), geohashPrecision)
+    return [description, description + "/" + severityBand(ea.getSeverityLevel()) + "/" + "/".join(geohash)]
+
+def createEA(i, edus, rnd):
+    la, lo = rnd.choice(edus)
+    ea = EA(i, None, la, lo, 0)
+    ea.putEventInstance(rnd.choice([3, 4, 8, 16]))
+    ea.setSeverityLevel(rnd.randint(0, 100))
+    return ea
+
+##############################################################################
+
+def simulate():
+    rnd = random.Random(1)
+    edus = [(rnd.uniform(city[0][0], city[0][1]), rnd.uniform(city[1][0], city[1][1])) for i in range(numberEDU)]
+
+    ## One EAC per district with EDUs
+    districts = sorted(set(encodeGeohash(la, lo, geohashPrecision) for la, lo in edus))
+    modes = [["topic of the EPU", lambda d: [description]],
+             ["area topics (all bands)", lambda d: [description + "/+/" + "/".join(d) + "/#"]],
+             ["area topics (high and critical)", lambda d: [description + "/" + band + "/" + "/".join(d) + "/#" for band in ("high", "critical")]]]
+
+    published = 0
+    delivered = [[0] * len(districts) for mode in modes]
+    for i in range(numberEA):
+        topics = topicsEA(createEA(i, edus, rnd))
+        published = published + len(topics)
+        for m in range(len(modes)):
+            for c in range(len(districts)):
+                ## A client receives a message once for every topic that matches one of its subscriptions
+                for topic in topics:
+                    if any(topicMatches(s, topic) for s in modes[m][1](districts[c])):
+                        delivered[m][c] = delivered[m][c] + 1
+
+    print(numberEA, "EA of", numberEDU, "EDUs,", len(districts), "districts (geohash of", geohashPrecision, "characters), one EAC per district")
+    print("    messages published to the Broker:", published, "(" + str(published // numberEA), "per EA)")
+    for m in range(len(modes)):
+        perClient = sum(delivered[m]) / len(districts)
+        print("    " + modes[m][0] + ": messages per EAC: mean =", round(perClient, 1), ", min =", min(delivered[m]), ", max =", max(delivered[m]),
+              ", reduction = " + str(round(sum(delivered[0]) / max(1, sum(delivered[m])), 1)) + "x")
+
+##############################################################################
+
+def main(argv):
+    global geohashPrecision, numberEA, numberEDU
+
+    opts, ars = getopt.getopt(argv, "hg:n:u:", ["geohash=", "number=", "edus="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("topicBenchmark.py -g <geohashPrecision> -n <numberEA> -u <numberEDU>")
+            sys.exit(1)
+        elif opt in ("-g", "--geohash"):
+            geohashPrecision = int(arg)
+        elif opt in ("-n", "--number"):
+            numberEA = int(arg)
+        elif opt in ("-u", "--edus"):
+            numberEDU = int(arg)
+
+    simulate()
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Benchmark of the transports of ER (TCP and UDP) on the loopback interface
+# ER are sent as the EDU sends them (TCP: one connection per ER; UDP: one datagram)
+# and received as the EPU receives them. For each transport, the time spent by the EDU,
+# the latency until the ER is received and the packets sent (from /proc/net/snmp,
+# Linux only) are measured per ER
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import sys, getopt
+import socket
+import threading
+import time
+
+from elementsEPU import ER, encodeER
+
+##############################################################################
+
+numberER = 2000
+port = 55955
+
+##############################################################################
+
+## Packets sent by the host: (TCP segments, UDP datagrams), or None if not available
+## On the loopback interface, every packet sent is also received
+def packetCounters():
+    try:
+        with open("/proc/net/snmp") as f:
+            lines = [line.split() for line in f]
+    except OSError:
+        return None
+
+    counters = {}
+    for i in range(0, len(lines) - 1, 2):
+        if lines[i][0] in ("Tcp:", "Udp:"):
+            counters[lines[i][0]] = dict(zip(lines[i][1:], lines[i + 1][1:]))
+    return (int(counters["Tcp:"]["OutSegs"]), int(counters["Udp:"]["OutDatagrams"]))
+
+def createER(i):
+    er = ER(1, i, None, 41.176898, -8.585529, int(time.time() * 1000))
+    er.putEventTypeInstance(4)
+    er.putEventTypeComplex(1)
+    er.setTrace({"id": "%016x" % i, "hops": [["edu.sense", er.getEpochMs()]]})
+    return bytes(encodeER(er), 'utf-8')
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * p // 100)]
+
+##############################################################################
+
+## Receiver of the EPU (receiveERThread: one connection per ER, a single recv)
+def receiveTCP(s, arrivals):
+    for i in range(numberER):
+        c, a = s.accept()
+        c.recv(1024)
+        arrivals.append(time.perf_counter())
+        c.close()
+
+## Receiver of the EPU (receiveUDPThread)
+def receiveUDP(s, arrivals):
+    for i in range(numberER):
+        s.recvfrom(65535)
+        arrivals.append(time.perf_counter())
+
+## Sender of the EDU (transmitER and transmitUDP)
+def sendTCP(data):
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        s.settimeout(10)
+        s.connect(("127.0.0.1", port))
+        s.sendall(data)
+    finally:
+        s.close()
+
+def sendUDP(s, data):
+    s.sendto(data, ("127.0.0.1", port))
+
+##############################################################################
+
+def measure(transport):
+    reports = [createER(i) for i in range(numberER)]
+    arrivals = []
+    starts = []
+    costs = []
+
+    if transport == "tcp":
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(("127.0.0.1", port))
+        server.listen(128)
+        receiver = threading.Thread(target=receiveTCP, args=(server, arrivals))
+        send = sendTCP
+    else:
+        server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", port))
+        receiver = threading.Thread(target=receiveUDP, args=(server, arrivals))
+        client = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        send = lambda data: sendUDP(client, data)
+
+    receiver.start()
+    counters = packetCounters()
+
+    for data in reports:
+        ## One ER at a time, as the sender thread of the EDU
+        received = len(arrivals)
+        start = time.perf_counter()
+        send(data)
+        costs.append(time.perf_counter() - start)
+        starts.append(start)
+        while len(arrivals) == received:
+            time.sleep(0)
+
+    receiver.join()
+    after = packetCounters()
+    server.close()
+
+    latencies = [(arrivals[i] - starts[i]) * 1000000 for i in range(numberER)]
+    print(transport.upper(), "-", numberER, "ER of", len(reports[0]), "bytes")
+    print("    time in the EDU (us)   : p50 =", round(percentile(costs, 50) * 1000000, 1), ", p99 =", round(percentile(costs, 99) * 1000000, 1))
+    print("    latency to the EPU (us): p50 =", round(percentile(latencies, 50), 1), ", p99 =", round(percentile(latencies, 99), 1))
+    if counters is not None:
+        packets = after[0] - counters[0] if transport == "tcp" else after[1] - counters[1]
+        print("    packets per ER         :", round(packets / numberER, 2))
+
+##############################################################################
+
+def main(argv):
+    global numberER, port
+
+    opts, ars = getopt.getopt(argv, "hn:p:", ["number=", "port="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("transportBenchmark.py -n <numberER> -p <port>")
+            sys.exit(1)
+        elif opt in ("-n", "--number"):
+            numberER = int(arg)
+        elif opt in ("-p", "--port"):
+            port = int(arg)
+
+    measure("tcp")
+    measure("udp")
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,339 @@
+# *********************************************************************
+# Common model of the City Alarm messages, shared by the EDU, EPU and EAC
+# It models the concepts of Events Report (ER), Emergency Alarm (EA) and GPS position,
+# with fast conversions to and from the JSON format used between the units
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import json
+import time, datetime
+
+########################################################
+
+## The JSON encoder is created once and reused for all messages
+encoder = json.JSONEncoder(separators=(",", ":"))
+decoder = json.JSONDecoder()
+
+########################################################
+
+## Position of an EDU, ER or EA
+class GPS():
+    __slots__ = ("la", "lo")
+
+    def __init__(self, latitude, longitude):
+        self.la = latitude
+        self.lo = longitude
+
+    def getLatitude(self):
+        return self.la
+
+    def getLongitude(self):
+        return self.lo
+
+########################################################
+
+## Models an Events Report
+class ER():
+    __slots__ = ("edu", "id", "boot", "timestamp", "epochMs", "gps", "trace", "evidence", "eventsInstance", "eventsComplex")
+
+    ## ts is the textual timestamp (time.ctime(), only for display) and ms is the time in milliseconds since the epoch
+    def __init__(self, u, i, ts, latitude, longitude, ms=None):
+        self.edu = u
+        self.id = i
+        self.boot = None  # start of the EDU (milliseconds since the epoch): the ids start again when it changes
+        self.timestamp = ts
+        self.epochMs = ms
+        self.gps = GPS(latitude,longitude)
+        self.trace = None
+        self.evidence = None  # id of the image of the camera uploaded to the EPU, if any
+        self.eventsInstance = []  # array of integers (types of detected events - instance)
+        self.eventsComplex = []  # array of integers (types of detected events - complex)
+
+    def putEventTypeInstance(self, y):
+        self.eventsInstance.append(y)
+
+    def putEventTypeComplex(self, w):
+        self.eventsComplex.append(w)
+
+    def getEDU (self):
+        return self.edu
+
+    def getId (self):
+        return self.id
+
+    def setId (self, i):
+        self.id = i
+
+    def getBoot (self):
+        return self.boot
+
+    def setBoot (self, boot):
+        self.boot = boot
+
+    def getTimestamp (self):
+        return self.timestamp
+
+    def getEpochMs (self):
+        return self.epochMs
+
+    ## Trace of the alarm: {"id": trace id, "hops": [[stage, milliseconds since the epoch], ...]}
+    ## Each unit appends the time of its stages, from the sensor reading to the map
+    def setTrace (self, trace):
+        self.trace = trace
+
+    def getTrace (self):
+        return self.trace
+
+    def addHop (self, stage):
+        if self.trace is not None:
+            self.trace["hops"].append([stage, int(time.time() * 1000)])
+
+    ## Stage that may be repeated (e.g. retries of the transmission): only its last time is kept
+    def setHop (self, stage):
+        if self.trace is not None:
+            hops = self.trace["hops"]
+            if len(hops) > 0 and hops[-1][0] == stage:
+                hops[-1][1] = int(time.time() * 1000)
+            else:
+                hops.append([stage, int(time.time() * 1000)])
+
+    ## Evidence of the complex events: id of the image sent by the EDU to the EPU (see evidenceUploader.py)
+    def setEvidence (self, evidence):
+        self.evidence = evidence
+
+    def getEvidence (self):
+        return self.evidence
+
+    def getLatitude (self):
+        return self.gps.la
+
+    def getLongitude (self):
+        return self.gps.lo
+
+    def getEventsTypesInstance (self):
+        return self.eventsInstance
+
+    def getEventsTypesComplex (self):
+        return self.eventsComplex
+
+    def getNumberEI(self):
+        return len(self.eventsInstance)  # Number of EI (Instance) in the ER
+
+    def getNumberEC(self):
+        return len(self.eventsComplex)  # Number of EC (Complex) in the ER
+
+    def printValues(self):
+        for y in self.eventsInstance:
+            print ("Type instance =",  y)
+        for w in self.eventsComplex:
+            print ("Type complex =",  w)
+
+    ## This is required to convert the ER to JSON
+    def toJSON(self):
+        return encodeER(self)
+
+########################################################
+
+## Definition of an Emergency Alarm
+class EA():
+    __slots__ = ("id", "gps", "timestamp", "epochMs", "trace", "evidence", "typesInstance", "typesComplex", "sl")
+
+    def __init__(self, i, ts, latitude, longitude, ms=None):
+        self.id = i
+        self.gps = GPS(latitude,longitude)
+        self.timestamp = ts
+        self.epochMs = ms  # time of the ER, in milliseconds since the epoch
+        self.trace = None  # trace of the ER, continued by the EA
+        self.evidence = None  # evidence of the ER, stored by the EPU
+
+        ## Only the types of the detected events - It makes easier to handle them in the EPU and the clients
+        self.typesInstance = []
+        self.typesComplex = []
+
+        ## Severity level
+        self.sl = 0
+
+    def getLatitude (self):
+        return self.gps.la
+
+    def getLongitude (self):
+        return self.gps.lo
+
+    def putEventInstance(self, y):
+        self.typesInstance.append(y)
+
+    def putEventComplex(self, w):
+        self.typesComplex.append(w)
+
+    def getEventsTypesInstance (self):
+        return self.typesInstance
+
+    def getEventsTypesComplex (self):
+        return self.typesComplex
+
+    ## Names used by the EAC
+    def getEventsInstanceTypes (self):
+        return self.typesInstance
+
+    def getEventsComplexTypes (self):
+        return self.typesComplex
+
+    def setSeverityLevel(self, sev):
+        self.sl = sev
+
+    def getSeverityLevel (self):
+        return self.sl
+
+    def getId(self):
+        return self.id
+
+    def setId(self, i):
+        self.id = i
+
+    def getTimestamp(self):
+        return self.timestamp
+
+    def getEpochMs(self):
+        return self.epochMs
+
+    ## Evidence of the alarm (see ER)
+    def setEvidence (self, evidence):
+        self.evidence = evidence
+
+    def getEvidence (self):
+        return self.evidence
+
+    ## Trace of the alarm (see ER)
+    def setTrace (self, trace):
+        self.trace = trace
+
+    def getTrace (self):
+        return self.trace
+
+    def addHop (self, stage):
+        if self.trace is not None:
+            self.trace["hops"].append([stage, int(time.time() * 1000)])
+
+    def printValues(self):
+        print ("EA id:",self.id,", Timestamp:",self.timestamp,", Latitude:",self.gps.la,", Longitude:",self.gps.lo, " SL:", self.sl)
+        if len(self.typesInstance) > 0:
+            print ("This EA has the following EI types:")
+            for e in self.typesInstance:
+                print ("Type:", e)
+        else:
+            print ("This EA has no instance event")
+
+        if len(self.typesComplex) > 0:
+            print ("This EA has the following EC types:")
+            for e in self.typesComplex:
+                print ("Type:", e)
+        else:
+            print ("This EA has no complex event")
+
+    def toJSON(self):
+        return encodeEA(self)
+
+########################################################
+
+## ER from older EDUs only have the textual timestamp (time.ctime())
+## Returns the time in milliseconds since the epoch (or the current time, if it can not be parsed)
+def timestampToMs(timestamp):
+    try:
+        return int(datetime.datetime.strptime(timestamp, "%a %b %d %H:%M:%S %Y").timestamp() * 1000)
+    except (TypeError, ValueError):
+        return int(time.time() * 1000)
+
+## Only well-formed traces are accepted from other units: a str or int id, and hops [stage (str), milliseconds (number)]
+def validTrace(trace):
+    if not isinstance(trace, dict) or not isinstance(trace.get("hops"), list):
+        return None
+    if not isinstance(trace.get("id"), (str, int)) or isinstance(trace.get("id"), bool):
+        return None
+    for hop in trace["hops"]:
+        if not isinstance(hop, list) or len(hop) != 2 or not isinstance(hop[0], str) \
+           or not isinstance(hop[1], (int, float)) or isinstance(hop[1], bool):
+            return None
+    return trace
+
+## Ids of evidences are also used as file names by the EPU
+def validEvidence(evidence):
+    if isinstance(evidence, str) and 0 < len(evidence) <= 64 and all((c.isascii() and c.isalnum()) or c in "_-" for c in evidence):
+        return evidence
+    return None
+
+########################################################
+## Conversions to and from JSON
+## The fields are written directly, without walking through the attributes of the objects
+## The JSON format is the same used by the previous versions of the units
+
+def erToDict(er):
+    return {"edu": er.edu, "id": er.id, "boot": er.boot, "timestamp": er.timestamp, "epochMs": er.epochMs,
+            "gps": {"la": er.gps.la, "lo": er.gps.lo}, "trace": er.trace, "evidence": er.evidence,
+            "eventsInstance": er.eventsInstance, "eventsComplex": er.eventsComplex}
+
+def encodeER(er):
+    return encoder.encode(erToDict(er))
+
+## data may be the JSON text or an already decoded dictionary
+## Raises KeyError, TypeError or ValueError if data is not a valid ER
+def decodeER(data):
+    if not isinstance(data, dict):
+        data = decoder.decode(data)
+
+    ## Older EDUs only send the textual timestamp
+    timestamp = data.get("timestamp")
+    epochMs = data.get("epochMs")
+    if epochMs is None:
+        epochMs = timestampToMs(timestamp)
+    if timestamp is None:
+        timestamp = time.ctime(epochMs / 1000)
+
+    ## The attributes are set directly: __init__ would create lists that are replaced at once
+    gps = data["gps"]
+    er = ER.__new__(ER)
+    er.edu = data["edu"]
+    er.id = data["id"]
+    boot = data.get("boot")
+    er.boot = boot if isinstance(boot, int) else None  # older EDUs do not send it
+    er.timestamp = timestamp
+    er.epochMs = epochMs
+    er.gps = GPS(gps["la"], gps["lo"])
+    er.eventsInstance = list(data["eventsInstance"])
+    er.eventsComplex = list(data["eventsComplex"])
+    trace = data.get("trace")
+    er.trace = None if trace is None else validTrace(trace)
+    evidence = data.get("evidence")
+    er.evidence = None if evidence is None else validEvidence(evidence)
+    return er
+
+def eaToDict(ea):
+    return {"id": ea.id, "timestamp": ea.timestamp, "epochMs": ea.epochMs,
+            "gps": {"la": ea.gps.la, "lo": ea.gps.lo}, "trace": ea.trace, "evidence": ea.evidence,
+            "typesInstance": ea.typesInstance, "typesComplex": ea.typesComplex, "sl": ea.sl}
+
+def encodeEA(ea):
+    return encoder.encode(eaToDict(ea))
+
+## data may be the JSON text or an already decoded dictionary
+## Raises KeyError, TypeError or ValueError if data is not a valid EA
+def decodeEA(data):
+    if not isinstance(data, dict):
+        data = decoder.decode(data)
+
+    ## As in decodeER, the attributes are set directly
+    gps = data["gps"]
+    ea = EA.__new__(EA)
+    ea.id = data["id"]
+    ea.gps = GPS(gps["la"], gps["lo"])
+    ea.timestamp = data.get("timestamp")
+    ea.epochMs = data.get("epochMs")
+    ea.sl = data["sl"]
+    ea.typesInstance = list(data["typesInstance"])
+    ea.typesComplex = list(data["typesComplex"])
+    trace = data.get("trace")
+    ea.trace = None if trace is None else validTrace(trace)
+    evidence = data.get("evidence")
+    ea.evidence = None if evidence is None else validEvidence(evidence)
+    return ea
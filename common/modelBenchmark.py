@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Benchmark of the common model of the City Alarm messages
+# The ER and EA of cityAlarmModel.py are compared with the previous classes
+# (attributes in __dict__ and JSON conversion through default=o.__dict__):
+# objects created, encoded and decoded per second, and bytes of memory per object
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import sys, getopt
+import json
+import time
+import tracemalloc
+
+import cityAlarmModel
+
+##############################################################################
+
+## Previous ER and EA, with the attributes in __dict__
+class GPS():
+    def __init__(self, latitude, longitude):
+        self.la = latitude
+        self.lo = longitude
+
+class ER():
+    def __init__(self, u, i, ts, latitude, longitude, ms=None):
+        self.edu = u
+        self.id = i
+        self.timestamp = ts
+        self.epochMs = ms
+        self.gps = GPS(latitude,longitude)
+        self.trace = None
+        self.eventsInstance = []
+        self.eventsComplex = []
+
+    def toJSON(self):
+        return json.dumps(self,default=lambda o: o.__dict__,sort_keys=True, indent=4)
+
+def decodeER(received):
+    parsed_data = json.loads(received)
+    er = ER(parsed_data["edu"], parsed_data["id"], parsed_data["timestamp"], parsed_data["gps"]["la"], parsed_data["gps"]["lo"], parsed_data["epochMs"])
+    for y in parsed_data["eventsInstance"]:
+        er.eventsInstance.append(y)
+    for w in parsed_data["eventsComplex"]:
+        er.eventsComplex.append(w)
+    er.trace = parsed_data.get("trace")
+    return er
+
+class EA():
+    def __init__(self, i, ts, latitude, longitude, ms=None):
+        self.id = i
+        self.gps = GPS(latitude,longitude)
+        self.timestamp = ts
+        self.epochMs = ms
+        self.trace = None
+        self.typesInstance = []
+        self.typesComplex = []
+        self.sl = 0
+
+    def toJSON(self):
+        return json.dumps(self,default=lambda o: o.__dict__,sort_keys=True, indent=4)
+
+def decodeEA(received):
+    parsed_data = json.loads(received)
+    ea = EA(parsed_data["id"], parsed_data["timestamp"], parsed_data["gps"]["la"], parsed_data["gps"]["lo"], parsed_data["epochMs"])
+    ea.sl = parsed_data["sl"]
+    for y in parsed_data["typesInstance"]:
+        ea.typesInstance.append(y)
+    for w in parsed_data["typesComplex"]:
+        ea.typesComplex.append(w)
+    ea.trace = parsed_data.get("trace")
+    return ea
+
+##############################################################################
+
+## Number of objects of each test
+numberObjects = 100000
+
+##############################################################################
+
+def createER(model, i):
+    er = model.ER(1, i, "Tue May 12 10:00:00 2020", 41.176898, -8.585529, 1589277600000 + i)
+    er.eventsInstance.append(1)
+    er.eventsComplex.append(1)
+    er.trace = {"id": str(i), "hops": [["edu.sense", 1589277600000 + i]]}
+    return er
+
+def createEA(model, i):
+    ea = model.EA(i, "Tue May 12 10:00:00 2020", 41.176898, -8.585529, 1589277600000 + i)
+    ea.typesInstance.append(1)
+    ea.typesComplex.append(1)
+    ea.sl = 80
+    ea.trace = {"id": str(i), "hops": [["edu.sense", 1589277600000 + i]]}
+    return ea
+
+## Objects per second of a function applied to range(numberObjects)
+def rate(function, values):
+    start = time.perf_counter()
+    for v in values:
+        function(v)
+    return len(values) / (time.perf_counter() - start)
+
+## Bytes of memory per object (including the position and the lists of events)
+def memory(create):
+    tracemalloc.start()
+    objects = [create(i) for i in range(numberObjects)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(objects)
+
+def measure(name, create, encode, decode):
+    objects = [create(i) for i in range(numberObjects)]
+    encoded = [encode(o) for o in objects]
+
+    print(name)
+    print("    created per second :", int(rate(create, range(numberObjects))))
+    print("    encoded per second :", int(rate(encode, objects)))
+    print("    decoded per second :", int(rate(decode, encoded)))
+    print("    memory per object  :", int(memory(create)), "bytes")
+    print("    JSON size          :", len(encoded[0]), "bytes")
+
+##############################################################################
+
+def main(argv):
+    global numberObjects
+
+    opts, ars = getopt.getopt(argv, "hn:", ["number="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("modelBenchmark.py -n <numberObjects>")
+            sys.exit(1)
+        elif opt in ("-n", "--number"):
+            numberObjects = int(arg)
+
+    legacy = sys.modules[__name__]
+
+    measure("ER (previous classes)", lambda i: createER(legacy, i), lambda er: er.toJSON(), decodeER)
+    measure("ER (cityAlarmModel)", lambda i: createER(cityAlarmModel, i), cityAlarmModel.encodeER, cityAlarmModel.decodeER)
+    measure("EA (previous classes)", lambda i: createEA(legacy, i), lambda ea: ea.toJSON(), decodeEA)
+    measure("EA (cityAlarmModel)", lambda i: createEA(cityAlarmModel, i), cityAlarmModel.encodeEA, cityAlarmModel.decodeEA)
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
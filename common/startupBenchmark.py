@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+# *********************************************************************
+# Startup benchmark of the City Alarm units
+# The import of each unit is measured with python3 -X importtime, presenting the
+# modules that take longer to load. Optionally, the EDU is started and the time until
+# its first ER is transmitted is measured
+# Author      : Daniel G. Costa
+# E-mail      : danielgcosta@uefs.br
+# Date        : 2020/05/12
+# *********************************************************************
+
+import os
+import sys, getopt
+import subprocess
+import time
+
+##############################################################################
+
+## Directory and main module of each unit
+units = [["EDU", "edu"], ["EPU", "epu"], ["EAC", "eacMap"]]
+
+## Number of modules presented for each unit
+numberModules = 10
+
+## Arguments of the EDU for the time to the first ER (None does not start the EDU)
+argumentsEDU = None
+timeoutEDU = 120
+
+baseDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+##############################################################################
+
+## Import a unit with -X importtime
+## Returns the wall time of the process, the time of the import of the unit and the
+## modules directly imported by the unit as [cumulative time (us), name]
+def measureImport(directory, module):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            cwd=os.path.join(baseDirectory, directory), stderr=subprocess.PIPE, universal_newlines=True)
+    wall = time.perf_counter() - start
+
+    total = None
+    modules = []
+    errors = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            errors.append(line)
+            continue
+
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header
+        cumulative = int(fields[1])
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip())) // 2
+
+        if level == 0 and name.strip() == module:
+            total = cumulative
+        elif level <= 1:
+            ## Level 0 are the modules loaded by the interpreter, level 1 are imported by the unit
+            modules.append([cumulative, name.strip()])
+
+    ## The time of a failed import is not meaningful
+    if result.returncode != 0:
+        print("    The import of", directory + "/" + module, "failed:", errors[-1] if len(errors) > 0 else result.returncode)
+        total = None
+
+    modules.sort(reverse=True)
+    return wall, total, modules
+
+##############################################################################
+
+## Start the EDU and wait for the first transmitted ER
+def measureFirstER():
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "edu.py"] + argumentsEDU.split(), cwd=os.path.join(baseDirectory, "EDU"),
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    try:
+        for line in process.stdout:
+            if line.startswith("First ER sent"):
+                return time.perf_counter() - start, line.strip()
+            if time.perf_counter() - start > timeoutEDU:
+                break
+        return None, None
+    finally:
+        process.kill()
+
+##############################################################################
+
+def main(argv):
+    global numberModules, argumentsEDU, timeoutEDU
+
+    opts, ars = getopt.getopt(argv, "hn:e:t:", ["number=", "edu=", "timeout="])
+    for opt, arg in opts:
+        if opt == "-h":
+            print("startupBenchmark.py -n <numberModules> -e <argumentsEDU> -t <timeoutEDU>")
+            sys.exit(1)
+        elif opt in ("-n", "--number"):
+            numberModules = int(arg)
+        elif opt in ("-e", "--edu"):
+            argumentsEDU = arg
+        elif opt in ("-t", "--timeout"):
+            timeoutEDU = float(arg)
+
+    for directory, module in units:
+        wall, total, modules = measureImport(directory, module)
+        print(directory + ": process time", round(wall, 3), "s, import of", module, round(total / 1000000.0, 3) if total is not None else "-", "s")
+        for cumulative, name in modules[:numberModules]:
+            print("    %8.1f ms  %s" % (cumulative / 1000.0, name))
+
+    if argumentsEDU is not None:
+        seconds, line = measureFirstER()
+        if seconds is None:
+            print("EDU: no ER was transmitted in", timeoutEDU, "s")
+        else:
+            print("EDU: first ER after", round(seconds, 3), "s (" + line + ")")
+
+##############################################################################
+
+if __name__ == '__main__':
+    main(sys.argv[1:])